@@ -0,0 +1,141 @@
+"""Vectorized lead time aggregation and percentile reporting."""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List
+
+from export import METRIC_NAMES
+from sinks import OutputSink
+
+PERCENTILES = (50, 90, 99)
+
+
+def _import_numpy() -> Any:
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError as error:
+        raise RuntimeError(
+            "Lead time aggregation requires numpy: pip install '.[analytics]'"
+        ) from error
+    return numpy
+
+
+class LeadTimeAggregator(OutputSink):
+    """Sink collecting metric durations and summarizing them at the end of a run.
+
+    Records are reduced to a repository, a release definition, a weekly time
+    bucket and the duration in seconds of each metric. :meth:`summarize` then
+    computes counts, means and percentiles for every group with NumPy, each
+    grouping being handled in a single sorted pass.
+    """
+
+    def __init__(self) -> None:
+        self._np = _import_numpy()
+        # Low-cardinality keys are encoded as integer codes while collecting.
+        self._codes: Dict[str, Dict[str, int]] = {
+            "repository": {},
+            "definition": {},
+            "day": {},
+        }
+        self._groups: Dict[str, List[int]] = {key: [] for key in self._codes}
+        self._seconds: Dict[str, List[float]] = {name: [] for name in METRIC_NAMES}
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._encode("repository", record["repository"]["name"])
+        self._encode("definition", record["release"]["definition"])
+        self._encode("day", record["release"]["deployed_at"][:10])
+        metrics = record["metrics"]
+        for name, values in self._seconds.items():
+            duration = metrics.get(name)
+            values.append(duration["seconds"] if duration else math.nan)
+
+    def close(self) -> None:
+        """Nothing to release; the collected values stay available."""
+
+    def summarize(self) -> Dict[str, Any]:
+        """Return the overall, per repository, per definition and weekly stats."""
+        np = self._np
+        # Sort every metric once; each grouping then only needs a stable sort
+        # of its integer codes to lay the values out group by group.
+        seconds = {}
+        for name, values in self._seconds.items():
+            array = np.asarray(values, dtype=np.float64)
+            record_ids = np.flatnonzero(~np.isnan(array))
+            record_ids = record_ids[np.argsort(array[record_ids], kind="stable")]
+            seconds[name] = (record_ids, array[record_ids])
+        records = len(self._groups["repository"])
+
+        days = np.asarray(list(self._codes["day"]), dtype="datetime64[D]")
+        day_numbers = days.astype(np.int64)
+        # 1970-01-01 was a Thursday: shift to the Monday starting each week.
+        week_of_day = (day_numbers - (day_numbers + 3) % 7).astype("datetime64[D]")
+        week_labels, week_codes = np.unique(week_of_day, return_inverse=True)
+        weeks = week_codes.ravel()[np.asarray(self._groups["day"], dtype=np.int64)]
+
+        return {
+            "records": records,
+            "percentiles": list(PERCENTILES),
+            "overall": self._group_stats(
+                np.zeros(records, dtype=np.int64), ["all"], seconds
+            )["all"],
+            "by_repository": self._grouped("repository", seconds),
+            "by_definition": self._grouped("definition", seconds),
+            "by_week": self._group_stats(
+                weeks, [str(label) for label in week_labels], seconds
+            ),
+        }
+
+    def _encode(self, key: str, value: str) -> None:
+        codes = self._codes[key]
+        self._groups[key].append(codes.setdefault(value, len(codes)))
+
+    def _grouped(
+        self, key: str, seconds: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Dict[str, float]]]:
+        groups = self._np.asarray(self._groups[key], dtype=self._np.int64)
+        return self._group_stats(groups, list(self._codes[key]), seconds)
+
+    def _group_stats(
+        self, groups: Any, labels: List[str], seconds: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Dict[str, float]]]:
+        np = self._np
+        result: Dict[str, Dict[str, Dict[str, float]]] = {label: {} for label in labels}
+        # Stable sorts on small integer codes use NumPy's radix sort.
+        groups = groups.astype(np.uint16 if len(labels) <= 0xFFFF else np.int64)
+
+        for name, (record_ids, values) in seconds.items():
+            if not len(values):
+                continue
+            group_ids = groups[record_ids]
+            order = np.argsort(group_ids, kind="stable")
+            group_ids, group_values = group_ids[order], values[order]
+
+            counts = np.bincount(group_ids, minlength=len(labels))
+            sums = np.bincount(group_ids, weights=group_values, minlength=len(labels))
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            stats = {"count": counts, "mean": sums / np.maximum(counts, 1)}
+
+            for percentile in PERCENTILES:
+                position = starts + (np.maximum(counts, 1) - 1) * percentile / 100
+                lower = np.floor(position).astype(np.int64)
+                upper = np.ceil(position).astype(np.int64)
+                # Empty groups are skipped below; keep their indexes in range.
+                lower = np.minimum(lower, len(group_values) - 1)
+                upper = np.minimum(upper, len(group_values) - 1)
+                stats[f"p{percentile}"] = group_values[lower] + (
+                    group_values[upper] - group_values[lower]
+                ) * (position - lower)
+
+            for index, label in enumerate(labels):
+                if counts[index]:
+                    result[label][name] = {
+                        key: (
+                            int(value[index])
+                            if key == "count"
+                            else round(float(value[index]), 2)
+                        )
+                        for key, value in stats.items()
+                    }
+
+        return result
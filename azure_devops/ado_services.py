@@ -3,16 +3,22 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Optional
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import quote
 
 import requests
 
 from azure_devops.api_client import AzureDevOpsClient
 from azure_devops.models import Artifact, PullRequest, ReleaseEnvironment
-from config import LOG_LEVEL
+from config import (
+    OLDEST_COMMIT_MEMO_SIZE,
+    PR_COMMITS_PAGE_SIZE,
+    PR_QUERY_BATCH_SIZE,
+    PR_QUERY_ENABLED,
+)
 
-logging.basicConfig(level=getattr(logging, LOG_LEVEL.upper(), logging.INFO))
 logger = logging.getLogger(__name__)
 
 
@@ -47,11 +53,65 @@ def get_release_definition_id(
     raise ValueError(f"Release definition '{definition_name}' not found.")
 
 
+def _extract_release_environments(release: Any) -> List[ReleaseEnvironment]:
+    """Return the successfully deployed environments of an active release."""
+    if release.get("status") != "active":
+        return []
+
+    artifacts = None
+    if "artifacts" in release:
+        try:
+            artifacts = tuple(_extract_artifacts(release, release.get("id")))
+        except ValueError:
+            # Leave it to get_all_artifact_metadata to fetch and report.
+            artifacts = None
+
+    results: List[ReleaseEnvironment] = []
+    for environment in release.get("environments", []):
+        if environment.get("status") not in {"succeeded", "partiallySucceeded"}:
+            continue
+
+        deploy_steps = environment.get("deploySteps", [])
+        if not deploy_steps:
+            continue
+
+        queued_on = deploy_steps[0].get("queuedOn")
+        last_modified = deploy_steps[0].get("lastModifiedOn")
+        if not queued_on or not last_modified:
+            continue
+
+        try:
+            env = ReleaseEnvironment(
+                environment_id=environment.get("id"),
+                environment_name=environment.get("name"),
+                environment_status=environment.get("status"),
+                environment_start_at=queued_on,
+                environment_finished_at=last_modified,
+                release_id=release.get("id"),
+                release_name=release.get("name"),
+                release_status=release.get("status"),
+                release_created_on=release.get("createdOn"),
+                release_modified_on=release.get("modifiedOn"),
+                definition_environment_id=environment.get("definitionEnvironmentId"),
+                artifacts=artifacts,
+            )
+        except ValueError as error:
+            logger.warning(
+                "⚠️ Invalid timestamp in environment %s of release %s, skipped: %s",
+                environment.get("id"),
+                release.get("id"),
+                error,
+            )
+            continue
+        results.append(env)
+
+    return results
+
+
 def get_active_release_environments(
     client: AzureDevOpsClient, project_id: str, definition_id: int, top: int = 100
 ) -> List[ReleaseEnvironment]:
     """Return all release environments where PRD was deployed successfully."""
-    # pylint: disable=too-many-locals
 
     endpoint = f"/{quote(project_id, safe='')}/_apis/release/releases"
     params = {
@@ -62,45 +122,53 @@ def get_active_release_environments(
         "$top": top,
     }
 
-    releases = client.get(endpoint, params=params)
+    releases, _ = client.get_page_items(endpoint, params=params)
     results: List[ReleaseEnvironment] = []
 
-    for release in releases.get("value", []):
-        if release.get("status") != "active":
-            continue
+    for release in releases:
+        results.extend(_extract_release_environments(release))
 
-        for environment in release.get("environments", []):
-            if environment.get("status") not in {"succeeded", "partiallySucceeded"}:
-                continue
+    return results
 
-            deploy_steps = environment.get("deploySteps", [])
-            if not deploy_steps:
-                continue
 
-            queued_on = deploy_steps[0].get("queuedOn")
-            last_modified = deploy_steps[0].get("lastModifiedOn")
-            if not queued_on or not last_modified:
-                continue
+def iter_active_release_environments(
+    client: AzureDevOpsClient,
+    project_id: str,
+    definition_id: int,
+    min_created_time: Optional[str] = None,
+    max_created_time: Optional[str] = None,
+    page_size: int = 100,
+) -> Iterator[ReleaseEnvironment]:
+    """Yield successfully deployed release environments page by page.
+
+    Releases are listed newest first and the ``x-ms-continuationtoken``
+    header is followed lazily, so only the page being consumed is held in
+    memory. The optional bounds are ISO timestamps passed to the release API
+    as ``minCreatedTime`` and ``maxCreatedTime``. Artifacts are expanded in
+    the same listing and attached to each environment, so callers do not need
+    to fetch every release again.
+    """
+    endpoint = f"/{quote(project_id, safe='')}/_apis/release/releases"
+    params = {
+        "api-version": client.api_version,
+        "queryOrder": "descending",
+        "$expand": "environments,artifacts",
+        "definitionId": definition_id,
+        "$top": page_size,
+    }
+    if min_created_time:
+        params["minCreatedTime"] = min_created_time
+    if max_created_time:
+        params["maxCreatedTime"] = max_created_time
 
-            results.append(
-                ReleaseEnvironment(
-                    environment_id=environment.get("id"),
-                    environment_name=environment.get("name"),
-                    environment_status=environment.get("status"),
-                    environment_start_at=queued_on,
-                    environment_finished_at=last_modified,
-                    release_id=release.get("id"),
-                    release_name=release.get("name"),
-                    release_status=release.get("status"),
-                    release_created_on=release.get("createdOn"),
-                    release_modified_on=release.get("modifiedOn"),
-                    definition_environment_id=environment.get(
-                        "definitionEnvironmentId"
-                    ),
-                )
-            )
+    while True:
+        releases, continuation_token = client.get_page_items(endpoint, params=params)
+        for release in releases:
+            yield from _extract_release_environments(release)
 
-    return results
+        if not continuation_token:
+            return
+        params = {**params, "continuationToken": continuation_token}
 
 
 def get_all_artifact_metadata(
@@ -111,6 +179,11 @@ def get_all_artifact_metadata(
     params = {"api-version": client.api_version}
 
     release_data = client.get(endpoint, params=params)
+    return _extract_artifacts(release_data, release_id)
+
+
+def _extract_artifacts(release_data: dict, release_id: int) -> List[Artifact]:
+    """Map the ``artifacts`` of a release payload to :class:`Artifact` objects."""
     artifacts = release_data.get("artifacts", [])
 
     if not artifacts:
@@ -144,14 +217,19 @@ def get_all_artifact_metadata(
     return results
 
 
+def _commit_endpoint(project_name: str, repository_id: str, commit_id: str) -> str:
+    """Return the endpoint of one commit, also the cache key of batched commits."""
+    return (
+        f"/{quote(project_name, safe='')}/_apis/git/repositories/"
+        f"{quote(repository_id, safe='')}/commits/{quote(commit_id, safe='')}"
+    )
+
+
 def get_commit_date(
     client: AzureDevOpsClient, project_name: str, repository_id: str, commit_id: str
 ) -> Optional[str]:
     """Return the ISO timestamp of the given commit."""
-    endpoint = (
-        f"/{quote(project_name, safe='')}/_apis/git/repositories/"
-        f"{quote(repository_id, safe='')}/commits/{quote(commit_id, safe='')}"
-    )
+    endpoint = _commit_endpoint(project_name, repository_id, commit_id)
     params = {"api-version": client.api_version}
 
     try:
@@ -163,6 +241,109 @@ def get_commit_date(
         ) from error
 
 
+def get_commit_dates(
+    client: AzureDevOpsClient,
+    project_name: str,
+    repository_id: str,
+    commit_ids: Iterable[str],
+    chunk_size: int = 100,
+) -> Dict[str, Optional[str]]:
+    """Return the committer date of many commits of one repository.
+
+    Commits found in the response cache are served from it; the others are
+    resolved through the ``commitsbatch`` endpoint, ``chunk_size`` ids per
+    request, and cached one by one. The result maps every requested id,
+    lowercased, to its ISO timestamp or ``None`` when the commit was not
+    returned.
+    """
+    endpoint = _commits_batch_endpoint(project_name, repository_id)
+    params = {"api-version": client.api_version}
+    results, pending = _cached_commit_dates(
+        client, project_name, repository_id, commit_ids, params
+    )
+
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start : start + chunk_size]
+        try:
+            response = client.post(
+                endpoint, json={"ids": chunk, "$top": len(chunk)}, params=params
+            )
+        except (requests.RequestException, ValueError, RuntimeError) as error:
+            raise RuntimeError(
+                f"Error retrieving commit dates for repository {repository_id}: {error}"
+            ) from error
+
+        _store_commit_dates(
+            client, project_name, repository_id, response, params, results
+        )
+
+    return results
+
+
+def _commits_batch_endpoint(project_name: str, repository_id: str) -> str:
+    """Return the ``commitsbatch`` endpoint of a repository."""
+    return (
+        f"/{quote(project_name, safe='')}/_apis/git/repositories/"
+        f"{quote(repository_id, safe='')}/commitsbatch"
+    )
+
+
+def _cached_commit_dates(
+    client: Any,
+    project_name: str,
+    repository_id: str,
+    commit_ids: Iterable[str],
+    params: Dict[str, Any],
+) -> Tuple[Dict[str, Optional[str]], List[str]]:
+    """Return the commit dates served by the response cache and the ids to query."""
+    results: Dict[str, Optional[str]] = {}
+    pending: List[str] = []
+    for commit_id in dict.fromkeys(commit_id.lower() for commit_id in commit_ids):
+        commit = client.get_cached(
+            _commit_endpoint(project_name, repository_id, commit_id), params
+        )
+        if commit is None:
+            pending.append(commit_id)
+            results[commit_id] = None
+        else:
+            results[commit_id] = commit.get("committer", {}).get("date")
+    return results, pending
+
+
+def _store_commit_dates(
+    client: Any,
+    project_name: str,
+    repository_id: str,
+    response: dict,
+    params: Dict[str, Any],
+    results: Dict[str, Optional[str]],
+) -> None:
+    """Add the commits of a ``commitsbatch`` response to ``results`` and the cache."""
+    for commit in response.get("value", []):
+        commit_id = (commit.get("commitId") or "").lower()
+        if commit_id in results:
+            committer = commit.get("committer", {})
+            results[commit_id] = committer.get("date")
+            client.set_cached(
+                _commit_endpoint(project_name, repository_id, commit_id),
+                params,
+                {"commitId": commit_id, "committer": committer},
+            )
+
+
+def _build_pull_request(pr: Any) -> PullRequest:
+    """Map a raw pull request payload to a :class:`PullRequest`."""
+    return PullRequest(
+        id=str(pr["pullRequestId"]),
+        merged_at=pr.get("closedDate"),
+        created_at=pr.get("creationDate"),
+        source_ref_name=pr.get("sourceRefName"),
+        target_ref_name=pr.get("targetRefName"),
+        status=pr.get("mergeStatus"),
+        last_merge_commit_id=pr.get("lastMergeCommit", {}).get("commitId"),
+    )
+
+
 def find_pr_by_commit_id(
     client: AzureDevOpsClient,
     project_name: str,
@@ -187,15 +368,7 @@ def find_pr_by_commit_id(
         for pr in response.get("value", []):
             merged_commit = pr.get("lastMergeCommit", {}).get("commitId")
             if merged_commit and merged_commit.lower() == commit_id.lower():
-                return PullRequest(
-                    id=str(pr["pullRequestId"]),
-                    merged_at=pr.get("closedDate"),
-                    created_at=pr.get("creationDate"),
-                    source_ref_name=pr.get("sourceRefName"),
-                    target_ref_name=pr.get("targetRefName"),
-                    status=pr.get("mergeStatus"),
-                    last_merge_commit_id=merged_commit,
-                )
+                return _build_pull_request(pr)
     except (
         requests.RequestException,
         ValueError,
@@ -209,15 +382,382 @@ def find_pr_by_commit_id(
     return None
 
 
-def get_oldest_commit_from_pr(client, project_name, repo_id, pr_id):
-    """Get the first commit in a given pull request."""
-    endpoint = (
+def _index_pull_requests(index: Dict[str, PullRequest], page: List[dict]) -> None:
+    """Add a page of completed pull requests to ``index`` by merge commit."""
+    for pr in page:
+        merged_commit = pr.get("lastMergeCommit", {}).get("commitId")
+        if merged_commit:
+            index.setdefault(merged_commit.lower(), _build_pull_request(pr))
+
+
+class PullRequestIndex:
+    """Lookup of completed pull requests keyed by their merge commit.
+
+    The completed pull requests of each ``(repository_id, target_ref)`` pair
+    are paged through once, on first use, and kept for the lifetime of the
+    index so that every further lookup is a dictionary access.
+    """
+
+    def __init__(
+        self, client: AzureDevOpsClient, project_name: str, page_size: int = 100
+    ) -> None:
+        self.client = client
+        self.project_name = project_name
+        self.page_size = page_size
+        self._indexes: Dict[Tuple[str, str], Dict[str, PullRequest]] = {}
+
+    def find(
+        self, repository_id: str, commit_id: str, target_ref: str
+    ) -> Optional[PullRequest]:
+        """Return the completed pull request merged as ``commit_id``, if any."""
+        key = (repository_id, target_ref)
+        if key not in self._indexes:
+            self._indexes[key] = self._load(repository_id, target_ref)
+        return self._indexes[key].get(commit_id.lower())
+
+    def _load(self, repository_id: str, target_ref: str) -> Dict[str, PullRequest]:
+        """Page through all completed pull requests targeting ``target_ref``."""
+        endpoint = (
+            f"/{quote(self.project_name, safe='')}/_apis/git/repositories/"
+            f"{quote(repository_id, safe='')}/pullRequests"
+        )
+        index: Dict[str, PullRequest] = {}
+        skip = 0
+
+        try:
+            while True:
+                params = {
+                    "api-version": "7.1-preview.1",
+                    "searchCriteria.status": "completed",
+                    "searchCriteria.targetRefName": target_ref,
+                    "$top": self.page_size,
+                    "$skip": skip,
+                }
+                page = self.client.get(endpoint, params=params).get("value", [])
+                _index_pull_requests(index, page)
+
+                if len(page) < self.page_size:
+                    break
+                skip += len(page)
+        except (
+            requests.RequestException,
+            ValueError,
+            KeyError,
+            RuntimeError,
+        ) as error:
+            raise RuntimeError(
+                f"Error indexing pull requests for repository {repository_id}: {error}"
+            ) from error
+
+        logger.debug(
+            "Indexed %d completed pull requests for %s on %s",
+            len(index),
+            repository_id,
+            target_ref,
+        )
+        return index
+
+
+def _pull_request_query_endpoint(project_name: str, repository_id: str) -> str:
+    """Return the merge commit pull request query endpoint of a repository."""
+    return (
         f"/{quote(project_name, safe='')}/_apis/git/repositories/"
-        f"{quote(repo_id, safe='')}/pullRequests/{quote(pr_id, safe='')}/commits"
+        f"{quote(repository_id, safe='')}/pullrequestquery"
     )
-    params = {"api-version": "7.1-preview.1"}
-    response = client.get(endpoint, params=params)
 
+
+def _pull_request_query_body(commit_ids: List[str]) -> Dict[str, Any]:
+    """Return the query body looking pull requests up by their merge commits."""
+    return {"queries": [{"type": "lastMergeCommit", "items": commit_ids}]}
+
+
+def _pull_request_query_key(
+    project_name: str, repository_id: str, commit_id: str
+) -> str:
+    """Return the cache key endpoint of the query results of one merge commit."""
+    endpoint = _pull_request_query_endpoint(project_name, repository_id)
+    return f"{endpoint}/{quote(commit_id, safe='')}"
+
+
+def _cached_pull_requests(
+    client: Any,
+    project_name: str,
+    repository_id: str,
+    commit_ids: Iterable[str],
+    params: Dict[str, Any],
+) -> Tuple[Dict[str, List[PullRequest]], List[str]]:
+    """Return the query results served by the response cache and the ids to query."""
+    results: Dict[str, List[PullRequest]] = {}
+    pending: List[str] = []
+    for commit_id in dict.fromkeys(commit_id.lower() for commit_id in commit_ids):
+        cached = client.get_cached(
+            _pull_request_query_key(project_name, repository_id, commit_id), params
+        )
+        if cached is None:
+            pending.append(commit_id)
+            results[commit_id] = []
+        else:
+            results[commit_id] = [_build_pull_request(pr) for pr in cached["value"]]
+    return results, pending
+
+
+def _extract_query_results(
+    client: Any,
+    project_name: str,
+    repository_id: str,
+    chunk: List[str],
+    response: dict,
+    params: Dict[str, Any],
+    results: Dict[str, List[PullRequest]],
+) -> None:
+    """Add the completed pull requests of a query response to ``results``.
+
+    The pull requests of every commit of ``chunk``, possibly none, are also
+    stored in the response cache.
+    """
+    found: Dict[str, List[dict]] = {commit_id: [] for commit_id in chunk}
+    for result in response.get("results", []):
+        for commit_id, pull_requests in result.items():
+            matches = found.get(commit_id.lower())
+            if matches is None:
+                continue
+            matches.extend(
+                pr
+                for pr in pull_requests
+                if pr.get("status", "completed") == "completed"
+            )
+
+    for commit_id, pull_requests in found.items():
+        results[commit_id] = [_build_pull_request(pr) for pr in pull_requests]
+        client.set_cached(
+            _pull_request_query_key(project_name, repository_id, commit_id),
+            params,
+            {"value": pull_requests},
+        )
+
+
+def get_pull_requests_by_merge_commits(
+    client: AzureDevOpsClient,
+    project_name: str,
+    repository_id: str,
+    commit_ids: Iterable[str],
+    chunk_size: int = PR_QUERY_BATCH_SIZE,
+) -> Dict[str, List[PullRequest]]:
+    """Return the completed pull requests merged as each of ``commit_ids``.
+
+    Commits found in the response cache are served from it; the others are
+    resolved through the ``pullrequestquery`` endpoint with
+    ``lastMergeCommit`` queries of ``chunk_size`` ids, and cached one by one.
+    The result maps every requested id, lowercased, to its pull requests,
+    possibly none.
+    """
+    endpoint = _pull_request_query_endpoint(project_name, repository_id)
+    params = {"api-version": client.api_version}
+    results, pending = _cached_pull_requests(
+        client, project_name, repository_id, commit_ids, params
+    )
+
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start : start + chunk_size]
+        try:
+            response = client.post(
+                endpoint, json=_pull_request_query_body(chunk), params=params
+            )
+            _extract_query_results(
+                client, project_name, repository_id, chunk, response, params, results
+            )
+        except (requests.RequestException, ValueError, KeyError, RuntimeError) as error:
+            raise RuntimeError(
+                f"Error querying pull requests for repository {repository_id}: {error}"
+            ) from error
+
+    return results
+
+
+def _select_pull_request(
+    pull_requests: List[PullRequest], target_ref: str
+) -> Optional[PullRequest]:
+    """Return the first pull request that targeted ``target_ref``.
+
+    Git ref names are compared case-insensitively, as Azure DevOps does.
+    """
+    target = target_ref.lower()
+    for pr in pull_requests:
+        if (pr.target_ref_name or "").lower() == target:
+            return pr
+    return None
+
+
+def _warn_query_failed(repository_id: str, error: Exception) -> None:
+    """Log that a repository falls back to listing its pull requests."""
+    logger.warning(
+        "⚠️ Pull request query failed for repository %s, listing its pull requests "
+        "instead: %s",
+        repository_id,
+        error,
+    )
+
+
+class BatchedPullRequestResolver:
+    """Lookup of completed pull requests resolved in batches of merge commits.
+
+    :meth:`resolve` sends the commits of many artifacts to
+    :func:`get_pull_requests_by_merge_commits`, one query per repository and
+    chunk of commits, instead of listing every completed pull request of the
+    repository. Commits looked up without being resolved first, and
+    repositories whose query failed (for instance on a server without the
+    endpoint), fall back to a :class:`PullRequestIndex`. With ``query``
+    disabled, every lookup uses the index.
+    """
+
+    def __init__(
+        self,
+        client: AzureDevOpsClient,
+        project_name: str,
+        chunk_size: int = PR_QUERY_BATCH_SIZE,
+        query: bool = PR_QUERY_ENABLED,
+    ) -> None:
+        self.client = client
+        self.project_name = project_name
+        self.chunk_size = chunk_size
+        self.query = query
+        self.index = PullRequestIndex(client, project_name)
+        self._resolved: Dict[Tuple[str, str], List[PullRequest]] = {}
+        self._listed: Set[str] = set()
+
+    def resolve(self, artifacts: Iterable[Artifact]) -> None:
+        """Query the pull requests of the artifacts' commits not resolved yet."""
+        if not self.query:
+            return
+        for repository_id, commit_ids in self._pending(artifacts).items():
+            try:
+                resolved = get_pull_requests_by_merge_commits(
+                    self.client,
+                    self.project_name,
+                    repository_id,
+                    commit_ids,
+                    self.chunk_size,
+                )
+            except RuntimeError as error:
+                _warn_query_failed(repository_id, error)
+                self._listed.add(repository_id)
+                continue
+            for commit_id, pull_requests in resolved.items():
+                self._resolved[(repository_id, commit_id)] = pull_requests
+
+    def find(
+        self, repository_id: str, commit_id: str, target_ref: str
+    ) -> Optional[PullRequest]:
+        """Return the completed pull request merged as ``commit_id``, if any."""
+        pull_requests = self._resolved.get((repository_id, commit_id.lower()))
+        if pull_requests is None:
+            return self.index.find(repository_id, commit_id, target_ref)
+        return _select_pull_request(pull_requests, target_ref)
+
+    def _pending(self, artifacts: Iterable[Artifact]) -> Dict[str, List[str]]:
+        """Return the commits still to query, per repository."""
+        pending: Dict[str, List[str]] = {}
+        for artifact in artifacts:
+            repository_id = artifact.repository_id
+            key = (repository_id, artifact.commit_id.lower())
+            if repository_id not in self._listed and key not in self._resolved:
+                pending.setdefault(repository_id, []).append(artifact.commit_id)
+        return pending
+
+
+_OLDEST_COMMITS: "OrderedDict[Tuple[str, str], Tuple[str, str]]" = OrderedDict()
+_OLDEST_COMMITS_LOCK = threading.Lock()
+
+
+def _remembered_oldest_commit(repo_id: str, pr_id: Any) -> Optional[Tuple[str, str]]:
+    """Return the memoized oldest commit of a pull request, if any."""
+    key = (repo_id, str(pr_id))
+    with _OLDEST_COMMITS_LOCK:
+        oldest = _OLDEST_COMMITS.get(key)
+        if oldest is not None:
+            _OLDEST_COMMITS.move_to_end(key)
+        return oldest
+
+
+def _remember_oldest_commit(repo_id: str, pr_id: Any, oldest: Tuple[str, str]) -> None:
+    """Memoize the oldest commit of a completed, hence immutable, pull request."""
+    with _OLDEST_COMMITS_LOCK:
+        _OLDEST_COMMITS[(repo_id, str(pr_id))] = oldest
+        while len(_OLDEST_COMMITS) > OLDEST_COMMIT_MEMO_SIZE:
+            _OLDEST_COMMITS.popitem(last=False)
+
+
+def clear_oldest_commits() -> None:
+    """Forget every memoized oldest commit."""
+    with _OLDEST_COMMITS_LOCK:
+        _OLDEST_COMMITS.clear()
+
+
+def _pr_commits_endpoint(project_name: str, repo_id: str, pr_id: Any) -> str:
+    """Return the commit listing endpoint of a pull request."""
+    return (
+        f"/{quote(project_name, safe='')}/_apis/git/repositories/"
+        f"{quote(repo_id, safe='')}/pullRequests/{quote(str(pr_id), safe='')}/commits"
+    )
+
+
+def _pr_commits_params(skip: int, page_size: int) -> Dict[str, Any]:
+    """Return the query of one page of a pull request commit listing."""
+    return {"api-version": "7.1-preview.1", "$top": page_size, "$skip": skip}
+
+
+def _next_pr_commits_page(
+    page: dict, skip: int, page_size: int, previous_first: Optional[str]
+) -> Tuple[Optional[int], Optional[str]]:
+    """Return the ``$skip`` of the page after ``page`` and its first commit id.
+
+    The skip is ``None`` at the end of the listing: on a short page, and also
+    when the server ignores the paging parameters and returns more than
+    ``page_size`` commits or the same page again.
+    """
+    commits = page.get("value", [])
+    if len(commits) != page_size:
+        return None, None
+    first = commits[0].get("commitId")
+    if first == previous_first:
+        return None, None
+    return skip + page_size, first
+
+
+def get_oldest_commit_from_pr(
+    client: AzureDevOpsClient,
+    project_name: str,
+    repo_id: str,
+    pr_id: Any,
+    page_size: int = PR_COMMITS_PAGE_SIZE,
+) -> Optional[Tuple[str, str]]:
+    """Get the first commit in a given pull request.
+
+    Commits are listed newest first, so the listing is paged with
+    ``$top``/``$skip`` up to its end, keeping only the tail of the last page.
+    Results are memoized per ``(repo_id, pr_id)``.
+    """
+    oldest = _remembered_oldest_commit(repo_id, pr_id)
+    if oldest is not None:
+        return oldest
+
+    endpoint = _pr_commits_endpoint(project_name, repo_id, pr_id)
+    skip: Optional[int] = 0
+    previous_first: Optional[str] = None
+    while skip is not None:
+        page = client.get(endpoint, params=_pr_commits_params(skip, page_size))
+        oldest = _extract_oldest_commit(page) or oldest
+        skip, previous_first = _next_pr_commits_page(
+            page, skip, page_size, previous_first
+        )
+
+    if oldest is not None:
+        _remember_oldest_commit(repo_id, pr_id, oldest)
+    return oldest
+
+
+def _extract_oldest_commit(response: dict) -> Optional[Tuple[str, str]]:
+    """Return the id and date of the oldest commit of a PR commit listing."""
     commits = response.get("value", [])
     if not commits:
         return None
@@ -5,32 +5,57 @@
 from __future__ import annotations
 
 import base64
-from typing import Any, Dict, Optional
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Tuple
 
 import requests
 
 import config
-from azure_http import get_retry_session
+from azure_devops.decoding import decode_json, iter_array_items
+from azure_devops.metrics import RequestMetrics, get_shared_metrics
+from azure_http import AdaptiveThrottler, get_shared_session, get_shared_throttler
+
+if TYPE_CHECKING:  # pragma: no cover
+    from azure_devops.cache import ResponseCache
+    from azure_devops.cassette import Cassette
+
+CONTINUATION_TOKEN_HEADER = "x-ms-continuationtoken"
+# Statuses retried once the throttler has waited for their Retry-After.
+THROTTLED_STATUSES = frozenset({429, 503})
 
 
 class AzureDevOpsClient:
     """Simple wrapper to perform authenticated HTTP requests."""
 
-    def __init__(self, base_url: str, api_version: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        api_version: str,
+        cache: Optional[ResponseCache] = None,
+        throttler: Optional[AdaptiveThrottler] = None,
+        metrics: Optional[RequestMetrics] = None,
+        cassette: Optional[Cassette] = None,
+    ) -> None:
         self.base_url = base_url
         self.api_version = api_version
+        self.cache = cache
+        self.throttler = throttler or get_shared_throttler()
+        self.metrics = metrics or get_shared_metrics()
+        self.cassette = cassette
         self.session = self._create_session()
 
     def _create_session(self) -> requests.Session:
-        """Configure an HTTP session with authentication headers."""
+        """Configure the shared HTTP session of the host with authentication headers.
 
-        if not config.PAT_TOKEN:
+        A client replaying a cassette never reaches the network and does not
+        need a PAT.
+        """
+
+        replaying = self.cassette is not None and self.cassette.replaying
+        if not config.PAT_TOKEN and not replaying:
             raise ValueError("PAT_TOKEN is not set in the environment variables.")
 
-        session = get_retry_session(
-            retries=config.RETRY_TOTAL,
-            backoff_factor=config.RETRY_BACKOFF_FACTOR,
-        )
+        session = get_shared_session(self.base_url)
         pat_bytes = f":{config.PAT_TOKEN}".encode("utf-8")
         pat_token = base64.b64encode(pat_bytes).decode("utf-8")
         session.headers.update(
@@ -44,17 +69,152 @@ class AzureDevOpsClient:
         """Send a GET request and return the parsed JSON response.
 
         Applies the default timeout defined in :mod:`config` and raises a
-        :class:`RuntimeError` if a network issue occurs.
+        :class:`RuntimeError` if a network issue occurs. Responses of immutable
+        resources are served from and stored in the optional response cache.
+        """
+        cached = self.get_cached(endpoint, params)
+        if cached is not None:
+            return cached
+
+        data = decode_json(self._send(endpoint, params).content)
+        self.set_cached(endpoint, params, data)
+        return data
+
+    def get_cached(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Optional[Any]:
+        """Return the cached response of a GET request, or ``None`` on a miss.
+
+        Batch helpers use it to serve the items they stored with
+        :meth:`set_cached` before querying the others.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get(f"{self.base_url}{endpoint}", params)
+
+    def set_cached(
+        self, endpoint: str, params: Optional[Dict[str, Any]], data: Any
+    ) -> None:
+        """Store ``data`` as the response of a GET request, if it is cacheable."""
+        if self.cache is not None:
+            self.cache.set(f"{self.base_url}{endpoint}", params, data)
+
+    def get_page(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Send a GET request and return the JSON body with its continuation token.
+
+        The token is read from the ``x-ms-continuationtoken`` response header
+        and is ``None`` once the last page has been reached.
+        """
+        response = self._send(endpoint, params)
+        return decode_json(response.content), response.headers.get(
+            CONTINUATION_TOKEN_HEADER
+        )
+
+    def get_page_items(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None, key: str = "value"
+    ) -> Tuple[Iterator[Any], Optional[str]]:
+        """Send a GET request and return its ``key`` items with the continuation token.
+
+        Items are decoded lazily one at a time while the iterator is consumed,
+        which keeps large listings such as expanded releases out of memory.
+        """
+        response = self._send(endpoint, params)
+        items = iter_array_items(response.content.decode("utf-8"), key)
+        return items, response.headers.get(CONTINUATION_TOKEN_HEADER)
+
+    def post(
+        self,
+        endpoint: str,
+        json: Any,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Send a POST request with a JSON body and return the parsed response.
+
+        Used by query endpoints such as ``commitsbatch``. Their responses are
+        not cached as a whole; callers store each returned item under its own
+        key with :meth:`set_cached`.
+        """
+        return decode_json(
+            self._send(endpoint, params, method="POST", json=json).content
+        )
+
+    def _send(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        method: str = "GET",
+        json: Any = None,
+    ) -> requests.Response:
+        """Perform the request, record its metrics and raise on HTTP errors.
+
+        ``429`` and ``503`` responses carrying ``Retry-After`` are retried up
+        to ``RETRY_TOTAL`` times once the throttler has waited for them. With
+        a cassette, responses are either recorded to it or replayed from it
+        without any network access.
         """
         url = f"{self.base_url}{endpoint}"
-        try:
-            response = self.session.get(
-                url,
-                params=params,
-                timeout=config.DEFAULT_REQUEST_TIMEOUT,
+        if self.cassette is not None and self.cassette.replaying:
+            started = time.perf_counter()
+            response = self.cassette.replay(method, url, params, json)
+            self.metrics.record(
+                method,
+                endpoint,
+                time.perf_counter() - started,
+                status=response.status_code,
+                bytes_received=len(response.content),
+            )
+            response.raise_for_status()
+            return response
+
+        send = self.session.post if method == "POST" else self.session.get
+        body = {"json": json} if method == "POST" else {}
+        for attempt in range(config.RETRY_TOTAL + 1):
+            self.throttler.acquire()
+            started = time.perf_counter()
+            try:
+                response = send(
+                    url,
+                    params=params,
+                    timeout=config.DEFAULT_REQUEST_TIMEOUT,
+                    **body,
+                )
+            except requests.RequestException as err:
+                self.metrics.record(method, endpoint, time.perf_counter() - started)
+                raise RuntimeError(
+                    f"Network error while requesting {url}: {err}"
+                ) from err
+
+            self.metrics.record(
+                method,
+                endpoint,
+                time.perf_counter() - started,
+                status=response.status_code,
+                bytes_received=len(response.content),
+                # Each attempt after the first retries a throttled response.
+                retries=_retry_count(response) + (1 if attempt else 0),
             )
-        except requests.RequestException as err:
-            raise RuntimeError(f"Network error while requesting {url}: {err}") from err
+            # The throttler owns Retry-After: it pauses every caller, this
+            # request included, before the next attempt.
+            self.throttler.observe(response.headers)
+            if attempt == config.RETRY_TOTAL or not _is_throttled(response):
+                break
 
+        if self.cassette is not None:
+            self.cassette.record(method, url, params, json, response)
         response.raise_for_status()
-        return response.json()
+        return response
+
+
+def _is_throttled(response: requests.Response) -> bool:
+    """Return whether ``response`` asks to retry the request after a delay."""
+    return (
+        response.status_code in THROTTLED_STATUSES and "Retry-After" in response.headers
+    )
+
+
+def _retry_count(response: requests.Response) -> int:
+    """Return how many retries urllib3 performed before ``response``."""
+    retries = getattr(response.raw, "retries", None)
+    return len(getattr(retries, "history", None) or ())
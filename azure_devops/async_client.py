@@ -0,0 +1,69 @@
+"""Asyncio front-end for :class:`AzureDevOpsClient`."""
+
+# pylint: disable=too-few-public-methods
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+
+import config
+from azure_devops.api_client import AzureDevOpsClient
+
+
+class AsyncAzureDevOpsClient:
+    """Awaitable wrapper running requests of a synchronous client in threads.
+
+    The wrapped client keeps its authenticated retry session; each request is
+    offloaded with :func:`asyncio.to_thread` and a semaphore caps how many of
+    them are in flight at once.
+    """
+
+    def __init__(
+        self,
+        client: AzureDevOpsClient,
+        max_concurrency: int = config.ASYNC_CONCURRENCY,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        self.client = client
+        self.api_version = client.api_version
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def get(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Send a GET request and return the parsed JSON response."""
+        async with self._semaphore:
+            return await asyncio.to_thread(self.client.get, endpoint, params)
+
+    async def get_page(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Send a GET request and return the JSON body with its continuation token."""
+        async with self._semaphore:
+            return await asyncio.to_thread(self.client.get_page, endpoint, params)
+
+    async def post(
+        self,
+        endpoint: str,
+        json: Any,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Send a POST request with a JSON body and return the parsed response."""
+        async with self._semaphore:
+            return await asyncio.to_thread(self.client.post, endpoint, json, params)
+
+    def get_cached(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Optional[Any]:
+        """Return the cached response of a GET request, or ``None`` on a miss."""
+        return self.client.get_cached(endpoint, params)
+
+    def set_cached(
+        self, endpoint: str, params: Optional[Dict[str, Any]], data: Any
+    ) -> None:
+        """Store ``data`` as the response of a GET request, if it is cacheable."""
+        self.client.set_cached(endpoint, params, data)
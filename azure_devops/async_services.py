@@ -0,0 +1,374 @@
+"""Asyncio counterparts of the helpers in :mod:`azure_devops.ado_services`.
+
+Endpoints, parameters and payload parsing are identical to the synchronous
+helpers; only the transport is awaited through
+:class:`~azure_devops.async_client.AsyncAzureDevOpsClient`.
+"""
+
+# pylint: disable=protected-access
+
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+
+from azure_devops import ado_services
+from azure_devops.async_client import AsyncAzureDevOpsClient
+from azure_devops.models import Artifact, PullRequest, ReleaseEnvironment
+from config import PR_QUERY_BATCH_SIZE, PR_QUERY_ENABLED
+
+
+async def get_project_id(client: AsyncAzureDevOpsClient, project_name: str) -> str:
+    """Return the project identifier for the given project name."""
+    params = {"api-version": client.api_version}
+    data = await client.get("/_apis/projects", params=params)
+
+    for project in data.get("value", []):
+        if project.get("name") == project_name:
+            return project.get("id")
+
+    raise ValueError(f"Project named '{project_name}' not found.")
+
+
+async def get_release_definition_id(
+    client: AsyncAzureDevOpsClient, project_id: str, definition_name: str
+) -> int:
+    """Return the release definition identifier matching the given name."""
+    endpoint = f"/{quote(project_id, safe='')}/_apis/release/definitions"
+    params = {"api-version": client.api_version, "searchText": definition_name}
+    data = await client.get(endpoint, params=params)
+
+    for definition in data.get("value", []):
+        if definition.get("name") == definition_name:
+            return definition.get("id")
+
+    raise ValueError(f"Release definition '{definition_name}' not found.")
+
+
+async def iter_active_release_environments(
+    client: AsyncAzureDevOpsClient,
+    project_id: str,
+    definition_id: int,
+    min_created_time: Optional[str] = None,
+    max_created_time: Optional[str] = None,
+    page_size: int = 100,
+) -> AsyncIterator[ReleaseEnvironment]:
+    """Yield successfully deployed release environments page by page."""
+    endpoint = f"/{quote(project_id, safe='')}/_apis/release/releases"
+    params = {
+        "api-version": client.api_version,
+        "queryOrder": "descending",
+        "$expand": "environments,artifacts",
+        "definitionId": definition_id,
+        "$top": page_size,
+    }
+    if min_created_time:
+        params["minCreatedTime"] = min_created_time
+    if max_created_time:
+        params["maxCreatedTime"] = max_created_time
+
+    while True:
+        releases, continuation_token = await client.get_page(endpoint, params=params)
+        for release in releases.get("value", []):
+            for environment in ado_services._extract_release_environments(release):
+                yield environment
+
+        if not continuation_token:
+            return
+        params = {**params, "continuationToken": continuation_token}
+
+
+async def get_all_artifact_metadata(
+    client: AsyncAzureDevOpsClient, project_name: str, release_id: int
+) -> List[Artifact]:
+    """Extract all relevant metadata for each artifact in a given release."""
+    endpoint = f"/{quote(project_name, safe='')}/_apis/release/releases/{quote(str(release_id), safe='')}"
+    params = {"api-version": client.api_version}
+
+    release_data = await client.get(endpoint, params=params)
+    return ado_services._extract_artifacts(release_data, release_id)
+
+
+async def get_commit_dates(
+    client: AsyncAzureDevOpsClient,
+    project_name: str,
+    repository_id: str,
+    commit_ids: Iterable[str],
+    chunk_size: int = 100,
+) -> Dict[str, Optional[str]]:
+    """Return the committer date of many commits, chunks being sent concurrently.
+
+    Like :func:`azure_devops.ado_services.get_commit_dates`, cached commits
+    are served first and queried ones are cached one by one.
+    """
+    endpoint = ado_services._commits_batch_endpoint(project_name, repository_id)
+    params = {"api-version": client.api_version}
+    results, pending = ado_services._cached_commit_dates(
+        client, project_name, repository_id, commit_ids, params
+    )
+    chunks = [
+        pending[start : start + chunk_size]
+        for start in range(0, len(pending), chunk_size)
+    ]
+
+    try:
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    endpoint, json={"ids": chunk, "$top": len(chunk)}, params=params
+                )
+                for chunk in chunks
+            )
+        )
+    except (requests.RequestException, ValueError, RuntimeError) as error:
+        raise RuntimeError(
+            f"Error retrieving commit dates for repository {repository_id}: {error}"
+        ) from error
+
+    for response in responses:
+        ado_services._store_commit_dates(
+            client, project_name, repository_id, response, params, results
+        )
+
+    return results
+
+
+# In-flight oldest commit lookups, shared by concurrent callers of a loop.
+_OLDEST_COMMIT_TASKS: Dict[
+    Tuple[asyncio.AbstractEventLoop, str, str],
+    "asyncio.Task[Optional[Tuple[str, str]]]",
+] = {}
+
+
+async def get_oldest_commit_from_pr(
+    client: AsyncAzureDevOpsClient,
+    project_name: str,
+    repo_id: str,
+    pr_id: str,
+    page_size: int = ado_services.PR_COMMITS_PAGE_SIZE,
+) -> Optional[Tuple[str, str]]:
+    """Get the first commit in a given pull request, paging to the tail.
+
+    Concurrent lookups of the same pull request share a single paging task,
+    as :class:`PullRequestIndex` does for its listings.
+    """
+    oldest = ado_services._remembered_oldest_commit(repo_id, pr_id)
+    if oldest is not None:
+        return oldest
+
+    key = (asyncio.get_running_loop(), repo_id, str(pr_id))
+    task = _OLDEST_COMMIT_TASKS.get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _page_oldest_commit(client, project_name, repo_id, pr_id, page_size)
+        )
+        _OLDEST_COMMIT_TASKS[key] = task
+        task.add_done_callback(lambda _: _OLDEST_COMMIT_TASKS.pop(key, None))
+    return await task
+
+
+async def _page_oldest_commit(
+    client: AsyncAzureDevOpsClient,
+    project_name: str,
+    repo_id: str,
+    pr_id: str,
+    page_size: int,
+) -> Optional[Tuple[str, str]]:
+    """Page the commits of a pull request and memoize the oldest one."""
+    endpoint = ado_services._pr_commits_endpoint(project_name, repo_id, pr_id)
+    oldest: Optional[Tuple[str, str]] = None
+    skip: Optional[int] = 0
+    previous_first: Optional[str] = None
+    while skip is not None:
+        page = await client.get(
+            endpoint, params=ado_services._pr_commits_params(skip, page_size)
+        )
+        oldest = ado_services._extract_oldest_commit(page) or oldest
+        skip, previous_first = ado_services._next_pr_commits_page(
+            page, skip, page_size, previous_first
+        )
+
+    if oldest is not None:
+        ado_services._remember_oldest_commit(repo_id, pr_id, oldest)
+    return oldest
+
+
+class PullRequestIndex:
+    """Awaitable variant of :class:`azure_devops.ado_services.PullRequestIndex`.
+
+    Concurrent lookups for the same ``(repository_id, target_ref)`` pair share
+    a single loading task, so each pair is still listed only once per run.
+    """
+
+    def __init__(
+        self,
+        client: AsyncAzureDevOpsClient,
+        project_name: str,
+        page_size: int = 100,
+    ) -> None:
+        self.client = client
+        self.project_name = project_name
+        self.page_size = page_size
+        self._indexes: Dict[
+            Tuple[str, str], "asyncio.Task[Dict[str, PullRequest]]"
+        ] = {}
+
+    async def find(
+        self, repository_id: str, commit_id: str, target_ref: str
+    ) -> Optional[PullRequest]:
+        """Return the completed pull request merged as ``commit_id``, if any."""
+        key = (repository_id, target_ref)
+        if key not in self._indexes:
+            self._indexes[key] = asyncio.ensure_future(
+                self._load(repository_id, target_ref)
+            )
+        index = await self._indexes[key]
+        return index.get(commit_id.lower())
+
+    async def _load(
+        self, repository_id: str, target_ref: str
+    ) -> Dict[str, PullRequest]:
+        """Page through all completed pull requests targeting ``target_ref``."""
+        endpoint = (
+            f"/{quote(self.project_name, safe='')}/_apis/git/repositories/"
+            f"{quote(repository_id, safe='')}/pullRequests"
+        )
+        index: Dict[str, PullRequest] = {}
+        skip = 0
+
+        try:
+            while True:
+                params = {
+                    "api-version": "7.1-preview.1",
+                    "searchCriteria.status": "completed",
+                    "searchCriteria.targetRefName": target_ref,
+                    "$top": self.page_size,
+                    "$skip": skip,
+                }
+                response = await self.client.get(endpoint, params=params)
+                page = response.get("value", [])
+                ado_services._index_pull_requests(index, page)
+
+                if len(page) < self.page_size:
+                    break
+                skip += len(page)
+        except (
+            requests.RequestException,
+            ValueError,
+            KeyError,
+            RuntimeError,
+        ) as error:
+            raise RuntimeError(
+                f"Error indexing pull requests for repository {repository_id}: {error}"
+            ) from error
+
+        return index
+
+
+async def get_pull_requests_by_merge_commits(
+    client: AsyncAzureDevOpsClient,
+    project_name: str,
+    repository_id: str,
+    commit_ids: Iterable[str],
+    chunk_size: int = PR_QUERY_BATCH_SIZE,
+) -> Dict[str, List[PullRequest]]:
+    """Return the pull requests merged as each commit, chunks being sent concurrently."""
+    endpoint = ado_services._pull_request_query_endpoint(project_name, repository_id)
+    params = {"api-version": client.api_version}
+    results, pending = ado_services._cached_pull_requests(
+        client, project_name, repository_id, commit_ids, params
+    )
+    chunks = [
+        pending[start : start + chunk_size]
+        for start in range(0, len(pending), chunk_size)
+    ]
+
+    try:
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    endpoint,
+                    json=ado_services._pull_request_query_body(chunk),
+                    params=params,
+                )
+                for chunk in chunks
+            )
+        )
+        for chunk, response in zip(chunks, responses):
+            ado_services._extract_query_results(
+                client, project_name, repository_id, chunk, response, params, results
+            )
+    except (requests.RequestException, ValueError, KeyError, RuntimeError) as error:
+        raise RuntimeError(
+            f"Error querying pull requests for repository {repository_id}: {error}"
+        ) from error
+
+    return results
+
+
+class BatchedPullRequestResolver:
+    """Awaitable variant of :class:`azure_devops.ado_services.BatchedPullRequestResolver`.
+
+    :meth:`resolve` starts one query task per repository, and lookups await
+    the tasks of their repository only, overlapping the other queries.
+    """
+
+    def __init__(
+        self,
+        client: AsyncAzureDevOpsClient,
+        project_name: str,
+        chunk_size: int = PR_QUERY_BATCH_SIZE,
+        query: bool = PR_QUERY_ENABLED,
+    ) -> None:
+        self.client = client
+        self.project_name = project_name
+        self.chunk_size = chunk_size
+        self.query = query
+        self.index = PullRequestIndex(client, project_name)
+        self._queries: Dict[
+            str, List["asyncio.Task[Optional[Dict[str, List[PullRequest]]]]"]
+        ] = {}
+
+    def resolve(self, artifacts: Iterable[Artifact]) -> None:
+        """Start querying the pull requests of the artifacts' commits."""
+        if not self.query:
+            return
+        grouped: Dict[str, List[str]] = {}
+        for artifact in artifacts:
+            grouped.setdefault(artifact.repository_id, []).append(artifact.commit_id)
+        for repository_id, commit_ids in grouped.items():
+            self._queries.setdefault(repository_id, []).append(
+                asyncio.ensure_future(self._query(repository_id, commit_ids))
+            )
+
+    async def find(
+        self, repository_id: str, commit_id: str, target_ref: str
+    ) -> Optional[PullRequest]:
+        """Return the completed pull request merged as ``commit_id``, if any."""
+        for query in self._queries.get(repository_id, []):
+            resolved = await query
+            if resolved is None:
+                break
+            pull_requests = resolved.get(commit_id.lower())
+            if pull_requests is not None:
+                return ado_services._select_pull_request(pull_requests, target_ref)
+        return await self.index.find(repository_id, commit_id, target_ref)
+
+    async def _query(
+        self, repository_id: str, commit_ids: List[str]
+    ) -> Optional[Dict[str, List[PullRequest]]]:
+        """Query ``commit_ids``, returning ``None`` when the listing must be used."""
+        try:
+            return await get_pull_requests_by_merge_commits(
+                self.client,
+                self.project_name,
+                repository_id,
+                commit_ids,
+                self.chunk_size,
+            )
+        except RuntimeError as error:
+            ado_services._warn_query_failed(repository_id, error)
+            return None
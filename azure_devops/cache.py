@@ -0,0 +1,207 @@
+"""SQLite-backed cache for immutable Azure DevOps responses."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlencode, urlsplit
+
+import config
+
+# Endpoint classes whose responses never change once they exist. Batch query
+# results are stored per item, commits under their own endpoint and merge
+# commit pull request queries under ``pullrequestquery/<commit id>``.
+ENDPOINT_CLASSES = {
+    "commit": re.compile(r"/_apis/git/repositories/[^/]+/commits/[^/]+$"),
+    "pull_request_commits": re.compile(
+        r"/_apis/git/repositories/[^/]+/pullRequests/[^/]+/commits$"
+    ),
+    "pull_request_query": re.compile(
+        r"/_apis/git/repositories/[^/]+/pullrequestquery/[^/]+$"
+    ),
+    "release": re.compile(r"/_apis/release/releases/[^/]+$"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint_class TEXT NOT NULL,
+    body TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses BEGIN
+    UPDATE totals SET size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses
+BEGIN
+    UPDATE totals SET size = size + NEW.size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses BEGIN
+    UPDATE totals SET size = size - OLD.size;
+END;
+"""
+
+# Replaces a stored response in place, so that the update trigger keeps the
+# total size right (``INSERT OR REPLACE`` does not fire delete triggers).
+_UPSERT = """
+INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    endpoint_class = excluded.endpoint_class,
+    body = excluded.body,
+    size = excluded.size,
+    created_at = excluded.created_at,
+    accessed_at = excluded.accessed_at
+"""
+
+
+def classify_endpoint(url: str) -> Optional[str]:
+    """Return the cacheable endpoint class of ``url``, or ``None``."""
+    path = urlsplit(url).path
+    for name, pattern in ENDPOINT_CLASSES.items():
+        if pattern.search(path):
+            return name
+    return None
+
+
+def cache_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    """Return a stable key for a URL and its query parameters."""
+    parts = urlsplit(url)
+    normalized = (
+        f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path}"
+        f"?{urlencode(sorted((params or {}).items()))}"
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of JSON responses stored in SQLite.
+
+    Only URLs matching :data:`ENDPOINT_CLASSES` are stored. Each class has its
+    own time-to-live and the least recently read entries are evicted once the
+    stored bodies exceed ``max_bytes``. The database is opened in WAL mode so
+    that several processes, such as backfill workers, can share it.
+
+    The total size of the bodies is maintained by triggers, and the read
+    times of hits are buffered until the next :meth:`set` or :meth:`close`,
+    so that serving a hit does not write to the database.
+    """
+
+    def __init__(
+        self,
+        path: str = config.CACHE_PATH,
+        max_bytes: int = config.CACHE_MAX_BYTES,
+        ttls: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(config.CACHE_TTL_SECONDS if ttls is None else ttls)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(
+            path, timeout=config.CACHE_BUSY_TIMEOUT, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+
+    def get(self, url: str, params: Optional[Mapping[str, Any]] = None) -> Any:
+        """Return the cached body of a request, or ``None`` on a miss."""
+        ttl = self.ttls.get(classify_endpoint(url) or "")
+        if not ttl:
+            return None
+
+        key = cache_key(url, params)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] + ttl < now:
+                if row is not None:
+                    self._connection.execute(
+                        "DELETE FROM responses WHERE key = ?", (key,)
+                    )
+                    self._connection.commit()
+                self.misses += 1
+                return None
+
+            self._accessed[key] = now
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, url: str, params: Optional[Mapping[str, Any]], payload: Any) -> None:
+        """Store the body of a request if its endpoint class is cacheable."""
+        endpoint_class = classify_endpoint(url)
+        if not self.ttls.get(endpoint_class or ""):
+            return
+
+        body = json.dumps(payload, separators=(",", ":"))
+        now = time.time()
+        key = cache_key(url, params)
+        with self._lock:
+            self._accessed.pop(key, None)
+            self._flush_accessed()
+            self._connection.execute(
+                _UPSERT, (key, endpoint_class, body, len(body), now, now)
+            )
+            self._evict()
+            self._connection.commit()
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._accessed.clear()
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Store the buffered read times and close the database connection."""
+        with self._lock:
+            self._flush_accessed()
+            self._connection.commit()
+            self._connection.close()
+
+    def _flush_accessed(self) -> None:
+        """Write the read times buffered by :meth:`get`."""
+        if self._accessed:
+            self._connection.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(now, key) for key, now in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def _evict(self) -> None:
+        """Drop least recently read entries until the cache fits ``max_bytes``."""
+        (total,) = self._connection.execute("SELECT size FROM totals").fetchone()
+        if total <= self.max_bytes:
+            return
+
+        rows = self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        )
+        expired = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", expired)
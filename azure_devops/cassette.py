@@ -0,0 +1,162 @@
+"""Record and replay of Azure DevOps HTTP interactions."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, List, Mapping, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+RECORD = "record"
+REPLAY = "replay"
+CASSETTE_VERSION = 1
+
+# Response headers the client reads and that a replay must restore.
+RECORDED_HEADERS = ("content-type", "x-ms-continuationtoken")
+
+
+def _request_key(
+    method: str, url: str, params: Optional[Mapping[str, Any]], body: Any
+) -> str:
+    return json.dumps(
+        [method, url, sorted((params or {}).items()), body],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+
+
+class Cassette:
+    """Gzipped NDJSON file of request/response pairs.
+
+    In ``record`` mode every response received by a client is appended to the
+    file as it arrives. In ``replay`` mode the file is loaded once and
+    requests are answered from it, identical requests getting their recorded
+    responses in order. The header line stores when the recording started so
+    that replayed runs can reuse it as their collection time.
+    """
+
+    def __init__(self, path: str, mode: str) -> None:
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode '{mode}'.")
+
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._replayed: Dict[str, int] = {}
+        self._stream: Optional[IO[str]] = None
+
+        if mode == RECORD:
+            self.recorded_at = datetime.now(tz=timezone.utc).isoformat()
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._stream = gzip.open(path, "wt", encoding="utf-8")
+            self._write_line(
+                {"version": CASSETTE_VERSION, "recorded_at": self.recorded_at}
+            )
+        else:
+            self.recorded_at = self._load()
+
+    @property
+    def replaying(self) -> bool:
+        """Return whether requests are served from the cassette."""
+        return self.mode == REPLAY
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        body: Any,
+        response: requests.Response,
+    ) -> None:
+        """Append ``response`` to the cassette."""
+        headers = {
+            name: response.headers[name]
+            for name in RECORDED_HEADERS
+            if name in response.headers
+        }
+        with self._lock:
+            self._write_line(
+                {
+                    "request": [method, url, sorted((params or {}).items()), body],
+                    "status": response.status_code,
+                    "headers": headers,
+                    "body": response.text,
+                }
+            )
+
+    def replay(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        body: Any,
+    ) -> requests.Response:
+        """Return the recorded response of a request.
+
+        Raises :class:`RuntimeError` when the request was not recorded.
+        """
+        key = _request_key(method, url, params, body)
+        with self._lock:
+            interactions = self._interactions.get(key)
+            if not interactions:
+                raise RuntimeError(
+                    f"No response recorded in {self.path} for {method} {url} {params}"
+                )
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+            # Requests repeated more often than recorded get the last response.
+            interaction = interactions[min(index, len(interactions) - 1)]
+
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response.encoding = "utf-8"
+        response._content = interaction["body"].encode("utf-8")  # pylint: disable=protected-access
+        response.url = url
+        return response
+
+    def close(self) -> None:
+        """Flush and close a cassette being recorded."""
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _write_line(self, data: Dict[str, Any]) -> None:
+        if self._stream is None:
+            raise RuntimeError(f"Cassette {self.path} is closed.")
+        self._stream.write(json.dumps(data, separators=(",", ":")) + "\n")
+
+    def _load(self) -> str:
+        """Index the recorded interactions and return the recording time."""
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+                header = json.loads(handle.readline())
+                if header.get("version") != CASSETTE_VERSION:
+                    raise ValueError(f"unsupported version {header.get('version')}")
+                recorded_at = header["recorded_at"]
+                for line in handle:
+                    interaction = json.loads(line)
+                    method, url, params, body = interaction["request"]
+                    key = _request_key(method, url, dict(params), body)
+                    self._interactions.setdefault(key, []).append(interaction)
+        except (OSError, KeyError, ValueError) as error:
+            raise ValueError(f"Invalid cassette {self.path}: {error}") from error
+        return recorded_at
+
+
+__all__ = ["Cassette", "RECORD", "REPLAY"]
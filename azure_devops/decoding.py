@@ -0,0 +1,96 @@
+"""JSON decoding of Azure DevOps responses."""
+
+from __future__ import annotations
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Union
+
+import config
+
+JSON_BACKENDS = ("auto", "orjson", "json")
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+@lru_cache(maxsize=None)
+def get_decoder(backend: str = "auto") -> Callable[[Union[bytes, str]], Any]:
+    """Return the ``loads`` function of a JSON backend.
+
+    ``auto`` picks orjson when it is installed and falls back to the standard
+    library otherwise; ``orjson`` requires it.
+    """
+    if backend not in JSON_BACKENDS:
+        raise ValueError(
+            f"Unknown JSON backend '{backend}', expected one of {', '.join(JSON_BACKENDS)}."
+        )
+    if backend == "json":
+        return json.loads
+
+    try:
+        import orjson  # pylint: disable=import-outside-toplevel
+    except ImportError as error:
+        if backend == "orjson":
+            raise RuntimeError(
+                "The orjson JSON backend requires orjson: pip install '.[speedups]'"
+            ) from error
+        return json.loads
+    return orjson.loads
+
+
+def decode_json(content: Union[bytes, str]) -> Any:
+    """Decode a response body with the backend selected by ``JSON_BACKEND``."""
+    return get_decoder(config.JSON_BACKEND)(content)
+
+
+def _skip_whitespace(text: str, index: int) -> int:
+    return _WHITESPACE.match(text, index).end()  # type: ignore[union-attr]
+
+
+def _expect(text: str, index: int, expected: str) -> int:
+    if text[index : index + 1] != expected:
+        raise json.JSONDecodeError(f"Expecting '{expected}'", text, index)
+    return _skip_whitespace(text, index + 1)
+
+
+def iter_array_items(text: str, key: str = "value") -> Iterator[Any]:
+    """Yield the items of the ``key`` array of a JSON object one at a time.
+
+    Only one item is decoded at a time, so a listing of large releases never
+    exists as a whole document tree. Other members of the object are skipped
+    and nothing is yielded when ``key`` is missing. Malformed documents raise
+    :class:`json.JSONDecodeError`.
+    """
+    decode = _DECODER.raw_decode
+    index = _expect(text, _skip_whitespace(text, 0), "{")
+    if text[index : index + 1] == "}":
+        return
+
+    while True:
+        if text[index : index + 1] != '"':
+            raise json.JSONDecodeError("Expecting property name", text, index)
+        name, index = decode(text, index)
+        index = _expect(text, _skip_whitespace(text, index), ":")
+
+        if name == key and text[index : index + 1] == "[":
+            index = _skip_whitespace(text, index + 1)
+            if text[index : index + 1] == "]":
+                return
+            while True:
+                item, index = decode(text, index)
+                yield item
+                index = _skip_whitespace(text, index)
+                if text[index : index + 1] == "]":
+                    return
+                index = _expect(text, index, ",")
+
+        _, index = decode(text, index)
+        index = _skip_whitespace(text, index)
+        if text[index : index + 1] == "}":
+            return
+        index = _expect(text, index, ",")
+
+
+__all__ = ["JSON_BACKENDS", "decode_json", "get_decoder", "iter_array_items"]
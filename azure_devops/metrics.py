@@ -0,0 +1,235 @@
+"""Per-endpoint request metrics of the Azure DevOps clients."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Path segments followed by an identifier, and the placeholder replacing it.
+_PLACEHOLDERS = {
+    "repositories": "{repositoryId}",
+    "commits": "{commitId}",
+    "pullRequests": "{pullRequestId}",
+    "releases": "{releaseId}",
+    "definitions": "{definitionId}",
+    "builds": "{buildId}",
+}
+
+_PROMETHEUS_PREFIX = "leadtime_azure_devops"
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Return ``endpoint`` with its project and resource identifiers templated.
+
+    ``/proj/_apis/git/repositories/abc/commits/123`` becomes
+    ``/{project}/_apis/git/repositories/{repositoryId}/commits/{commitId}``.
+    """
+    segments = endpoint.split("?", 1)[0].strip("/").split("/")
+    if "_apis" not in segments:
+        return "/" + "/".join(segments)
+
+    start = segments.index("_apis")
+    template = ["{project}"] if start else []
+    template.append("_apis")
+    previous = ""
+    for segment in segments[start + 1 :]:
+        template.append(_PLACEHOLDERS.get(previous, segment))
+        previous = segment if previous not in _PLACEHOLDERS else ""
+    return "/" + "/".join(template)
+
+
+@dataclass
+class EndpointMetrics:
+    """Counters and latency histogram of one endpoint template."""
+
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    bytes_received: int = 0
+    status_codes: Counter = field(default_factory=Counter)
+    latency_buckets: List[int] = field(
+        default_factory=lambda: [0] * len(LATENCY_BUCKETS)
+    )
+    latency_sum: float = 0.0
+    latency_max: float = 0.0
+
+    def observe_latency(self, seconds: float) -> None:
+        """Add one request duration to the histogram."""
+        self.latency_sum += seconds
+        self.latency_max = max(self.latency_max, seconds)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.latency_buckets[index] += 1
+                break
+
+    def copy(self) -> "EndpointMetrics":
+        """Return an independent copy of the metrics."""
+        return EndpointMetrics(
+            self.requests,
+            self.errors,
+            self.retries,
+            self.bytes_received,
+            Counter(self.status_codes),
+            list(self.latency_buckets),
+            self.latency_sum,
+            self.latency_max,
+        )
+
+
+class RequestMetrics:
+    """Thread-safe registry of request metrics keyed by method and endpoint.
+
+    Requests are grouped by ``"<METHOD> <endpoint template>"`` so that the
+    thousands of commit or pull request URLs of a run add up to one line each.
+    ``first_response_at`` is the :func:`time.perf_counter` value of the first
+    recorded request, to measure startup costs.
+    """
+
+    def __init__(self) -> None:
+        self._endpoints: Dict[str, EndpointMetrics] = {}
+        self._lock = threading.Lock()
+        self.first_response_at: Optional[float] = None
+
+    def record(
+        self,
+        method: str,
+        endpoint: str,
+        seconds: float,
+        status: Optional[int] = None,
+        bytes_received: int = 0,
+        retries: int = 0,
+    ) -> None:
+        """Record one request; ``status`` is ``None`` when no response came back."""
+        key = f"{method} {endpoint_template(endpoint)}"
+        with self._lock:
+            if self.first_response_at is None:
+                self.first_response_at = time.perf_counter()
+            metrics = self._endpoints.setdefault(key, EndpointMetrics())
+            metrics.requests += 1
+            metrics.retries += retries
+            metrics.bytes_received += bytes_received
+            metrics.status_codes[str(status) if status else "error"] += 1
+            if status is None or status >= 400:
+                metrics.errors += 1
+            metrics.observe_latency(seconds)
+
+    def snapshot(self) -> Dict[str, EndpointMetrics]:
+        """Return a copy of the metrics of every endpoint."""
+        with self._lock:
+            return {key: metrics.copy() for key, metrics in self._endpoints.items()}
+
+    def reset(self) -> None:
+        """Forget every recorded request."""
+        with self._lock:
+            self._endpoints.clear()
+            self.first_response_at = None
+
+    def summary(self) -> str:
+        """Return a text table of the endpoints, slowest in total first."""
+        endpoints = sorted(
+            self.snapshot().items(), key=lambda item: item[1].latency_sum, reverse=True
+        )
+        lines = [
+            f"{'endpoint':<72}{'requests':>9}{'errors':>7}{'retries':>8}"
+            f"{'KiB':>10}{'mean ms':>9}{'max ms':>9}  status"
+        ]
+        for key, metrics in endpoints:
+            statuses = ",".join(
+                f"{status}:{count}" for status, count in sorted(metrics.status_codes.items())
+            )
+            lines.append(
+                f"{key:<72}{metrics.requests:>9}{metrics.errors:>7}{metrics.retries:>8}"
+                f"{metrics.bytes_received / 1024:>10.1f}"
+                f"{metrics.latency_sum / metrics.requests * 1000:>9.1f}"
+                f"{metrics.latency_max * 1000:>9.1f}  {statuses}"
+            )
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        snapshot = sorted(self.snapshot().items())
+        lines: List[str] = []
+
+        def family(name: str, kind: str, description: str) -> None:
+            lines.append(f"# HELP {_PROMETHEUS_PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {_PROMETHEUS_PREFIX}_{name} {kind}")
+
+        family("requests_total", "counter", "Requests sent, by response status.")
+        for labels, metrics in _labelled(snapshot):
+            for status, count in sorted(metrics.status_codes.items()):
+                lines.append(
+                    f'{_PROMETHEUS_PREFIX}_requests_total{{{labels},status="{status}"}} {count}'
+                )
+
+        for name, attribute, description in (
+            ("retries_total", "retries", "Retries of failed or throttled requests."),
+            ("response_bytes_total", "bytes_received", "Response bytes received."),
+        ):
+            family(name, "counter", description)
+            for labels, metrics in _labelled(snapshot):
+                value = getattr(metrics, attribute)
+                lines.append(f"{_PROMETHEUS_PREFIX}_{name}{{{labels}}} {value}")
+
+        name = f"{_PROMETHEUS_PREFIX}_request_duration_seconds"
+        family("request_duration_seconds", "histogram", "Request latency.")
+        for labels, metrics in _labelled(snapshot):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, metrics.latency_buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {metrics.requests}')
+            lines.append(f"{name}_sum{{{labels}}} {metrics.latency_sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {metrics.requests}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically write the Prometheus textfile to ``path``."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            handle.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labelled(
+    snapshot: List[Tuple[str, EndpointMetrics]]
+) -> Iterator[Tuple[str, EndpointMetrics]]:
+    for key, metrics in snapshot:
+        method, template = key.split(" ", 1)
+        yield f'method="{method}",endpoint="{_escape(template)}"', metrics
+
+
+_SHARED_METRICS: Optional[RequestMetrics] = None
+_SHARED_METRICS_LOCK = threading.Lock()
+
+
+def get_shared_metrics() -> RequestMetrics:
+    """Return the process-wide metrics registry shared by every client."""
+    global _SHARED_METRICS  # pylint: disable=global-statement
+    with _SHARED_METRICS_LOCK:
+        if _SHARED_METRICS is None:
+            _SHARED_METRICS = RequestMetrics()
+        return _SHARED_METRICS
+
+
+__all__ = [
+    "EndpointMetrics",
+    "LATENCY_BUCKETS",
+    "RequestMetrics",
+    "endpoint_template",
+    "get_shared_metrics",
+]
@@ -1,14 +1,37 @@
-"""Data models used by the Azure DevOps service helpers."""
+"""Data models used by the Azure DevOps service helpers.
+
+Models are slotted, frozen and hashable. Low-cardinality strings such as
+names, statuses and refs are interned so that the many instances kept during
+large release windows share a single copy of each value.
+"""
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Optional, Tuple
+
+from azure_devops.timestamps import optional_epoch_us
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _intern_fields(instance: Any, names: Tuple[str, ...]) -> None:
+    for name in names:
+        object.__setattr__(instance, name, _intern(getattr(instance, name)))
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ReleaseEnvironment:
-    """A deployment environment for a given release."""
+    """A deployment environment for a given release.
+
+    ``artifacts`` holds the release artifacts when they were expanded in the
+    release listing, and ``None`` when they still have to be fetched. The
+    ``*_us`` fields are the timestamps parsed once into UTC epoch
+    microseconds, ``None`` for empty ones.
+    """
 
     environment_id: int
     environment_name: str
@@ -21,9 +44,28 @@ class ReleaseEnvironment:
     release_created_on: str
     release_modified_on: str
     definition_environment_id: int
+    artifacts: Optional[Tuple[Artifact, ...]] = None
+    environment_start_us: Optional[int] = field(init=False, repr=False, compare=False)
+    environment_finished_us: Optional[int] = field(
+        init=False, repr=False, compare=False
+    )
+    release_created_us: Optional[int] = field(init=False, repr=False, compare=False)
+    release_modified_us: Optional[int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        _intern_fields(
+            self, ("environment_name", "environment_status", "release_status")
+        )
+        for name, value in (
+            ("environment_start_us", self.environment_start_at),
+            ("environment_finished_us", self.environment_finished_at),
+            ("release_created_us", self.release_created_on),
+            ("release_modified_us", self.release_modified_on),
+        ):
+            object.__setattr__(self, name, optional_epoch_us(value))
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Artifact:
     """Metadata describing an artifact deployed in a release."""
 
@@ -38,10 +80,27 @@ class Artifact:
     build_id: int
     build_url: str
 
+    def __post_init__(self) -> None:
+        _intern_fields(
+            self,
+            (
+                "alias",
+                "branch_name",
+                "branch_id",
+                "repository_name",
+                "repository_id",
+                "definition_name",
+                "definition_id",
+            ),
+        )
+
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PullRequest:
-    """Essential information about a pull request."""
+    """Essential information about a pull request.
+
+    ``merged_us`` and ``created_us`` are the parsed UTC epoch microseconds.
+    """
 
     id: str
     merged_at: Optional[str]
@@ -50,6 +109,13 @@ class PullRequest:
     target_ref_name: str
     status: str
     last_merge_commit_id: str
+    merged_us: Optional[int] = field(init=False, repr=False, compare=False)
+    created_us: Optional[int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        _intern_fields(self, ("source_ref_name", "target_ref_name", "status"))
+        object.__setattr__(self, "merged_us", optional_epoch_us(self.merged_at))
+        object.__setattr__(self, "created_us", optional_epoch_us(self.created_at))
 
 
 __all__ = [
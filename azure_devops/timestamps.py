@@ -0,0 +1,50 @@
+"""Parsing of Azure DevOps ISO-8601 timestamps into integer epochs."""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+# Azure DevOps emits one to seven fractional digits; datetime.fromisoformat
+# only accepts three or six before Python 3.11.
+_FRACTION = re.compile(r"\.(\d+)")
+
+
+def _six_digit_fraction(match: "re.Match[str]") -> str:
+    """Return a fractional second padded or truncated to microseconds."""
+    return "." + match.group(1)[:6].ljust(6, "0")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO timestamp into an aware datetime, UTC when without offset."""
+    text = value.replace("Z", "+00:00")
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        parsed = datetime.fromisoformat(_FRACTION.sub(_six_digit_fraction, text))
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+@lru_cache(maxsize=65536)
+def to_epoch_us(value: str) -> int:
+    """Return the UTC epoch of an ISO timestamp, in integer microseconds.
+
+    Results are memoized since the same deployment and commit dates recur
+    across artifacts.
+    """
+    return (parse_timestamp(value) - _EPOCH) // _MICROSECOND
+
+
+def optional_epoch_us(value: Optional[str]) -> Optional[int]:
+    """Return :func:`to_epoch_us` of ``value``, or ``None`` when it is empty."""
+    return to_epoch_us(value) if value else None
+
+
+__all__ = ["optional_epoch_us", "parse_timestamp", "to_epoch_us"]
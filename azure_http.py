@@ -1,30 +1,142 @@
 """Helper functions for standardised HTTP requests."""
 
-from typing import Iterable, Optional
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
 
 import requests
 from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from urllib3.util.retry import Retry
 
 import config
 
+logger = logging.getLogger(__name__)
+
+_POOL_EXHAUSTIONS: Counter = Counter()
+_POOL_EXHAUSTIONS_LOCK = threading.Lock()
+
+
+def _note_pool_exhausted(pool: HTTPConnectionPool) -> None:
+    """Count a request that found every pooled connection of ``pool`` in use."""
+    with _POOL_EXHAUSTIONS_LOCK:
+        _POOL_EXHAUSTIONS[pool.host] += 1
+        first = _POOL_EXHAUSTIONS[pool.host] == 1
+    if first:
+        logger.warning(
+            "⚠️ Connection pool for %s exhausted (%d connections): requests %s. "
+            "Raise HTTP_POOL_MAXSIZE to avoid it.",
+            pool.host,
+            pool.pool.maxsize if pool.pool else 0,
+            (
+                "wait for a free connection"
+                if pool.block
+                else "open extra connections that will be discarded"
+            ),
+        )
+
+
+class _MonitoredHTTPConnectionPool(HTTPConnectionPool):
+    def _get_conn(self, timeout: Optional[float] = None) -> Any:
+        if self.pool is not None and self.pool.empty():
+            _note_pool_exhausted(self)
+        return super()._get_conn(timeout)
+
+
+class _MonitoredHTTPSConnectionPool(HTTPSConnectionPool):
+    def _get_conn(self, timeout: Optional[float] = None) -> Any:
+        if self.pool is not None and self.pool.empty():
+            _note_pool_exhausted(self)
+        return super()._get_conn(timeout)
+
+
+def pool_exhaustion_stats() -> Dict[str, int]:
+    """Return, per host, how many requests found its connection pool exhausted."""
+    with _POOL_EXHAUSTIONS_LOCK:
+        return dict(_POOL_EXHAUSTIONS)
+
+
+def keepalive_socket_options(
+    idle: int = config.HTTP_KEEPALIVE_IDLE,
+) -> List[Tuple[int, int, int]]:
+    """Return socket options enabling TCP keep-alive probes after ``idle`` seconds."""
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    for name, value in (
+        ("TCP_KEEPIDLE", idle),
+        ("TCP_KEEPINTVL", max(1, idle // 4)),
+        ("TCP_KEEPCNT", 4),
+    ):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTP adapter with tunable keep-alive and pool exhaustion monitoring."""
+
+    def __init__(
+        self,
+        socket_options: Optional[List[Tuple[int, int, int]]] = None,
+        **kwargs: Any,
+    ) -> None:
+        # Set before HTTPAdapter.__init__, which builds the pool manager.
+        self.socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(
+        self, connections: int, maxsize: int, block: bool = False, **pool_kwargs: Any
+    ) -> None:
+        if self.socket_options:
+            pool_kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _MonitoredHTTPConnectionPool,
+            "https": _MonitoredHTTPSConnectionPool,
+        }
+
 
 def get_retry_session(
     retries: int = config.RETRY_TOTAL,
     backoff_factor: int = config.RETRY_BACKOFF_FACTOR,
     status_forcelist: Optional[Iterable[int]] = None,
     allowed_methods: Optional[Iterable[str]] = None,
+    pool_connections: int = config.HTTP_POOL_CONNECTIONS,
+    pool_maxsize: int = config.HTTP_POOL_MAXSIZE,
+    pool_block: bool = config.HTTP_POOL_BLOCK,
+    keepalive: bool = config.HTTP_KEEPALIVE,
 ) -> requests.Session:
-    """Create a requests session with retry logic."""
+    """Create a requests session with retry logic and a tuned connection pool.
+
+    ``pool_maxsize`` connections are kept per host; with ``pool_block`` extra
+    requests wait for a free connection instead of opening short-lived ones.
+    ``Retry-After`` responses are returned as is so that the
+    :class:`AdaptiveThrottler` of the client pauses every caller before the
+    request is retried.
+    """
     retry_strategy = Retry(
         total=retries,
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
         allowed_methods=allowed_methods,
         raise_on_status=False,
+        respect_retry_after_header=False,
     )
 
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    adapter = PooledHTTPAdapter(
+        socket_options=keepalive_socket_options() if keepalive else None,
+        max_retries=retry_strategy,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
 
     session = requests.Session()
     session.mount("https://", adapter)
@@ -32,4 +144,161 @@ def get_retry_session(
     return session
 
 
-__all__ = ["get_retry_session"]
+_SHARED_SESSIONS: Dict[str, requests.Session] = {}
+_SHARED_SESSIONS_LOCK = threading.Lock()
+
+
+def get_shared_session(base_url: str) -> requests.Session:
+    """Return the process-wide retry session used for the host of ``base_url``.
+
+    Every client of a host shares one connection pool, sized by
+    ``HTTP_POOL_MAXSIZE`` unless ``HTTP_POOL_MAXSIZE_PER_HOST`` overrides it.
+    """
+    parts = urlsplit(base_url)
+    host = parts.netloc.lower()
+    key = f"{parts.scheme.lower()}://{host}"
+    with _SHARED_SESSIONS_LOCK:
+        if key not in _SHARED_SESSIONS:
+            _SHARED_SESSIONS[key] = get_retry_session(
+                pool_maxsize=config.HTTP_POOL_MAXSIZE_PER_HOST.get(
+                    parts.hostname or host, config.HTTP_POOL_MAXSIZE
+                )
+            )
+        return _SHARED_SESSIONS[key]
+
+
+def _forget_shared_sessions() -> None:
+    """Drop the sessions inherited by a forked process.
+
+    Their pooled sockets belong to the parent, so a child reusing them
+    would interleave its requests with the parent's on the same connection.
+    """
+    global _SHARED_SESSIONS_LOCK  # pylint: disable=global-statement
+    _SHARED_SESSIONS_LOCK = threading.Lock()
+    _SHARED_SESSIONS.clear()
+
+
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    os.register_at_fork(after_in_child=_forget_shared_sessions)
+
+
+@dataclass
+class ThrottleStats:
+    """Counters describing how much an :class:`AdaptiveThrottler` held back."""
+
+    throttled_requests: int = 0
+    throttled_seconds: float = 0.0
+    retry_after_responses: int = 0
+    slowdowns: int = 0
+
+
+def _header_seconds(value: Optional[str]) -> Optional[float]:
+    """Return a numeric header value, ignoring missing or malformed ones."""
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AdaptiveThrottler:
+    """Token bucket pacing requests according to Azure DevOps rate limits.
+
+    Requests take a token from a bucket refilled at ``rate`` tokens per
+    second. ``Retry-After`` pauses every caller for the given delay, while
+    ``X-RateLimit-Delay`` or a low ``X-RateLimit-Remaining`` halves the rate;
+    responses without rate-limit headers let it recover towards the base rate.
+    """
+
+    def __init__(
+        self,
+        rate: float = config.THROTTLE_RATE,
+        burst: int = config.THROTTLE_BURST,
+        min_rate: float = config.THROTTLE_MIN_RATE,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._stats = ThrottleStats()
+
+    def acquire(self) -> None:
+        """Block until the caller is allowed to send a request."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            self._tokens -= 1
+            wait = max(self._paused_until - now, -self._tokens / self.rate, 0.0)
+            if wait > 0:
+                self._stats.throttled_requests += 1
+                self._stats.throttled_seconds += wait
+
+        if wait > 0:
+            self._sleep(wait)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Adapt the pace to the rate-limit headers of a response."""
+        retry_after = _header_seconds(headers.get("Retry-After"))
+        delay = _header_seconds(headers.get("X-RateLimit-Delay"))
+        remaining = _header_seconds(headers.get("X-RateLimit-Remaining"))
+        limit = _header_seconds(headers.get("X-RateLimit-Limit"))
+
+        with self._lock:
+            if retry_after:
+                self._paused_until = max(
+                    self._paused_until, self._clock() + retry_after
+                )
+                self._stats.retry_after_responses += 1
+                self._slow_down()
+            elif delay or (
+                remaining is not None
+                and limit
+                and remaining < limit * config.THROTTLE_LOW_REMAINING_RATIO
+            ):
+                self._slow_down()
+            elif remaining is None:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+    def stats(self) -> ThrottleStats:
+        """Return a snapshot of the throttling counters."""
+        with self._lock:
+            return replace(self._stats)
+
+    def _slow_down(self) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._stats.slowdowns += 1
+
+
+_SHARED_THROTTLER: Optional[AdaptiveThrottler] = None
+_SHARED_THROTTLER_LOCK = threading.Lock()
+
+
+def get_shared_throttler() -> AdaptiveThrottler:
+    """Return the process-wide throttler shared by every client."""
+    global _SHARED_THROTTLER  # pylint: disable=global-statement
+    with _SHARED_THROTTLER_LOCK:
+        if _SHARED_THROTTLER is None:
+            _SHARED_THROTTLER = AdaptiveThrottler()
+        return _SHARED_THROTTLER
+
+
+__all__ = [
+    "AdaptiveThrottler",
+    "ThrottleStats",
+    "PooledHTTPAdapter",
+    "get_retry_session",
+    "get_shared_session",
+    "get_shared_throttler",
+    "keepalive_socket_options",
+    "pool_exhaustion_stats",
+]
@@ -0,0 +1,375 @@
+"""Historical backfill sharding a release creation date range across processes.
+
+The range is cut into time windows which worker processes collect with their
+own clients, bounded by the ``minCreatedTime``/``maxCreatedTime`` release
+listing parameters. Each window is written to a temporary file and merged in
+order, so the output matches a single pass over the whole range::
+
+    python backfill.py --since 2023-01-01 --workers 8 --window-days 14 \\
+        --output backfill.ndjson.gz --resume
+
+With ``--checkpoint`` or ``--resume``, windows journal their completed units
+so that a failed backfill, restarted with ``--resume``, only collects the
+remaining work.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import config
+from azure_devops.api_client import AzureDevOpsClient
+from azure_devops.models import ReleaseEnvironment
+from azure_devops.timestamps import to_epoch_us
+from azure_http import AdaptiveThrottler
+from pipeline import CollectionScope, iter_unit_payloads
+from sinks import OutputSink, open_sink
+from state import CheckpointJournal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    """Releases created in ``[start, end)``."""
+
+    start: datetime
+    end: datetime
+
+    @property
+    def label(self) -> str:
+        """Return the window as an ISO interval."""
+        return f"{self.start.isoformat()}/{self.end.isoformat()}"
+
+    @property
+    def slug(self) -> str:
+        """Return a file name friendly identifier of the window."""
+        return f"{self.start:%Y%m%dT%H%M%S}-{self.end:%Y%m%dT%H%M%S}"
+
+    def contains(self, env: ReleaseEnvironment) -> bool:
+        """Return whether the release of ``env`` was created in the window.
+
+        The release API bounds may be inclusive, so releases created exactly
+        at a boundary are kept by one window only.
+        """
+        created = env.release_created_us
+        return created is not None and (
+            to_epoch_us(self.start.isoformat())
+            <= created
+            < to_epoch_us(self.end.isoformat())
+        )
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse an ISO date or timestamp, naive values being UTC."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def split_windows(
+    since: datetime, until: datetime, window_days: int
+) -> List[TimeWindow]:
+    """Cut ``[since, until)`` into windows of ``window_days``, newest first.
+
+    Newest first matches the descending order of the release listing, so the
+    merged windows keep the order of a single sequential pass.
+    """
+    if window_days < 1:
+        raise ValueError("window_days must be at least 1.")
+    if since >= until:
+        raise ValueError(
+            f"Empty backfill range {since.isoformat()} - {until.isoformat()}."
+        )
+
+    windows: List[TimeWindow] = []
+    end = until
+    while end > since:
+        start = max(since, end - timedelta(days=window_days))
+        windows.append(TimeWindow(start, end))
+        end = start
+    return windows
+
+
+@dataclass(frozen=True)
+class WindowJob:
+    """One window to collect in a worker process."""
+
+    index: int
+    scope: CollectionScope
+    window: TimeWindow
+    directory: str
+    checkpoint_path: Optional[str] = None
+    resume: bool = False
+
+
+def window_checkpoint_path(path: str, window: TimeWindow) -> str:
+    """Return the checkpoint journal of ``window``, next to ``path``."""
+    root, extension = os.path.splitext(path)
+    return f"{root}.{window.slug}{extension}"
+
+
+_WORKER_CLIENTS: Optional[Tuple[AzureDevOpsClient, AzureDevOpsClient]] = None
+
+
+def init_worker(workers: int, cache_path: Optional[str] = None) -> None:
+    """Create the clients of a worker process.
+
+    Each worker paces its requests at ``1 / workers`` of ``THROTTLE_RATE`` so
+    that the pool as a whole stays within the configured rate limit.
+    """
+    global _WORKER_CLIENTS  # pylint: disable=global-statement
+    rate = config.THROTTLE_RATE / workers
+    throttler = AdaptiveThrottler(
+        rate=rate,
+        burst=max(1, config.THROTTLE_BURST // workers),
+        min_rate=min(config.THROTTLE_MIN_RATE, rate),
+    )
+    cache = None
+    if cache_path:
+        # pylint: disable-next=import-outside-toplevel
+        from azure_devops.cache import ResponseCache
+
+        cache = ResponseCache(cache_path)
+    _WORKER_CLIENTS = (
+        AzureDevOpsClient(
+            config.AZURE_ORG_URL, config.API_VERSION, cache=cache, throttler=throttler
+        ),
+        AzureDevOpsClient(
+            config.AZURE_RELEASE_URL,
+            config.API_VERSION,
+            cache=cache,
+            throttler=throttler,
+        ),
+    )
+
+
+def collect_window(job: WindowJob) -> Tuple[str, int]:
+    """Collect one window to an NDJSON file and return its path and record count.
+
+    Runs in a worker process set up by :func:`init_worker`. With a
+    checkpoint, the journal of the window is kept until the whole backfill
+    succeeds, since its records are only in the temporary file until then.
+    """
+    client_core, client_release = _WORKER_CLIENTS  # type: ignore[misc]
+
+    scope = replace(
+        job.scope,
+        min_created_time=job.window.start.isoformat(),
+        max_created_time=job.window.end.isoformat(),
+    )
+    path = os.path.join(job.directory, f"window-{job.index:05d}.ndjson")
+    journal = (
+        CheckpointJournal(job.checkpoint_path, resume=job.resume)
+        if job.checkpoint_path
+        else None
+    )
+    try:
+        with open_sink(path) as sink:
+            records = journal.replay(sink) if journal is not None else 0
+            for env, artifact, payload in iter_unit_payloads(
+                client_core,
+                client_release,
+                scope,
+                environment_filter=job.window.contains,
+                unit_filter=journal.pending if journal is not None else None,
+            ):
+                if payload:
+                    sink.write(payload)
+                    records += 1
+                if journal is not None:
+                    journal.complete(env, artifact, payload)
+    finally:
+        if journal is not None:
+            journal.close()
+    return path, records
+
+
+def run_backfill(
+    scope: CollectionScope,
+    windows: Sequence[TimeWindow],
+    sink: OutputSink,
+    workers: int = config.BACKFILL_WORKERS,
+    cache_path: Optional[str] = None,
+    executor_factory: Callable[..., Executor] = ProcessPoolExecutor,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = False,
+) -> List[Tuple[TimeWindow, Optional[int]]]:
+    """Collect ``windows`` in ``workers`` processes and merge them into ``sink``.
+
+    Windows are written to ``sink`` in the given order as soon as they and
+    all the windows before them are done. A failing window is logged and
+    reported with ``None`` without interrupting the others.
+
+    With ``checkpoint_path``, each window journals its units next to it (see
+    :class:`state.CheckpointJournal`) and ``resume`` picks the journals up
+    again. They are deleted once every window succeeded.
+    """
+    results: List[Tuple[TimeWindow, Optional[int]]] = []
+    with tempfile.TemporaryDirectory(prefix="leadtime-backfill-") as directory:
+        with executor_factory(
+            max_workers=max(1, workers),
+            initializer=init_worker,
+            initargs=(max(1, workers), cache_path),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    collect_window,
+                    WindowJob(
+                        index,
+                        scope,
+                        window,
+                        directory,
+                        (
+                            window_checkpoint_path(checkpoint_path, window)
+                            if checkpoint_path
+                            else None
+                        ),
+                        resume,
+                    ),
+                )
+                for index, window in enumerate(windows)
+            ]
+            for window, future in zip(windows, futures):
+                try:
+                    path, records = future.result()
+                except (OSError, RuntimeError, ValueError, sqlite3.Error) as error:
+                    logger.error(
+                        "⚠️ Backfill window %s failed: %s", window.label, error
+                    )
+                    results.append((window, None))
+                    continue
+
+                with open(path, encoding="utf-8") as handle:
+                    for line in handle:
+                        sink.write(json.loads(line))
+                os.remove(path)
+                logger.info("Backfill window %s: %d records.", window.label, records)
+                results.append((window, records))
+
+    if checkpoint_path and all(records is not None for _, records in results):
+        for window in windows:
+            os.remove(window_checkpoint_path(checkpoint_path, window))
+    return results
+
+
+def parse_backfill_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the collector output options and the backfill range."""
+    # pylint: disable=import-outside-toplevel
+    from main import build_parser
+
+    parser = build_parser(__doc__.splitlines()[0])
+    group = parser.add_argument_group("backfill")
+    group.add_argument(
+        "--since",
+        required=True,
+        type=parse_datetime,
+        help="first release creation date to collect (ISO date or timestamp)",
+    )
+    group.add_argument(
+        "--until",
+        default=None,
+        type=parse_datetime,
+        help="release creation date to stop at, excluded (default: now)",
+    )
+    group.add_argument(
+        "--window-days",
+        type=int,
+        default=config.BACKFILL_WINDOW_DAYS,
+        help="days of release creation collected by each worker task",
+    )
+    group.add_argument(
+        "--workers",
+        type=int,
+        default=config.BACKFILL_WORKERS,
+        help="worker processes collecting windows at the same time",
+    )
+    args = parser.parse_args(argv)
+    for option in ("targets", "record", "replay"):
+        if getattr(args, option):
+            parser.error(f"--{option} is not supported by the backfill")
+    if args.incremental or args.reset_state or args.use_async:
+        parser.error(
+            "--incremental, --reset-state and --async are not supported by the backfill"
+        )
+    if args.until is None:
+        args.until = datetime.now(tz=timezone.utc)
+    return args
+
+
+def prepare_cache(args: argparse.Namespace) -> Optional[str]:
+    """Apply ``--clear-cache`` and return the response cache workers open, if any."""
+    # pylint: disable=import-outside-toplevel
+    from main import open_cache
+
+    cache = open_cache(args)
+    if cache is None:
+        return None
+    cache.close()
+    return args.cache_path
+
+
+def main(argv: Optional[List[str]] = None) -> None:  # pragma: no cover
+    """Backfill the configured release definition over a date range."""
+    # pylint: disable=import-outside-toplevel
+    from main import configure_logging, open_id_cache, open_output, write_summary
+    from scan import ScanTarget, ScopeResolver
+    from sinks import TeeSink
+
+    configure_logging()
+    args = parse_backfill_args(argv)
+    windows = split_windows(args.since, args.until, args.window_days)
+
+    cache_path = prepare_cache(args)
+    client_core = AzureDevOpsClient(config.AZURE_ORG_URL, config.API_VERSION)
+    client_release = AzureDevOpsClient(config.AZURE_RELEASE_URL, config.API_VERSION)
+    id_cache = open_id_cache(args)
+    scope = ScopeResolver(client_core, client_release, id_cache).resolve(
+        ScanTarget(config.PROJECT_NAME, config.STAGE_NAME)
+    )
+    if id_cache is not None:
+        id_cache.save()
+
+    logger.info(
+        "Backfilling %d windows of %d days with %d workers.",
+        len(windows),
+        args.window_days,
+        args.workers,
+    )
+    aggregator = None
+    if args.summary or args.summary_output:
+        from aggregation import LeadTimeAggregator
+
+        aggregator = LeadTimeAggregator()
+    with TeeSink(open_output(args), *([aggregator] if aggregator else [])) as sink:
+        results = run_backfill(
+            scope,
+            windows,
+            sink,
+            workers=args.workers,
+            cache_path=cache_path,
+            checkpoint_path=(
+                args.checkpoint_file if args.checkpoint or args.resume else None
+            ),
+            resume=args.resume,
+        )
+    if aggregator is not None:
+        write_summary(aggregator, args.summary_output)
+
+    failed = [window.label for window, records in results if records is None]
+    if failed:
+        raise SystemExit(f"Backfill windows failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,405 @@
+"""Local stand-in for the Azure DevOps core and release (vsrm) REST APIs.
+
+Serves a deterministic synthetic dataset through the endpoints used by
+:mod:`azure_devops.ado_services`, with an optional latency added to every
+response, and counts the requests received per endpoint template.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+PROJECT_NAME = "bench"
+PROJECT_ID = "bench-id"
+DEFINITION_NAME = "bench-definition"
+DEFINITION_ID = 1
+TARGET_REF = "refs/heads/main"
+STATS_PATH = "/_benchmark/stats"
+
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _timestamp(minutes: int) -> str:
+    return (_EPOCH + timedelta(minutes=minutes)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _sha(*parts: Any) -> str:
+    # A 40 hex digit id shaped like a Git commit, not a security digest.
+    return hashlib.sha1(
+        "-".join(map(str, parts)).encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Scale of the synthetic dataset."""
+
+    releases: int = 200
+    artifacts_per_release: int = 3
+    repositories: int = 10
+    prs_per_repository: int = 100
+    commits_per_pr: int = 5
+
+
+class SyntheticDataset:
+    """Releases, pull requests and commits generated from a :class:`DatasetSpec`.
+
+    Release ``j`` is created ``j`` hours after 2024-01-01 and deployed to a
+    ``Prod`` environment; its artifact ``k`` is built from the merge commit of
+    pull request ``(j + k) % prs_per_repository`` of repository
+    ``(j * artifacts_per_release + k) % repositories``.
+    """
+
+    def __init__(self, spec: DatasetSpec) -> None:
+        self.spec = spec
+
+    def repository_id(self, repository: int) -> str:
+        """Return the identifier of repository number ``repository``."""
+        return f"repo-{repository}"
+
+    def merge_commit(self, repository: int, pr_id: int) -> str:
+        """Return the merge commit of a pull request."""
+        return _sha("merge", repository, pr_id)
+
+    def commit_date(self, commit_id: str) -> str:
+        """Return a stable committer date for any commit id."""
+        return _timestamp(-5000 - int(commit_id[:4], 16) % 10000)
+
+    def release(self, release_id: int) -> Dict[str, Any]:
+        """Return the release payload with its environments and artifacts."""
+        spec = self.spec
+        created = release_id * 60
+        artifacts = []
+        for index in range(spec.artifacts_per_release):
+            repository = (release_id * spec.artifacts_per_release + index) % spec.repositories
+            repository_id = self.repository_id(repository)
+            pr_id = (release_id + index) % spec.prs_per_repository
+            artifacts.append(
+                {
+                    "alias": f"_{repository_id}",
+                    "definitionReference": {
+                        "branch": {"name": TARGET_REF, "id": TARGET_REF},
+                        "repository": {"name": repository_id, "id": repository_id},
+                        "definition": {"name": f"{repository_id}-ci", "id": str(repository)},
+                        "sourceVersion": {"id": self.merge_commit(repository, pr_id)},
+                        "version": {"id": str(release_id * 100 + index)},
+                        "artifactSourceVersionUrl": {
+                            "id": f"https://build.example/{release_id}/{index}"
+                        },
+                    },
+                }
+            )
+        return {
+            "id": release_id,
+            "name": f"Release-{release_id}",
+            "status": "active",
+            "createdOn": _timestamp(created),
+            "modifiedOn": _timestamp(created + 30),
+            "artifacts": artifacts,
+            "environments": [
+                {
+                    "id": release_id * 10,
+                    "name": "Prod",
+                    "status": "succeeded",
+                    "definitionEnvironmentId": 10,
+                    "deploySteps": [
+                        {
+                            "queuedOn": _timestamp(created + 5),
+                            "lastModifiedOn": _timestamp(created + 45),
+                        }
+                    ],
+                }
+            ],
+        }
+
+    def release_ids(
+        self, min_created: Optional[str] = None, max_created: Optional[str] = None
+    ) -> List[int]:
+        """Return the release ids, newest first, created within the bounds."""
+        low = _minutes(min_created) if min_created else None
+        high = _minutes(max_created) if max_created else None
+        return [
+            release_id
+            for release_id in range(self.spec.releases, 0, -1)
+            if (low is None or release_id * 60 >= low)
+            and (high is None or release_id * 60 < high)
+        ]
+
+    def pull_request(self, repository: int, pr_id: int) -> Dict[str, Any]:
+        """Return a completed pull request payload."""
+        return {
+            "pullRequestId": pr_id,
+            "status": "completed",
+            "mergeStatus": "succeeded",
+            "creationDate": _timestamp(-2000 + pr_id),
+            "closedDate": _timestamp(-1000 + pr_id),
+            "sourceRefName": f"refs/heads/feature/{pr_id}",
+            "targetRefName": TARGET_REF,
+            "lastMergeCommit": {"commitId": self.merge_commit(repository, pr_id)},
+        }
+
+    def pull_request_commits(self, repository: int, pr_id: int) -> List[Dict[str, Any]]:
+        """Return the commits of a pull request, newest first."""
+        return [
+            {
+                "commitId": _sha("commit", repository, pr_id, index),
+                "committer": {"date": _timestamp(-3000 + pr_id - index)},
+            }
+            for index in range(self.spec.commits_per_pr)
+        ]
+
+
+def _minutes(value: str) -> int:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int((parsed - _EPOCH).total_seconds() // 60)
+
+
+Route = Tuple[str, str, "re.Pattern[str]"]
+
+ROUTES: Tuple[Route, ...] = tuple(
+    (method, template, re.compile(pattern))
+    for method, template, pattern in (
+        ("GET", "projects", r"^/_apis/projects$"),
+        ("GET", "release_definitions", r"^/[^/]+/_apis/release/definitions$"),
+        ("GET", "releases", r"^/[^/]+/_apis/release/releases$"),
+        ("GET", "release", r"^/[^/]+/_apis/release/releases/(?P<release>\d+)$"),
+        (
+            "POST",
+            "commitsbatch",
+            r"^/[^/]+/_apis/git/repositories/[^/]+/commitsbatch$",
+        ),
+        (
+            "GET",
+            "commit",
+            r"^/[^/]+/_apis/git/repositories/[^/]+/commits/(?P<commit>[^/]+)$",
+        ),
+        (
+            "GET",
+            "pull_requests",
+            r"^/[^/]+/_apis/git/repositories/repo-(?P<repository>\d+)/pullRequests$",
+        ),
+        (
+            "POST",
+            "pull_request_query",
+            r"^/[^/]+/_apis/git/repositories/repo-(?P<repository>\d+)/pullrequestquery$",
+        ),
+        (
+            "GET",
+            "pull_request_commits",
+            r"^/[^/]+/_apis/git/repositories/repo-(?P<repository>\d+)"
+            r"/pullRequests/(?P<pr>\d+)/commits$",
+        ),
+    )
+)
+
+
+class FakeAzureDevOpsServer:
+    """Threaded HTTP server answering Azure DevOps requests from a dataset.
+
+    The same server stands in for both the core and the release hosts. Use it
+    as a context manager, or call :meth:`serve_forever` in a dedicated
+    process.
+    """
+
+    def __init__(
+        self,
+        dataset: SyntheticDataset,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.dataset = dataset
+        self.latency = latency
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the server."""
+        host, port = self._httpd.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode("ascii")
+        return f"http://{host}:{port}"
+
+    def serve_forever(self) -> None:
+        """Serve requests until :meth:`shutdown` is called."""
+        self._httpd.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop serving and release the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeAzureDevOpsServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
+
+    def handle(
+        self, method: str, path: str, query: Dict[str, str], body: Any
+    ) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        """Return the status, JSON body and headers answering one request."""
+        if path == STATS_PATH:
+            with self._lock:
+                return 200, dict(self.requests), {}
+
+        for route_method, template, pattern in ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                with self._lock:
+                    self.requests[template] += 1
+                handler: Callable[..., Tuple[int, Dict[str, Any], Dict[str, str]]]
+                handler = getattr(self, f"_{template}")
+                return handler(query=query, body=body, **match.groupdict())
+
+        with self._lock:
+            self.requests["not_found"] += 1
+        return 404, {"message": f"No route for {method} {path}"}, {}
+
+    # Endpoint handlers ------------------------------------------------------
+
+    def _projects(self, **_: Any) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        return 200, {"value": [{"name": PROJECT_NAME, "id": PROJECT_ID}]}, {}
+
+    def _release_definitions(
+        self, query: Dict[str, str], **_: Any
+    ) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        definitions = [{"name": DEFINITION_NAME, "id": DEFINITION_ID}]
+        if query.get("searchText") not in (None, DEFINITION_NAME):
+            definitions = []
+        return 200, {"value": definitions}, {}
+
+    def _releases(
+        self, query: Dict[str, str], **_: Any
+    ) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        release_ids = self.dataset.release_ids(
+            query.get("minCreatedTime"), query.get("maxCreatedTime")
+        )
+        start = int(query.get("continuationToken", 0))
+        top = int(query.get("$top", 50))
+        page = release_ids[start : start + top]
+        expand = query.get("$expand", "")
+        releases = []
+        for release_id in page:
+            release = self.dataset.release(release_id)
+            if "artifacts" not in expand:
+                del release["artifacts"]
+            releases.append(release)
+
+        headers = {}
+        if start + top < len(release_ids):
+            headers["x-ms-continuationtoken"] = str(start + top)
+        return 200, {"count": len(releases), "value": releases}, headers
+
+    def _release(self, release: str, **_: Any) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        release_id = int(release)
+        if not 0 < release_id <= self.dataset.spec.releases:
+            return 404, {"message": f"Release {release_id} not found"}, {}
+        return 200, self.dataset.release(release_id), {}
+
+    def _commitsbatch(self, body: Any, **_: Any) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        commits = [
+            {"commitId": commit_id, "committer": {"date": self.dataset.commit_date(commit_id)}}
+            for commit_id in (body or {}).get("ids", [])
+        ]
+        return 200, {"count": len(commits), "value": commits}, {}
+
+    def _commit(self, commit: str, **_: Any) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        return 200, {"commitId": commit, "committer": {"date": self.dataset.commit_date(commit)}}, {}
+
+    def _pull_requests(
+        self, repository: str, query: Dict[str, str], **_: Any
+    ) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        skip = int(query.get("$skip", 0))
+        top = int(query.get("$top", 100))
+        count = self.dataset.spec.prs_per_repository
+        pull_requests = [
+            self.dataset.pull_request(int(repository), pr_id)
+            for pr_id in range(skip, min(skip + top, count))
+        ]
+        return 200, {"count": len(pull_requests), "value": pull_requests}, {}
+
+    def _pull_request_query(
+        self, repository: str, body: Any, **_: Any
+    ) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        merged = {
+            self.dataset.merge_commit(int(repository), pr_id): pr_id
+            for pr_id in range(self.dataset.spec.prs_per_repository)
+        }
+        items = (body or {}).get("queries", [{}])[0].get("items", [])
+        result = {
+            commit_id: [self.dataset.pull_request(int(repository), merged[commit_id])]
+            if commit_id in merged
+            else []
+            for commit_id in items
+        }
+        return 200, {"results": [result]}, {}
+
+    def _pull_request_commits(
+        self, repository: str, pr: str, query: Dict[str, str], **_: Any
+    ) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        commits = self.dataset.pull_request_commits(int(repository), int(pr))
+        if "$top" in query:
+            skip = int(query.get("$skip", 0))
+            commits = commits[skip : skip + int(query["$top"])]
+        return 200, {"count": len(commits), "value": commits}, {}
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Request handler delegating to :meth:`FakeAzureDevOpsServer.handle`."""
+
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; avoid delayed ACK stalls.
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                """Answer a GET request."""
+                self._answer("GET", None)
+
+            def do_POST(self) -> None:  # pylint: disable=invalid-name
+                """Answer a POST request with a JSON body."""
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"null")
+                self._answer("POST", body)
+
+            def _answer(self, method: str, body: Any) -> None:
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlsplit(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                status, payload, headers = server.handle(
+                    method, unquote(url.path), query, body
+                )
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+                """Keep the benchmark output free of access logs."""
+
+        return Handler
@@ -0,0 +1,122 @@
+"""Per-object memory footprint of the data models.
+
+Compares the slotted, interned models with equivalent plain dataclasses,
+as they were before, by decoding synthetic release data the way the API
+client does and measuring the allocations with :mod:`tracemalloc`::
+
+    python -m benchmarks.model_memory --count 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from azure_devops.models import Artifact, PullRequest, ReleaseEnvironment
+
+MODELS = (ReleaseEnvironment, Artifact, PullRequest)
+
+
+def plain_model(model: type) -> type:
+    """Return a ``__dict__`` based dataclass with the init fields of ``model``."""
+    return make_dataclass(
+        f"Plain{model.__name__}",
+        [
+            (item.name, item.type)
+            if item.default is MISSING
+            else (item.name, item.type, field(default=item.default))
+            for item in fields(model)
+            if item.init
+        ],
+    )
+
+
+def sample_record(model: type, index: int) -> Dict[str, Any]:
+    """Return the constructor arguments of one synthetic ``model`` instance."""
+    timestamp = f"2024-01-{index % 28 + 1:02d}T10:00:00.{index % 1000000:06d}Z"
+    records: Dict[str, Dict[str, Any]] = {
+        "ReleaseEnvironment": {
+            "environment_id": index,
+            "environment_name": "Production",
+            "environment_status": "succeeded",
+            "environment_start_at": timestamp,
+            "environment_finished_at": timestamp,
+            "release_id": index // 3,
+            "release_name": f"Release-{index // 3}",
+            "release_status": "active",
+            "release_created_on": timestamp,
+            "release_modified_on": timestamp,
+            "definition_environment_id": 7,
+        },
+        "Artifact": {
+            "alias": "_platform-api",
+            "branch_name": "refs/heads/main",
+            "branch_id": "refs/heads/main",
+            "repository_name": f"platform-api-{index % 20}",
+            "repository_id": f"7f1c3a9e-0000-4000-8000-{index % 20:012d}",
+            "definition_name": "platform-api-ci",
+            "definition_id": "42",
+            "commit_id": f"{index:040x}",
+            "build_id": index,
+            "build_url": f"https://dev.azure.com/org/proj/_build/results?buildId={index}",
+        },
+        "PullRequest": {
+            "id": str(index),
+            "merged_at": timestamp,
+            "created_at": timestamp,
+            "source_ref_name": f"refs/heads/feature/{index % 50}",
+            "target_ref_name": "refs/heads/main",
+            "status": "completed",
+            "last_merge_commit_id": f"{index:040x}",
+        },
+    }
+    return records[model.__name__]
+
+
+def measure(factory: Callable[..., Any], model: type, count: int) -> float:
+    """Return the average bytes retained per object built by ``factory``.
+
+    Each object is built from a freshly decoded JSON document so that it owns
+    its strings, as objects built from API responses do.
+    """
+    records = [json.dumps(sample_record(model, index)) for index in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects: List[Any] = [factory(**json.loads(record)) for record in records]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return retained / count
+
+
+def run(count: int) -> List[Tuple[str, float, float]]:
+    """Measure every model; return ``(name, plain bytes, current bytes)`` rows."""
+    return [
+        (
+            model.__name__,
+            measure(plain_model(model), model, count),
+            measure(model, model, count),
+        )
+        for model in MODELS
+    ]
+
+
+def main() -> None:
+    """Print the per-object footprint of each model before and after."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50000, help="Objects per model.")
+    args = parser.parse_args()
+
+    print(f"{'model':<20}{'plain B/obj':>14}{'slotted B/obj':>16}{'saved':>9}")
+    for name, plain, current in run(args.count):
+        print(f"{name:<20}{plain:>14.0f}{current:>16.0f}{1 - current / plain:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""End-to-end collector benchmark against the local fake Azure DevOps server.
+
+Starts :mod:`benchmarks.fake_server` in a child process, points the
+collector at it and runs :func:`main.main` in this process, then reports the
+wall time, the requests received per endpoint, the peak RSS of the collector
+and its throughput::
+
+    python -m benchmarks.run_collector --releases 1000 --latency-ms 20 -- --async
+
+Arguments after ``--`` are passed to the collector; its output is always
+NDJSON written to a temporary file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_server import (DEFINITION_NAME, PROJECT_NAME, STATS_PATH,
+                                    DatasetSpec, FakeAzureDevOpsServer,
+                                    SyntheticDataset)
+
+
+def _serve(spec: DatasetSpec, latency: float, urls: Any) -> None:
+    server = FakeAzureDevOpsServer(SyntheticDataset(spec), latency=latency)
+    urls.send(server.url)
+    server.serve_forever()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(
+    spec: DatasetSpec, latency: float = 0.0, collector_args: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Run the collector once against a fresh fake server and return the report."""
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    server = multiprocessing.Process(
+        target=_serve, args=(spec, latency, sender), daemon=True
+    )
+    server.start()
+    try:
+        url = receiver.recv()
+        os.environ.update(
+            {
+                "AZURE_ORG_URL": url,
+                "AZURE_RELEASE_URL": url,
+                "PROJECT_NAME": PROJECT_NAME,
+                "STAGE_NAME": DEFINITION_NAME,
+                "PAT_TOKEN": os.environ.get("PAT_TOKEN") or "benchmark",
+                "THROTTLE_RATE": os.environ.get("THROTTLE_RATE", "1000000"),
+                "THROTTLE_BURST": os.environ.get("THROTTLE_BURST", "1000000"),
+                "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+            }
+        )
+        # Imported late so that config picks the fake server up.
+        collector = importlib.import_module("main")
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "records.ndjson")
+            started = time.perf_counter()
+            collector.main([*(collector_args or []), "--output", output])
+            wall_seconds = time.perf_counter() - started
+            with open(output, encoding="utf-8") as handle:
+                records = sum(1 for _ in handle)
+
+        with urllib.request.urlopen(f"{url}{STATS_PATH}") as response:  # nosec B310
+            requests_per_endpoint = json.load(response)
+    finally:
+        server.terminate()
+        server.join()
+
+    return {
+        "dataset": spec.__dict__,
+        "latency_ms": latency * 1000,
+        "collector_args": collector_args or [],
+        "wall_seconds": round(wall_seconds, 3),
+        "records": records,
+        "records_per_second": round(records / wall_seconds, 1) if wall_seconds else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "requests": dict(sorted(requests_per_endpoint.items())),
+        "total_requests": sum(requests_per_endpoint.values()),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Return a human readable summary of a benchmark report."""
+    lines = [
+        f"wall time       {report['wall_seconds']:.3f} s",
+        f"records         {report['records']} ({report['records_per_second']} /s)",
+        f"peak RSS        {report['peak_rss_mb']:.1f} MB",
+        f"requests        {report['total_requests']}",
+    ]
+    lines.extend(
+        f"  {endpoint:<22}{count:>8}" for endpoint, count in report["requests"].items()
+    )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the benchmark options; collector options follow ``--``."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    collector_args: List[str] = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, collector_args = argv[:split], argv[split + 1 :]
+
+    defaults = DatasetSpec()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--releases", type=int, default=defaults.releases)
+    parser.add_argument(
+        "--artifacts-per-release", type=int, default=defaults.artifacts_per_release
+    )
+    parser.add_argument("--repositories", type=int, default=defaults.repositories)
+    parser.add_argument(
+        "--prs-per-repository", type=int, default=defaults.prs_per_repository
+    )
+    parser.add_argument("--commits-per-pr", type=int, default=defaults.commits_per_pr)
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="delay added to every response"
+    )
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    args = parser.parse_args(argv)
+    args.collector_args = collector_args
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the benchmark described on the command line and print its report."""
+    args = parse_args(argv)
+    spec = DatasetSpec(
+        releases=args.releases,
+        artifacts_per_release=args.artifacts_per_release,
+        repositories=args.repositories,
+        prs_per_repository=args.prs_per_repository,
+        commits_per_pr=args.commits_per_pr,
+    )
+    report = run_benchmark(spec, args.latency_ms / 1000, args.collector_args)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
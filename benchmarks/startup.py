@@ -0,0 +1,135 @@
+"""Startup cost of the collector: import time and time to the first response.
+
+Measures ``import main`` with ``python -X importtime`` in fresh interpreters.
+Then runs a short collection twice against :mod:`benchmarks.fake_server` in
+subprocesses, first with a cold and then with a warm id cache. For each run
+it reports the wall time, the id lookups sent and how long after start the
+first response arrived::
+
+    python -m benchmarks.startup --runs 5 --latency-ms 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_server import (DEFINITION_NAME, PROJECT_NAME, DatasetSpec,
+                                    FakeAzureDevOpsServer, SyntheticDataset)
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+_STARTUP = re.compile(r"Startup: first response (\d+) ms after start")
+
+
+def parse_importtime(stderr: str, module: str) -> Dict[str, int]:
+    """Return the cumulative microseconds of ``module`` and of its direct imports."""
+    times: Dict[str, int] = {}
+    children: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if not match:
+            continue
+        depth, name = len(match.group(3)) // 2, match.group(4)
+        # importtime prints imports after their own dependencies.
+        if depth == 1:
+            children[name] = int(match.group(2))
+        elif depth == 0:
+            if name == module:
+                times = {module: int(match.group(2)), **children}
+            children = {}
+    return times
+
+
+def measure_imports(module: str = "main", runs: int = 5) -> Dict[str, Any]:
+    """Import ``module`` in ``runs`` fresh interpreters and report the median."""
+    samples: List[Dict[str, int]] = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(parse_importtime(completed.stderr, module))
+    heaviest = sorted(samples[-1].items(), key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(s[module] for s in samples) / 1000, 1),
+        "imports_ms": {name: round(us / 1000, 1) for name, us in heaviest[1:11]},
+    }
+
+
+def measure_short_runs(
+    latency: float, collector_args: Optional[List[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Collect one release twice, with a cold then a warm id cache."""
+    spec = DatasetSpec(releases=1, artifacts_per_release=1)
+    with FakeAzureDevOpsServer(SyntheticDataset(spec), latency=latency) as server:
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "AZURE_ORG_URL": server.url,
+                "AZURE_RELEASE_URL": server.url,
+                "PROJECT_NAME": PROJECT_NAME,
+                "STAGE_NAME": DEFINITION_NAME,
+                "PAT_TOKEN": os.environ.get("PAT_TOKEN") or "benchmark",
+                "LOG_LEVEL": "INFO",
+                "ID_CACHE_PATH": os.path.join(directory, "ids.json"),
+            }
+            runs: Dict[str, Dict[str, Any]] = {}
+            for run in ("cold_id_cache", "warm_id_cache"):
+                server.requests.clear()
+                started = time.perf_counter()
+                completed = subprocess.run(
+                    [
+                        sys.executable,
+                        "main.py",
+                        *(collector_args or []),
+                        "--output",
+                        os.path.join(directory, "records.ndjson"),
+                    ],
+                    capture_output=True,
+                    text=True,
+                    env=env,
+                    check=True,
+                )
+                match = _STARTUP.search(completed.stderr)
+                runs[run] = {
+                    "wall_ms": round((time.perf_counter() - started) * 1000),
+                    "first_response_ms": int(match.group(1)) if match else None,
+                    "id_lookups": server.requests["projects"]
+                    + server.requests["release_definitions"],
+                }
+    return runs
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Print the startup report described on the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="interpreters to time")
+    parser.add_argument(
+        "--latency-ms", type=float, default=50.0, help="delay added to every response"
+    )
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    args, collector_args = parser.parse_known_args(argv)
+
+    report = {
+        "imports": measure_imports(runs=args.runs),
+        "short_runs": measure_short_runs(args.latency_ms / 1000, collector_args),
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
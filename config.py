@@ -10,8 +10,10 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-AZURE_ORG_URL = "https://dev.azure.com/lpl-sources"
-AZURE_RELEASE_URL = "https://vsrm.dev.azure.com/lpl-sources"
+AZURE_ORG_URL = os.getenv("AZURE_ORG_URL", "https://dev.azure.com/lpl-sources")
+AZURE_RELEASE_URL = os.getenv(
+    "AZURE_RELEASE_URL", "https://vsrm.dev.azure.com/lpl-sources"
+)
 API_VERSION = "7.1"
 PAT_TOKEN = os.getenv("PAT_TOKEN")
 
@@ -20,9 +22,105 @@ DEFAULT_REQUEST_TIMEOUT = 10
 RETRY_TOTAL = 5
 RETRY_BACKOFF_FACTOR = 2
 
+
+def _host_sizes(value: str) -> dict:
+    """Parse ``host=size`` pairs separated by commas."""
+    sizes = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        host, _, size = item.partition("=")
+        sizes[host.strip().lower()] = int(size)
+    return sizes
+
+
+# Connection pools shared by the clients of each host
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+HTTP_POOL_MAXSIZE_PER_HOST = _host_sizes(os.getenv("HTTP_POOL_MAXSIZE_PER_HOST", ""))
+HTTP_POOL_BLOCK = os.getenv("HTTP_POOL_BLOCK", "false").lower() in {"1", "true", "yes"}
+HTTP_KEEPALIVE = os.getenv("HTTP_KEEPALIVE", "true").lower() in {"1", "true", "yes"}
+HTTP_KEEPALIVE_IDLE = int(os.getenv("HTTP_KEEPALIVE_IDLE", "60"))
+
+# Request pacing shared by every client (requests per second)
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "20"))
+THROTTLE_BURST = int(os.getenv("THROTTLE_BURST", "20"))
+THROTTLE_MIN_RATE = 1.0
+THROTTLE_LOW_REMAINING_RATIO = 0.2
+
+# Local state (response cache, watermarks, ...)
+STATE_DIR = os.getenv("LEADTIME_STATE_DIR", ".leadtime")
+
+# Response cache
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "false").lower() in {"1", "true", "yes"}
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(STATE_DIR, "cache.sqlite"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds a write waits for another process, e.g. a backfill worker, to
+# release the database lock.
+CACHE_BUSY_TIMEOUT = float(os.getenv("CACHE_BUSY_TIMEOUT", "30"))
+CACHE_TTL_SECONDS = {
+    "commit": 90 * 24 * 3600,
+    "pull_request_commits": 30 * 24 * 3600,
+    "pull_request_query": 30 * 24 * 3600,
+    "release": 30 * 24 * 3600,
+}
+
+# Project and release definition ids resolved by earlier runs
+ID_CACHE_ENABLED = os.getenv("ID_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+ID_CACHE_PATH = os.getenv("ID_CACHE_PATH", os.path.join(STATE_DIR, "ids.json"))
+ID_CACHE_TTL_SECONDS = int(os.getenv("ID_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Incremental mode
+STATE_PATH = os.getenv("STATE_PATH", os.path.join(STATE_DIR, "watermark.json"))
+INCREMENTAL_LOOKBACK_DAYS = int(os.getenv("INCREMENTAL_LOOKBACK_DAYS", "30"))
+
+# Checkpoint journal of completed units, replayed by --resume
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "false").lower() in {
+    "1",
+    "true",
+    "yes",
+}
+CHECKPOINT_PATH = os.getenv(
+    "CHECKPOINT_PATH", os.path.join(STATE_DIR, "checkpoint.ndjson")
+)
+
+# Batched commit resolution
+COMMITS_BATCH_SIZE = 100
+COMMIT_BATCH_ENVIRONMENTS = int(os.getenv("COMMIT_BATCH_ENVIRONMENTS", "25"))
+
+# Batched merge commit to pull request resolution (pullrequestquery)
+PR_QUERY_ENABLED = os.getenv("PR_QUERY_ENABLED", "true").lower() in {"1", "true", "yes"}
+PR_QUERY_BATCH_SIZE = int(os.getenv("PR_QUERY_BATCH_SIZE", "100"))
+
+# Pull request commit listings ($top of each page, oldest commits remembered)
+PR_COMMITS_PAGE_SIZE = int(os.getenv("PR_COMMITS_PAGE_SIZE", "100"))
+OLDEST_COMMIT_MEMO_SIZE = int(os.getenv("OLDEST_COMMIT_MEMO_SIZE", "65536"))
+
+# Async collection
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "8"))
+
+# JSON decoder of responses: auto (orjson when installed), orjson or json
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+# Backfill (worker processes, days of release creation per window)
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+BACKFILL_WINDOW_DAYS = int(os.getenv("BACKFILL_WINDOW_DAYS", "14"))
+
+# Multi-target scans
+SCAN_PARALLEL_TARGETS = int(os.getenv("SCAN_PARALLEL_TARGETS", "4"))
+
+# Output
+OUTPUT_FLUSH_RECORDS = int(os.getenv("OUTPUT_FLUSH_RECORDS", "50"))
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+
+# Request metrics (Prometheus textfile written at the end of a run)
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+
+# Azure Functions app (NCRONTAB schedule, command line options of each run)
+FUNCTION_SCHEDULE = os.getenv("FUNCTION_SCHEDULE", "0 0 6 * * *")
+FUNCTION_ARGS = os.getenv("FUNCTION_ARGS", "")
+
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 # Project information
-PROJECT_NAME = "One"
-STAGE_NAME = "ONE-2205-AMER-OAT/PRD"
+PROJECT_NAME = os.getenv("PROJECT_NAME", "One")
+STAGE_NAME = os.getenv("STAGE_NAME", "ONE-2205-AMER-OAT/PRD")
@@ -0,0 +1,201 @@
+"""Columnar export of flattened lead time records (CSV / Parquet)."""
+
+from __future__ import annotations
+
+import csv
+import sys
+from abc import abstractmethod
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+import config
+from sinks import OutputSink, open_output_stream
+
+METRIC_NAMES = (
+    "lead_time_artifact_commit_to_prod",
+    "lead_time_pr_to_prod",
+    "lead_time_pr_last_commit_to_prod",
+)
+
+# (column, path in the enriched payload, Arrow type)
+EXPORT_COLUMNS: Tuple[Tuple[str, Tuple[str, ...], str], ...] = (
+    ("timestamp", ("timestamp",), "string"),
+    ("project_id", ("project", "id"), "string"),
+    ("project_name", ("project", "name"), "string"),
+    ("release_id", ("release", "id"), "int64"),
+    ("release_name", ("release", "name"), "string"),
+    ("release_status", ("release", "status"), "string"),
+    ("release_created_on", ("release", "created_on"), "string"),
+    ("release_modified_on", ("release", "modified_on"), "string"),
+    ("release_definition", ("release", "definition"), "string"),
+    ("release_deployed_at", ("release", "deployed_at"), "string"),
+    ("environment_id", ("environment", "id"), "int64"),
+    ("environment_name", ("environment", "name"), "string"),
+    ("environment_status", ("environment", "status"), "string"),
+    ("environment_start_at", ("environment", "start_at"), "string"),
+    ("environment_finished_at", ("environment", "finished_at"), "string"),
+    ("repository_id", ("repository", "id"), "string"),
+    ("repository_name", ("repository", "name"), "string"),
+    ("repository_branch_name", ("repository", "branch_name"), "string"),
+    ("artifact_alias", ("artifact", "alias"), "string"),
+    ("artifact_branch_id", ("artifact", "branch_id"), "string"),
+    ("artifact_commit_id", ("artifact", "commit_id"), "string"),
+    ("artifact_commit_date", ("artifact", "commit_date"), "string"),
+    ("artifact_build_id", ("artifact", "build_id"), "int64"),
+    ("artifact_build_url", ("artifact", "build_url"), "string"),
+    ("pullrequest_id", ("pullrequest", "id"), "string"),
+    ("pullrequest_merged_at", ("pullrequest", "merged_at"), "string"),
+    ("pullrequest_created_at", ("pullrequest", "created_at"), "string"),
+    ("pullrequest_source_ref_name", ("pullrequest", "source_ref_name"), "string"),
+    ("pullrequest_target_ref_name", ("pullrequest", "target_ref_name"), "string"),
+    ("pullrequest_status", ("pullrequest", "status"), "string"),
+    (
+        "pullrequest_last_merge_commit_id",
+        ("pullrequest", "last_merge_commit_id"),
+        "string",
+    ),
+    (
+        "pullrequest_last_merge_commit_date",
+        ("pullrequest", "last_merge_commit_date"),
+        "string",
+    ),
+) + tuple(
+    (f"{metric}_{unit}", ("metrics", metric, unit), arrow_type)
+    for metric in METRIC_NAMES
+    for unit, arrow_type in (
+        ("seconds", "int64"),
+        ("minutes", "float64"),
+        ("hours", "float64"),
+    )
+)
+
+COLUMN_NAMES = tuple(column for column, _, _ in EXPORT_COLUMNS)
+
+
+def flatten_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten an enriched payload into a row following :data:`EXPORT_COLUMNS`.
+
+    Missing values, such as ``lead_time_pr_to_prod`` for a pull request
+    without merge date, are exported as ``None``.
+    """
+    row: Dict[str, Any] = {}
+    for column, path, _ in EXPORT_COLUMNS:
+        value: Any = payload
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        row[column] = value
+    return row
+
+
+class _BatchingSink(OutputSink):
+    """Sink flattening records and handing them over in fixed-size batches."""
+
+    def __init__(self, batch_size: int = config.EXPORT_BATCH_ROWS) -> None:
+        self.batch_size = max(1, batch_size)
+        self.rows_written = 0
+        self._batch: List[Dict[str, Any]] = []
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._batch.append(flatten_payload(record))
+        if len(self._batch) >= self.batch_size:
+            self._flush_batch()
+
+    def close(self) -> None:
+        self._flush_batch()
+        self._close()
+
+    def _flush_batch(self) -> None:
+        if self._batch:
+            self._write_batch(self._batch)
+            self.rows_written += len(self._batch)
+            self._batch = []
+
+    @abstractmethod
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """Write one batch of flattened rows."""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Release the underlying file once the last batch is written."""
+
+
+class CsvSink(_BatchingSink):
+    """Append flattened records to a CSV file with a header row."""
+
+    def __init__(
+        self,
+        stream: IO[str],
+        batch_size: int = config.EXPORT_BATCH_ROWS,
+        close_stream: bool = False,
+    ) -> None:
+        super().__init__(batch_size)
+        self.stream = stream
+        self.close_stream = close_stream
+        self._writer = csv.DictWriter(stream, fieldnames=COLUMN_NAMES)
+        self._writer.writeheader()
+
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.writerows(rows)
+        self.stream.flush()
+
+    def _close(self) -> None:
+        if self.close_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+
+class ParquetSink(_BatchingSink):
+    """Write flattened records to a Parquet file, one row group per batch.
+
+    Requires the optional ``pyarrow`` dependency (``pip install .[export]``).
+    """
+
+    def __init__(self, path: str, batch_size: int = config.EXPORT_BATCH_ROWS) -> None:
+        super().__init__(batch_size)
+        try:
+            # pylint: disable=import-outside-toplevel
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise RuntimeError(
+                "Parquet export requires pyarrow: pip install '.[export]'"
+            ) from error
+
+        self._pa = pa
+        self.schema = pa.schema(
+            [(column, getattr(pa, arrow_type)()) for column, _, arrow_type in EXPORT_COLUMNS]
+        )
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        table = self._pa.Table.from_pylist(rows, schema=self.schema)
+        self._writer.write_table(table, row_group_size=len(rows))
+
+    def _close(self) -> None:
+        self._writer.close()
+
+
+def open_export_sink(
+    path: str,
+    export_format: str,
+    batch_size: Optional[int] = None,
+    compress: bool = False,
+) -> OutputSink:
+    """Return a CSV or Parquet sink writing to ``path``.
+
+    CSV is gzipped with ``compress`` or a ``.gz`` path; Parquet compresses
+    its columns itself and rejects ``compress``.
+    """
+    batch_size = batch_size or config.EXPORT_BATCH_ROWS
+    if export_format == "csv":
+        stream = open_output_stream(path, compress)
+        return CsvSink(
+            stream, batch_size=batch_size, close_stream=stream is not sys.stdout
+        )
+    if export_format == "parquet":
+        if path == "-":
+            raise ValueError("Parquet export needs an --output file path.")
+        if compress:
+            raise ValueError("--gzip does not apply to Parquet export.")
+        return ParquetSink(path, batch_size=batch_size)
+    raise ValueError(f"Unsupported export format '{export_format}'.")
@@ -0,0 +1,37 @@
+"""Azure Functions app running the collector on a schedule or on demand.
+
+Deploy the repository as a Python function app (v2 programming model). The
+triggers delegate to :mod:`function_handler`, which keeps clients and caches
+warm between invocations of an instance.
+"""
+
+import json
+import logging
+
+import azure.functions as func
+
+import config
+import function_handler
+
+logger = logging.getLogger(__name__)
+
+app = func.FunctionApp()
+
+
+@app.timer_trigger(
+    schedule=config.FUNCTION_SCHEDULE, arg_name="timer", run_on_startup=False
+)
+def collect_on_schedule(timer: func.TimerRequest) -> None:
+    """Collect the configured targets on the ``FUNCTION_SCHEDULE`` CRON."""
+    if timer.past_due:
+        logger.warning("Timer is past due.")
+    function_handler.handle_timer()
+
+
+@app.route(route="collect", methods=["POST"], auth_level=func.AuthLevel.FUNCTION)
+def collect_on_request(req: func.HttpRequest) -> func.HttpResponse:
+    """Collect the configured targets, or the one given in the query string."""
+    status, body = function_handler.handle_http(req.params)
+    return func.HttpResponse(
+        json.dumps(body), status_code=status, mimetype="application/json"
+    )
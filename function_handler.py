@@ -0,0 +1,168 @@
+"""Azure Functions entry points of the collector, callable without the host.
+
+:mod:`function_app` only wires triggers to :func:`run_collection` and
+:func:`handle_http`. Both can be called directly, for instance from a test or
+a Python shell. The first invocation creates the clients and their sessions,
+the resolver of project and definition ids (also persisted to the id cache)
+and the optional response cache. Warm invocations reuse them. The collector
+modules are imported at that point and not at cold start.
+"""
+
+from __future__ import annotations
+
+import logging
+import shlex
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import config
+
+if TYPE_CHECKING:  # pragma: no cover
+    from azure_devops.api_client import AzureDevOpsClient
+    from azure_devops.cache import ResponseCache
+    from scan import ScopeResolver
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmState:
+    """Objects kept alive across the invocations of a function app instance."""
+
+    client_core: "AzureDevOpsClient"
+    client_release: "AzureDevOpsClient"
+    resolver: "ScopeResolver"
+    cache: Optional["ResponseCache"] = None
+    invocations: int = 0
+
+
+_WARM_STATE: Optional[WarmState] = None
+_WARM_STATE_LOCK = threading.Lock()
+
+
+def get_warm_state() -> WarmState:
+    """Return the state of this instance, creating it on the first invocation."""
+    global _WARM_STATE  # pylint: disable=global-statement
+    with _WARM_STATE_LOCK:
+        if _WARM_STATE is None:
+            # pylint: disable=import-outside-toplevel
+            from azure_devops.api_client import AzureDevOpsClient
+            from azure_devops.cache import ResponseCache
+            from scan import ScopeResolver
+            from state import IdCache
+
+            cache = ResponseCache(config.CACHE_PATH) if config.CACHE_ENABLED else None
+            client_core = AzureDevOpsClient(
+                config.AZURE_ORG_URL, config.API_VERSION, cache=cache
+            )
+            client_release = AzureDevOpsClient(
+                config.AZURE_RELEASE_URL, config.API_VERSION, cache=cache
+            )
+            id_cache = IdCache() if config.ID_CACHE_ENABLED else None
+            _WARM_STATE = WarmState(
+                client_core,
+                client_release,
+                ScopeResolver(client_core, client_release, id_cache),
+                cache,
+            )
+        return _WARM_STATE
+
+
+def reset_warm_state() -> None:
+    """Drop the warm state, closing its response cache."""
+    global _WARM_STATE  # pylint: disable=global-statement
+    with _WARM_STATE_LOCK:
+        if _WARM_STATE is not None and _WARM_STATE.cache is not None:
+            _WARM_STATE.cache.close()
+        _WARM_STATE = None
+
+
+def run_collection(
+    argv: Optional[Sequence[str]] = None,
+    target: Optional[Tuple[str, str, Optional[str]]] = None,
+) -> Dict[str, Any]:
+    """Run one collection over the warm clients and return its report.
+
+    ``argv`` takes the command line options of :mod:`main` and defaults to
+    ``FUNCTION_ARGS``. ``target`` is a ``(project, definition, environment)``
+    collected instead of the configured targets. Request metrics are reset
+    first, so each report and metrics file only covers its own invocation.
+    """
+    # pylint: disable=import-outside-toplevel
+    from azure_devops.metrics import get_shared_metrics
+    from main import parse_args, report_run, run_scan
+    from scan import ScanTarget, load_targets
+
+    args = parse_args(list(argv) if argv is not None else shlex.split(config.FUNCTION_ARGS))
+    if target is not None:
+        targets = [ScanTarget(*target)]
+    elif args.targets is not None:
+        targets = load_targets(args.targets)
+    else:
+        targets = [ScanTarget(config.PROJECT_NAME, config.STAGE_NAME)]
+
+    state = get_warm_state()
+    state.invocations += 1
+    get_shared_metrics().reset()
+
+    started = time.perf_counter()
+    try:
+        results = run_scan(
+            args, state.client_core, state.client_release, targets, resolver=state.resolver
+        )
+    finally:
+        if state.resolver.id_cache is not None:
+            state.resolver.id_cache.save()
+    report_run(args.metrics_file)
+
+    return {
+        "invocation": state.invocations,
+        "warm": state.invocations > 1,
+        "seconds": round(time.perf_counter() - started, 3),
+        "records": sum(records or 0 for _, records in results),
+        "targets": {target.slug: records for target, records in results},
+        "failed": [target.slug for target, records in results if records is None],
+    }
+
+
+def handle_timer() -> Dict[str, Any]:
+    """Run the scheduled collection, raising when a target failed."""
+    report = run_collection()
+    if report["failed"]:
+        raise RuntimeError(f"Scan targets failed: {', '.join(report['failed'])}")
+    logger.info("Collected %d records in %.1fs.", report["records"], report["seconds"])
+    return report
+
+
+def handle_http(params: Mapping[str, str]) -> Tuple[int, Dict[str, Any]]:
+    """Run a collection on demand and return the HTTP status and JSON body.
+
+    ``project`` and ``definition`` query parameters, with an optional
+    ``environment``, collect that target instead of the configured ones.
+    Other options come from ``FUNCTION_ARGS`` only, so that callers cannot
+    choose arbitrary output paths.
+    """
+    target = None
+    if params.get("project") or params.get("definition"):
+        if not (params.get("project") and params.get("definition")):
+            return 400, {"error": "Both 'project' and 'definition' are required."}
+        target = (params["project"], params["definition"], params.get("environment"))
+
+    try:
+        report = run_collection(target=target)
+    except (RuntimeError, ValueError) as error:
+        logger.error("⚠️ Collection failed: %s", error)
+        return 500, {"error": str(error)}
+    return (500 if report["failed"] else 200), report
+
+
+__all__ = [
+    "WarmState",
+    "get_warm_state",
+    "handle_http",
+    "handle_timer",
+    "reset_warm_state",
+    "run_collection",
+]
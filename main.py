@@ -1,164 +1,534 @@
 """Command line utility to fetch release environment metrics."""
 
+# Modules only some runs need (asyncio, numpy, pyarrow, sqlite3, cassettes)
+# are imported where they are used, keeping them out of every startup.
+# pylint: disable=import-outside-toplevel
+
 from __future__ import annotations
 
+import argparse
 import json
 import logging
-from datetime import datetime, timezone
-
-from azure_devops.ado_services import (find_pr_by_commit_id,
-                                       get_active_release_environments,
-                                       get_all_artifact_metadata,
-                                       get_commit_date,
-                                       get_oldest_commit_from_pr,
-                                       get_project_id,
-                                       get_release_definition_id)
+import time
+from dataclasses import replace
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence, Tuple
+
 from azure_devops.api_client import AzureDevOpsClient
-from config import (API_VERSION, AZURE_ORG_URL, AZURE_RELEASE_URL, LOG_LEVEL,
-                    PROJECT_NAME, STAGE_NAME)
+from azure_devops.metrics import RequestMetrics, get_shared_metrics
+from azure_devops.models import ReleaseEnvironment
+from azure_http import get_shared_throttler, pool_exhaustion_stats
+from config import (
+    API_VERSION,
+    ASYNC_CONCURRENCY,
+    AZURE_ORG_URL,
+    AZURE_RELEASE_URL,
+    CACHE_ENABLED,
+    CACHE_PATH,
+    CHECKPOINT_ENABLED,
+    CHECKPOINT_PATH,
+    ID_CACHE_ENABLED,
+    LOG_LEVEL,
+    METRICS_TEXTFILE,
+    PROJECT_NAME,
+    SCAN_PARALLEL_TARGETS,
+    STAGE_NAME,
+    STATE_PATH,
+)
+from pipeline import (CollectionScope, UnitPayload, calculate_duration,
+                      iter_unit_payloads)
+from scan import (ScanTarget, ScopeResolver, load_targets, partition_path,
+                  scan_targets)
+from sinks import OutputSink, SynchronizedSink, TeeSink, open_sink
+from state import CheckpointJournal, IdCache, IncrementalState
+
+if TYPE_CHECKING:  # pragma: no cover
+    from aggregation import LeadTimeAggregator
+    from azure_devops.cache import ResponseCache
+    from azure_devops.cassette import Cassette
 
-logging.basicConfig(level=getattr(logging, LOG_LEVEL.upper(), logging.INFO))
 logger = logging.getLogger(__name__)
 
+__all__ = [
+    "build_parser",
+    "calculate_duration",
+    "collect_target",
+    "configure_logging",
+    "main",
+    "open_cache",
+    "open_cassette",
+    "open_checkpoint",
+    "open_id_cache",
+    "open_output",
+    "parse_args",
+    "report_metrics",
+    "report_run",
+    "report_startup",
+    "run_scan",
+    "write_summary",
+]
 
-def calculate_duration(from_date: str, to_date: str) -> dict:
-    """Return a duration breakdown between two ISO timestamps."""
-    start = datetime.fromisoformat(from_date.replace("Z", "+00:00"))
-    end = datetime.fromisoformat(to_date.replace("Z", "+00:00"))
 
-    delta = (end - start).total_seconds()
-    return {
-        "seconds": int(delta),
-        "minutes": round(delta / 60, 2),
-        "hours": round(delta / 3600, 2),
-    }
+def configure_logging() -> None:
+    """Configure the root logger of the command line tool from ``LOG_LEVEL``."""
+    logging.basicConfig(level=getattr(logging, LOG_LEVEL.upper(), logging.INFO))
 
 
-def main() -> None:  # pragma: no cover
-    """Main entry point to collect and print DORA Lead Time metrics per artifact."""
+def build_parser(description: Optional[str] = __doc__) -> argparse.ArgumentParser:
+    """Return the parser of the collector options, shared with other commands."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="collect artifacts concurrently with the asyncio engine",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=ASYNC_CONCURRENCY,
+        help="maximum number of requests in flight per client in async mode",
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=CACHE_ENABLED,
+        help="serve immutable resources from the on-disk response cache",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="empty the response cache before collecting",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=CACHE_PATH,
+        help="location of the SQLite response cache",
+    )
+    parser.add_argument(
+        "--id-cache",
+        action=argparse.BooleanOptionalAction,
+        default=ID_CACHE_ENABLED,
+        help="reuse the project and definition ids resolved by earlier runs",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record",
+        metavar="CASSETTE",
+        default=None,
+        help="record every Azure DevOps response to a gzipped cassette file",
+    )
+    cassette.add_argument(
+        "--replay",
+        metavar="CASSETTE",
+        default=None,
+        help="serve the run from a recorded cassette, without network access",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only collect environments deployed after the stored watermark",
+    )
+    parser.add_argument(
+        "--reset-state",
+        action="store_true",
+        help="ignore the stored watermark and recompute everything",
+    )
+    parser.add_argument(
+        "--state-file",
+        default=STATE_PATH,
+        help="location of the incremental watermark",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action=argparse.BooleanOptionalAction,
+        default=CHECKPOINT_ENABLED,
+        help="journal completed units so that an interrupted run can be resumed",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the units journaled by an interrupted run and replay their "
+        "records (implies --checkpoint)",
+    )
+    parser.add_argument(
+        "--checkpoint-file",
+        default=CHECKPOINT_PATH,
+        help="location of the checkpoint journal",
+    )
+    parser.add_argument(
+        "--targets",
+        default=None,
+        help="JSON file listing the (project, definition, environment) to scan",
+    )
+    parser.add_argument(
+        "--parallel-targets",
+        type=int,
+        default=SCAN_PARALLEL_TARGETS,
+        help="number of scan targets collected at the same time",
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="NDJSON destination file, '-' for stdout (default); "
+        "partitioned per target when scanning",
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=("ndjson", "csv", "parquet"),
+        default="ndjson",
+        help="record format: nested NDJSON or flattened CSV / Parquet rows",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="rows per CSV write / Parquet row group",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="gzip the output (implied by a .gz output path)",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="report lead time percentiles per repository, definition and week",
+    )
+    parser.add_argument(
+        "--summary-output",
+        default=None,
+        help="write the summary report as JSON to this file instead of the log",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=METRICS_TEXTFILE,
+        help="write per-endpoint request metrics as a Prometheus textfile",
+    )
+    return parser
 
-    client_core = AzureDevOpsClient(AZURE_ORG_URL, API_VERSION)
-    client_release = AzureDevOpsClient(AZURE_RELEASE_URL, API_VERSION)
 
-    project_id = get_project_id(client_core, PROJECT_NAME)
-    release_def_id = get_release_definition_id(client_release, project_id, STAGE_NAME)
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line options."""
+    return build_parser().parse_args(argv)
 
-    environments = get_active_release_environments(
-        client_release, project_id, release_def_id
-    )
 
-    for env in environments:
-        deployed_at = env.environment_finished_at
-        if not deployed_at:
-            continue
+def write_summary(aggregator: LeadTimeAggregator, path: Optional[str]) -> None:
+    """Emit the aggregated lead time report to ``path`` or the log."""
+    summary = aggregator.summarize()
+    if path:
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle, indent=2)
+        logger.info("Lead time summary written to %s.", path)
+    else:
+        logger.info("Lead time summary:\n%s", json.dumps(summary, indent=2))
 
-        try:
-            artifacts = get_all_artifact_metadata(
-                client_release, PROJECT_NAME, env.release_id
-            )
-        except ValueError as error:
-            logger.warning("⚠️ Unable to read release artifacts : %s", error)
-            continue
 
-        for artifact in artifacts:
-            commit_id = artifact.commit_id
-            repo_id = artifact.repository_id
+def report_metrics(metrics: RequestMetrics, path: Optional[str]) -> None:
+    """Log the per-endpoint request summary and write the optional textfile."""
+    if not metrics.snapshot():
+        return
+    logger.info("Azure DevOps requests:\n%s", metrics.summary())
+    if path:
+        metrics.write_prometheus(path)
+        logger.info("Request metrics written to %s.", path)
 
-            commit_date = get_commit_date(client_core, PROJECT_NAME, repo_id, commit_id)
 
-            if not commit_date:
-                logger.warning(
-                    "⚠️ Commit date not found for artifact %s (commit %s). Artifact ignored.",
-                    artifact.alias,
-                    commit_id,
-                )
-                continue
+def open_output(args: argparse.Namespace, path: Optional[str] = None) -> OutputSink:
+    """Return the sink selected by ``--output`` (or ``path``) and ``--format``."""
+    path = path or args.output
+    if args.output_format == "ndjson":
+        return open_sink(path, compress=args.gzip)
 
-            metrics = {
-                "lead_time_artifact_commit_to_prod": calculate_duration(
-                    commit_date, deployed_at
-                )
-            }
+    from export import open_export_sink
 
-            pr = find_pr_by_commit_id(
-                client_core, PROJECT_NAME, repo_id, commit_id, artifact.branch_name
-            )
+    return open_export_sink(path, args.output_format, args.batch_size, args.gzip)
+
+
+def open_cache(args: argparse.Namespace) -> Optional[ResponseCache]:
+    """Return the response cache selected on the command line, if any."""
+    if not args.cache and not args.clear_cache:
+        return None
+
+    from azure_devops.cache import ResponseCache
+
+    cache = ResponseCache(args.cache_path)
+    if args.clear_cache:
+        cache.clear()
+        logger.info("Response cache %s cleared.", args.cache_path)
+    if not args.cache:
+        cache.close()
+        return None
+    return cache
+
+
+def open_cassette(args: argparse.Namespace) -> Optional[Cassette]:
+    """Return the cassette selected by ``--record`` or ``--replay``, if any."""
+    from azure_devops.cassette import RECORD, REPLAY, Cassette
+
+    if args.record:
+        return Cassette(args.record, RECORD)
+    if args.replay:
+        return Cassette(args.replay, REPLAY)
+    return None
+
+
+def open_id_cache(args: argparse.Namespace) -> Optional[IdCache]:
+    """Return the id cache unless disabled by ``--no-id-cache``.
 
-            if pr:
-                if pr.merged_at:
-                    metrics["lead_time_pr_to_prod"] = calculate_duration(
-                        pr.merged_at, deployed_at
-                    )
+    Runs recording or replaying a cassette resolve ids over the client so
+    that the cassette holds every request of the run.
+    """
+    if not args.id_cache or args.record or args.replay:
+        return None
+    return IdCache()
 
-                oldest_commit = get_oldest_commit_from_pr(
-                    client_core, PROJECT_NAME, repo_id, pr.id
+
+def open_checkpoint(
+    args: argparse.Namespace, path: Optional[str] = None
+) -> Optional[CheckpointJournal]:
+    """Return the checkpoint journal selected by ``--checkpoint`` or ``--resume``.
+
+    Runs recording or replaying a cassette are not checkpointed: a resumed
+    recording would miss the requests of the skipped units.
+    """
+    if not (args.checkpoint or args.resume) or args.record or args.replay:
+        return None
+    return CheckpointJournal(path or args.checkpoint_file, resume=args.resume)
+
+
+def collect_target(
+    args: argparse.Namespace,
+    client_core: AzureDevOpsClient,
+    client_release: AzureDevOpsClient,
+    target: ScanTarget,
+    scope: CollectionScope,
+    sink: OutputSink,
+    state_path: Optional[str] = None,
+    checkpoint_path: Optional[str] = None,
+) -> int:
+    """Collect one target into ``sink`` and return the number of records.
+
+    With a checkpoint journal, the records of resumed units are written
+    first. The journal is deleted once the target is complete and kept when
+    the collection fails.
+    """
+    filters = []
+    target_filter = target.environment_filter()
+    if target_filter:
+        filters.append(target_filter)
+
+    state = None
+    if args.incremental or args.reset_state:
+        state = IncrementalState(state_path or args.state_file, reset=args.reset_state)
+        scope = replace(scope, min_created_time=state.min_created_time())
+        # Last, so that only environments of the target advance the watermark.
+        filters.append(state.accept)
+
+    def environment_filter(env: ReleaseEnvironment) -> bool:
+        return all(accept(env) for accept in filters)
+
+    journal = open_checkpoint(args, checkpoint_path)
+    try:
+        records = journal.replay(sink) if journal is not None else 0
+        if args.use_async:
+            import asyncio
+
+            from pipeline import run_async_units
+
+            units: Iterable[UnitPayload] = asyncio.run(
+                run_async_units(
+                    client_core,
+                    client_release,
+                    scope,
+                    args.concurrency,
+                    environment_filter=environment_filter if filters else None,
+                    unit_filter=journal.pending if journal is not None else None,
+                    on_unit=journal.complete if journal is not None else None,
                 )
+            )
+        else:
+            units = iter_unit_payloads(
+                client_core,
+                client_release,
+                scope,
+                environment_filter=environment_filter if filters else None,
+                unit_filter=journal.pending if journal is not None else None,
+            )
+
+        for env, artifact, enriched_payload in units:
+            if enriched_payload:
+                sink.write(enriched_payload)
+                records += 1
+            # Async units are journaled as they complete, see run_async_units.
+            if journal is not None and not args.use_async:
+                journal.complete(env, artifact, enriched_payload)
+    except BaseException:
+        if journal is not None:
+            journal.close()
+        raise
+
+    if state is not None:
+        state.commit()
+    if journal is not None:
+        journal.discard()
+    return records
+
 
-                if not oldest_commit:
-                    logger.warning(
-                        "⚠️ No commit found for pull request %s linked to artifact %s. Artifact ignored.",
-                        pr.id,
-                        artifact.alias,
-                    )
-                    continue
-                oldest_commit_id, oldest_commit_date = oldest_commit
-            else:
-                continue
-
-            metrics["lead_time_pr_last_commit_to_prod"] = calculate_duration(
-                oldest_commit_date, deployed_at
+def run_scan(
+    args: argparse.Namespace,
+    client_core: AzureDevOpsClient,
+    client_release: AzureDevOpsClient,
+    targets: Sequence[ScanTarget],
+    cassette: Optional[Cassette] = None,
+    resolver: Optional[ScopeResolver] = None,
+) -> List[Tuple[ScanTarget, Optional[int]]]:
+    """Collect ``targets`` into the outputs selected by ``args``.
+
+    Targets are partitioned into their own output and state files when
+    ``--targets`` is given. Returns the records written per target, ``None``
+    for failed ones.
+    """
+    partitioned = args.targets is not None
+
+    # Sinks fed by every target; per-target files are opened by each run.
+    aggregator = None
+    if args.summary or args.summary_output:
+        from aggregation import LeadTimeAggregator
+
+        aggregator = LeadTimeAggregator()
+    shared: List[OutputSink] = [aggregator] if aggregator else []
+    if not partitioned or args.output == "-":
+        shared.append(open_output(args))
+    shared_sink = SynchronizedSink(TeeSink(*shared))
+
+    def run_target(target: ScanTarget, scope: CollectionScope) -> int:
+        if cassette is not None:
+            # Recorded and replayed runs share one timestamp for identical output.
+            scope = replace(scope, collected_at=cassette.recorded_at)
+        if not partitioned:
+            return collect_target(
+                args, client_core, client_release, target, scope, shared_sink
+            )
+        state_path = partition_path(args.state_file, target)
+        checkpoint_path = partition_path(args.checkpoint_file, target)
+        if args.output == "-":
+            return collect_target(
+                args,
+                client_core,
+                client_release,
+                target,
+                scope,
+                shared_sink,
+                state_path,
+                checkpoint_path,
             )
+        with open_output(args, partition_path(args.output, target)) as output:
+            return collect_target(
+                args,
+                client_core,
+                client_release,
+                target,
+                scope,
+                TeeSink(output, shared_sink),
+                state_path,
+                checkpoint_path,
+            )
+
+    try:
+        results = scan_targets(
+            client_core,
+            client_release,
+            targets,
+            run_target,
+            parallel=args.parallel_targets if partitioned else 1,
+            resolver=resolver,
+        )
+    finally:
+        shared_sink.close()
+
+    if aggregator is not None:
+        write_summary(aggregator, args.summary_output)
+    return results
+
+
+def report_run(metrics_path: Optional[str]) -> None:
+    """Log the throttling, connection pool and request statistics of the process."""
+    throttle_stats = get_shared_throttler().stats()
+    logger.info(
+        "Throttling: %d requests delayed for %.1fs, %d Retry-After, %d slowdowns.",
+        throttle_stats.throttled_requests,
+        throttle_stats.throttled_seconds,
+        throttle_stats.retry_after_responses,
+        throttle_stats.slowdowns,
+    )
+    for host, count in sorted(pool_exhaustion_stats().items()):
+        logger.warning("Connection pool of %s exhausted by %d requests.", host, count)
+    report_metrics(get_shared_metrics(), metrics_path)
+
+
+def report_startup(
+    started: float, metrics: RequestMetrics, id_cache: Optional[IdCache] = None
+) -> None:
+    """Log how long after ``started`` the first response arrived.
+
+    ``started`` is a :func:`time.perf_counter` value taken when the run
+    began. Together with ``python -X importtime main.py`` or
+    ``python -m benchmarks.startup``, this shows the fixed cost of short runs.
+    """
+    if metrics.first_response_at is None:
+        return
+    ids = f", {id_cache.hits} ids from cache" if id_cache is not None else ""
+    logger.info(
+        "Startup: first response %.0f ms after start%s.",
+        (metrics.first_response_at - started) * 1000,
+        ids,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:  # pragma: no cover
+    """Main entry point to collect and print DORA Lead Time metrics per artifact."""
+    started = time.perf_counter()
+    configure_logging()
+    args = parse_args(argv)
+
+    cassette = open_cassette(args)
+    # Cache hits never reach the network, so a cassette must see every request.
+    cache = None if cassette else open_cache(args)
+    client_core = AzureDevOpsClient(
+        AZURE_ORG_URL, API_VERSION, cache=cache, cassette=cassette
+    )
+    client_release = AzureDevOpsClient(
+        AZURE_RELEASE_URL, API_VERSION, cache=cache, cassette=cassette
+    )
+
+    targets = (
+        load_targets(args.targets)
+        if args.targets is not None
+        else [ScanTarget(PROJECT_NAME, STAGE_NAME)]
+    )
+    id_cache = open_id_cache(args)
+    resolver = ScopeResolver(client_core, client_release, id_cache)
+    try:
+        results = run_scan(
+            args, client_core, client_release, targets, cassette, resolver
+        )
+    finally:
+        if cassette is not None:
+            cassette.close()
+        if id_cache is not None:
+            id_cache.save()
+
+    report_startup(started, get_shared_metrics(), id_cache)
+    report_run(args.metrics_file)
+
+    if cache is not None:
+        logger.info("Response cache: %d hits, %d misses.", cache.hits, cache.misses)
+        cache.close()
 
-            enriched_payload = {
-                "timestamp": datetime.now(tz=timezone.utc).isoformat(),
-                "project": {
-                    "name": PROJECT_NAME,
-                    "id": project_id,
-                },
-                "release": {
-                    "id": env.release_id,
-                    "name": env.release_name,
-                    "status": env.release_status,
-                    "created_on": env.release_created_on,
-                    "modified_on": env.release_modified_on,
-                    "definition": STAGE_NAME,
-                    "deployed_at": deployed_at,
-                },
-                "environment": {
-                    "id": env.environment_id,
-                    "name": env.environment_name,
-                    "status": env.environment_status,
-                    "start_at": env.environment_start_at,
-                    "finished_at": env.environment_finished_at,
-                },
-                "repository": {
-                    "id": repo_id,
-                    "name": artifact.repository_name,
-                    "branch_name": artifact.branch_name,
-                },
-                "artifact": {
-                    "alias": artifact.alias,
-                    "branch_name": artifact.branch_name,
-                    "branch_id": artifact.branch_id,
-                    "commit_id": commit_id,
-                    "commit_date": commit_date,
-                    "build_id": artifact.build_id,
-                    "build_url": artifact.build_url,
-                },
-                "pullrequest": {
-                    "id": pr.id,
-                    "merged_at": pr.merged_at,
-                    "created_at": pr.created_at,
-                    "source_ref_name": pr.source_ref_name,
-                    "target_ref_name": pr.target_ref_name,
-                    "status": pr.status,
-                    "last_merge_commit_id": oldest_commit_id,
-                    "last_merge_commit_date": oldest_commit_date,
-                },
-                "metrics": metrics,
-            }
-
-            logger.info(json.dumps(enriched_payload, indent=2))
+    failed = [target.slug for target, records in results if records is None]
+    if failed:
+        raise SystemExit(f"Scan targets failed: {', '.join(failed)}")
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,607 @@
+"""Collection pipeline turning release environments into lead time payloads."""
+
+# The asyncio engine is imported by the async functions only, keeping it out
+# of the startup of synchronous runs.
+# pylint: disable=import-outside-toplevel
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from typing import (TYPE_CHECKING, Any, AsyncIterable, Callable, Dict, Iterable,
+                    Iterator, List, Optional, Tuple)
+
+import config
+from azure_devops.ado_services import (BatchedPullRequestResolver,
+                                       get_all_artifact_metadata,
+                                       get_commit_dates,
+                                       get_oldest_commit_from_pr,
+                                       get_project_id,
+                                       get_release_definition_id,
+                                       iter_active_release_environments)
+from azure_devops.api_client import AzureDevOpsClient
+from azure_devops.models import Artifact, PullRequest, ReleaseEnvironment
+from azure_devops.timestamps import to_epoch_us
+
+if TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+
+    from azure_devops import async_services
+    from azure_devops.async_client import AsyncAzureDevOpsClient
+
+logger = logging.getLogger(__name__)
+
+EnvironmentFilter = Callable[[ReleaseEnvironment], bool]
+UnitFilter = Callable[[ReleaseEnvironment, Artifact], bool]
+UnitPayload = Tuple[ReleaseEnvironment, Artifact, Optional[Dict[str, Any]]]
+UnitCallback = Callable[[ReleaseEnvironment, Artifact, Optional[Dict[str, Any]]], None]
+CommitDates = Dict[Tuple[str, str], Optional[str]]
+
+
+@dataclass(frozen=True)
+class CollectionScope:
+    """Resolved project and release definition a collection run works on.
+
+    The optional bounds restrict the release listing by creation time.
+    ``collected_at`` fixes the timestamp of the records, which otherwise is
+    the time each one is built.
+    """
+
+    project_name: str
+    project_id: str
+    definition_name: str
+    definition_id: int
+    min_created_time: Optional[str] = None
+    max_created_time: Optional[str] = None
+    collected_at: Optional[str] = None
+
+
+def duration_between(start_us: int, end_us: int) -> Dict[str, Any]:
+    """Return a duration breakdown between two epochs in microseconds."""
+    delta = (end_us - start_us) / 1_000_000
+    return {
+        "seconds": int(delta),
+        "minutes": round(delta / 60, 2),
+        "hours": round(delta / 3600, 2),
+    }
+
+
+def calculate_duration(from_date: str, to_date: str) -> dict:
+    """Return a duration breakdown between two ISO timestamps."""
+    return duration_between(to_epoch_us(from_date), to_epoch_us(to_date))
+
+
+def calculate_durations(
+    deployed_us: int,
+    commit_us: int,
+    merged_us: Optional[int],
+    oldest_commit_us: int,
+) -> Dict[str, Dict[str, Any]]:
+    """Return the three lead time metrics of an artifact from parsed epochs.
+
+    ``lead_time_pr_to_prod`` is left out when the pull request has no merge
+    date.
+    """
+    metrics = {
+        "lead_time_artifact_commit_to_prod": duration_between(commit_us, deployed_us)
+    }
+    if merged_us is not None:
+        metrics["lead_time_pr_to_prod"] = duration_between(merged_us, deployed_us)
+    metrics["lead_time_pr_last_commit_to_prod"] = duration_between(
+        oldest_commit_us, deployed_us
+    )
+    return metrics
+
+
+def resolve_scope(
+    client_core: AzureDevOpsClient,
+    client_release: AzureDevOpsClient,
+    project_name: str,
+    definition_name: str,
+) -> CollectionScope:
+    """Resolve the project and release definition identifiers of a run."""
+    project_id = get_project_id(client_core, project_name)
+    definition_id = get_release_definition_id(
+        client_release, project_id, definition_name
+    )
+    return CollectionScope(project_name, project_id, definition_name, definition_id)
+
+
+def build_enriched_payload(
+    scope: CollectionScope,
+    env: ReleaseEnvironment,
+    artifact: Artifact,
+    commit_date: str,
+    pr: PullRequest,
+    oldest_commit: Tuple[str, str],
+) -> Dict[str, Any]:
+    """Assemble the lead time record of one deployed artifact."""
+    deployed_at = env.environment_finished_at
+    oldest_commit_id, oldest_commit_date = oldest_commit
+    # Only finished environments are collected, so this is parsed already.
+    deployed_us = env.environment_finished_us or to_epoch_us(deployed_at)
+
+    metrics = calculate_durations(
+        deployed_us,
+        to_epoch_us(commit_date),
+        pr.merged_us,
+        to_epoch_us(oldest_commit_date),
+    )
+
+    return {
+        "timestamp": scope.collected_at or datetime.now(tz=timezone.utc).isoformat(),
+        "project": {
+            "name": scope.project_name,
+            "id": scope.project_id,
+        },
+        "release": {
+            "id": env.release_id,
+            "name": env.release_name,
+            "status": env.release_status,
+            "created_on": env.release_created_on,
+            "modified_on": env.release_modified_on,
+            "definition": scope.definition_name,
+            "deployed_at": deployed_at,
+        },
+        "environment": {
+            "id": env.environment_id,
+            "name": env.environment_name,
+            "status": env.environment_status,
+            "start_at": env.environment_start_at,
+            "finished_at": env.environment_finished_at,
+        },
+        "repository": {
+            "id": artifact.repository_id,
+            "name": artifact.repository_name,
+            "branch_name": artifact.branch_name,
+        },
+        "artifact": {
+            "alias": artifact.alias,
+            "branch_name": artifact.branch_name,
+            "branch_id": artifact.branch_id,
+            "commit_id": artifact.commit_id,
+            "commit_date": commit_date,
+            "build_id": artifact.build_id,
+            "build_url": artifact.build_url,
+        },
+        "pullrequest": {
+            "id": pr.id,
+            "merged_at": pr.merged_at,
+            "created_at": pr.created_at,
+            "source_ref_name": pr.source_ref_name,
+            "target_ref_name": pr.target_ref_name,
+            "status": pr.status,
+            "last_merge_commit_id": oldest_commit_id,
+            "last_merge_commit_date": oldest_commit_date,
+        },
+        "metrics": metrics,
+    }
+
+
+def _warn_missing_commit_date(artifact: Artifact) -> None:
+    logger.warning(
+        "⚠️ Commit date not found for artifact %s (commit %s). Artifact ignored.",
+        artifact.alias,
+        artifact.commit_id,
+    )
+
+
+def _warn_missing_pr_commit(pr: PullRequest, artifact: Artifact) -> None:
+    logger.warning(
+        "⚠️ No commit found for pull request %s linked to artifact %s. Artifact ignored.",
+        pr.id,
+        artifact.alias,
+    )
+
+
+def _commit_key(artifact: Artifact) -> Tuple[str, str]:
+    return artifact.repository_id, artifact.commit_id.lower()
+
+
+def _group_commits_by_repository(artifacts: Iterable[Artifact]) -> Dict[str, List[str]]:
+    """Return the distinct commit ids of ``artifacts`` per repository."""
+    commits: Dict[str, List[str]] = {}
+    for artifact in artifacts:
+        commits.setdefault(artifact.repository_id, []).append(artifact.commit_id)
+    return commits
+
+
+def resolve_commit_dates(
+    client_core: AzureDevOpsClient,
+    project_name: str,
+    artifacts: Iterable[Artifact],
+) -> CommitDates:
+    """Resolve the commit date of every artifact with one batch per repository."""
+    dates: CommitDates = {}
+    for repo_id, commit_ids in _group_commits_by_repository(artifacts).items():
+        resolved = get_commit_dates(
+            client_core, project_name, repo_id, commit_ids, config.COMMITS_BATCH_SIZE
+        )
+        for commit_id, commit_date in resolved.items():
+            dates[(repo_id, commit_id)] = commit_date
+    return dates
+
+
+def _iter_environment_artifacts(
+    client_release: AzureDevOpsClient,
+    scope: CollectionScope,
+    environments: Iterable[ReleaseEnvironment],
+    environment_filter: Optional[EnvironmentFilter],
+    unit_filter: Optional[UnitFilter] = None,
+) -> Iterator[Tuple[ReleaseEnvironment, List[Artifact]]]:
+    """Yield each deployed environment with the artifacts of its release.
+
+    Artifacts expanded in the release listing are used as is; otherwise the
+    release is fetched once and reused for its other environments. Artifacts
+    rejected by ``unit_filter`` are left out, and so are environments left
+    without any.
+    """
+    fetched: Dict[int, Optional[List[Artifact]]] = {}
+    for env in environments:
+        if not env.environment_finished_at:
+            continue
+        if environment_filter and not environment_filter(env):
+            continue
+
+        if env.artifacts is not None:
+            artifacts: Optional[List[Artifact]] = list(env.artifacts)
+        else:
+            artifacts = _fetch_artifacts(client_release, scope, env.release_id, fetched)
+        if artifacts and unit_filter:
+            artifacts = [artifact for artifact in artifacts if unit_filter(env, artifact)]
+        if artifacts:
+            yield env, artifacts
+
+
+def _fetch_artifacts(
+    client_release: AzureDevOpsClient,
+    scope: CollectionScope,
+    release_id: int,
+    fetched: Dict[int, Optional[List[Artifact]]],
+) -> Optional[List[Artifact]]:
+    """Return the artifacts of a release, fetched once per run."""
+    if release_id not in fetched:
+        try:
+            fetched[release_id] = get_all_artifact_metadata(
+                client_release, scope.project_name, release_id
+            )
+        except ValueError as error:
+            logger.warning("⚠️ Unable to read release artifacts : %s", error)
+            fetched[release_id] = None
+    return fetched[release_id]
+
+
+def _collect_artifact(
+    client_core: AzureDevOpsClient,
+    pr_index: BatchedPullRequestResolver,
+    scope: CollectionScope,
+    env: ReleaseEnvironment,
+    artifact: Artifact,
+    commit_date: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    """Resolve the pull request of one artifact and build its payload."""
+    if not commit_date:
+        _warn_missing_commit_date(artifact)
+        return None
+
+    repo_id = artifact.repository_id
+    pr = pr_index.find(repo_id, artifact.commit_id, artifact.branch_name)
+    if not pr:
+        return None
+
+    oldest_commit = get_oldest_commit_from_pr(
+        client_core, scope.project_name, repo_id, pr.id
+    )
+    if not oldest_commit:
+        _warn_missing_pr_commit(pr, artifact)
+        return None
+
+    return build_enriched_payload(scope, env, artifact, commit_date, pr, oldest_commit)
+
+
+def iter_payloads(
+    client_core: AzureDevOpsClient,
+    client_release: AzureDevOpsClient,
+    scope: CollectionScope,
+    environments: Optional[Iterable[ReleaseEnvironment]] = None,
+    environment_filter: Optional[EnvironmentFilter] = None,
+    batch_size: int = config.COMMIT_BATCH_ENVIRONMENTS,
+    unit_filter: Optional[UnitFilter] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the lead time payload of every artifact, one request at a time.
+
+    Environments are consumed ``batch_size`` at a time so that the commit
+    dates of all their artifacts are resolved with one ``commitsbatch`` query
+    per repository instead of one request per artifact, and their pull
+    requests with one ``pullrequestquery`` per repository.
+    """
+    for _, _, payload in iter_unit_payloads(
+        client_core,
+        client_release,
+        scope,
+        environments,
+        environment_filter,
+        batch_size,
+        unit_filter,
+    ):
+        if payload:
+            yield payload
+
+
+def iter_unit_payloads(
+    client_core: AzureDevOpsClient,
+    client_release: AzureDevOpsClient,
+    scope: CollectionScope,
+    environments: Optional[Iterable[ReleaseEnvironment]] = None,
+    environment_filter: Optional[EnvironmentFilter] = None,
+    batch_size: int = config.COMMIT_BATCH_ENVIRONMENTS,
+    unit_filter: Optional[UnitFilter] = None,
+) -> Iterator[UnitPayload]:
+    """Yield every unit accepted by ``unit_filter`` with its payload, if any.
+
+    Like :func:`iter_payloads`, but units whose artifact was skipped are
+    yielded too, with a ``None`` payload, so that callers can checkpoint
+    every completed unit.
+    """
+    if environments is None:
+        environments = iter_active_release_environments(
+            client_release,
+            scope.project_id,
+            scope.definition_id,
+            min_created_time=scope.min_created_time,
+            max_created_time=scope.max_created_time,
+        )
+    pr_index = BatchedPullRequestResolver(client_core, scope.project_name)
+    units = _iter_environment_artifacts(
+        client_release, scope, environments, environment_filter, unit_filter
+    )
+
+    while True:
+        batch = list(islice(units, batch_size))
+        if not batch:
+            return
+
+        commit_dates = resolve_commit_dates(
+            client_core,
+            scope.project_name,
+            (artifact for _, artifacts in batch for artifact in artifacts),
+        )
+        pr_index.resolve(
+            artifact
+            for _, artifacts in batch
+            for artifact in artifacts
+            if commit_dates.get(_commit_key(artifact))
+        )
+        for env, artifacts in batch:
+            for artifact in artifacts:
+                payload = _collect_artifact(
+                    client_core,
+                    pr_index,
+                    scope,
+                    env,
+                    artifact,
+                    commit_dates.get(_commit_key(artifact)),
+                )
+                yield env, artifact, payload
+
+
+async def resolve_commit_dates_async(
+    client_core: AsyncAzureDevOpsClient,
+    project_name: str,
+    artifacts: Iterable[Artifact],
+) -> CommitDates:
+    """Resolve the commit date of every artifact, repositories concurrently."""
+    import asyncio
+
+    from azure_devops import async_services
+
+    grouped = _group_commits_by_repository(artifacts)
+    results = await asyncio.gather(
+        *(
+            async_services.get_commit_dates(
+                client_core,
+                project_name,
+                repo_id,
+                commit_ids,
+                config.COMMITS_BATCH_SIZE,
+            )
+            for repo_id, commit_ids in grouped.items()
+        )
+    )
+
+    dates: CommitDates = {}
+    for repo_id, resolved in zip(grouped, results):
+        for commit_id, commit_date in resolved.items():
+            dates[(repo_id, commit_id)] = commit_date
+    return dates
+
+
+async def _read_artifacts_async(
+    client_release: AsyncAzureDevOpsClient,
+    scope: CollectionScope,
+    release_id: int,
+) -> List[Artifact]:
+    """Fetch the artifacts of a release whose listing did not expand them."""
+    from azure_devops import async_services
+
+    try:
+        return await async_services.get_all_artifact_metadata(
+            client_release, scope.project_name, release_id
+        )
+    except ValueError as error:
+        logger.warning("⚠️ Unable to read release artifacts : %s", error)
+        return []
+
+
+async def _collect_artifact_async(
+    client_core: AsyncAzureDevOpsClient,
+    pr_index: async_services.BatchedPullRequestResolver,
+    scope: CollectionScope,
+    unit: Tuple[ReleaseEnvironment, Artifact],
+    commit_dates: "asyncio.Task[CommitDates]",
+) -> Optional[Dict[str, Any]]:
+    """Resolve one artifact; the PR lookup overlaps the commit date batch."""
+    import asyncio
+
+    from azure_devops import async_services
+
+    env, artifact = unit
+    repo_id = artifact.repository_id
+    pr, dates = await asyncio.gather(
+        pr_index.find(repo_id, artifact.commit_id, artifact.branch_name),
+        commit_dates,
+    )
+    commit_date = dates.get(_commit_key(artifact))
+    if not commit_date:
+        _warn_missing_commit_date(artifact)
+        return None
+    if not pr:
+        return None
+
+    oldest_commit = await async_services.get_oldest_commit_from_pr(
+        client_core, scope.project_name, repo_id, pr.id
+    )
+    if not oldest_commit:
+        _warn_missing_pr_commit(pr, artifact)
+        return None
+
+    return build_enriched_payload(scope, env, artifact, commit_date, pr, oldest_commit)
+
+
+async def collect_payloads_async(
+    client_core: AsyncAzureDevOpsClient,
+    client_release: AsyncAzureDevOpsClient,
+    scope: CollectionScope,
+    environments: Optional[AsyncIterable[ReleaseEnvironment]] = None,
+    environment_filter: Optional[EnvironmentFilter] = None,
+    unit_filter: Optional[UnitFilter] = None,
+) -> List[Dict[str, Any]]:
+    """Collect all payloads concurrently, in the same order as :func:`iter_payloads`.
+
+    Artifacts not expanded in the listing are fetched, once per release, as
+    soon as the listing yields the environment.
+    The commit dates and the pull requests of the whole run are then resolved
+    in batches, concurrently, and the clients' semaphores bound the number of
+    requests in flight.
+    """
+    units = await collect_unit_payloads_async(
+        client_core, client_release, scope, environments, environment_filter, unit_filter
+    )
+    return [payload for _, _, payload in units if payload]
+
+
+async def collect_unit_payloads_async(
+    client_core: AsyncAzureDevOpsClient,
+    client_release: AsyncAzureDevOpsClient,
+    scope: CollectionScope,
+    environments: Optional[AsyncIterable[ReleaseEnvironment]] = None,
+    environment_filter: Optional[EnvironmentFilter] = None,
+    unit_filter: Optional[UnitFilter] = None,
+    on_unit: Optional[UnitCallback] = None,
+) -> List[UnitPayload]:
+    """Collect every unit accepted by ``unit_filter`` with its payload, if any.
+
+    ``on_unit`` is called with each unit as soon as it is collected, in
+    completion order, so that a checkpoint journal keeps the finished units
+    of a run that fails later on.
+    """
+    import asyncio
+
+    from azure_devops import async_services
+
+    if environments is None:
+        environments = async_services.iter_active_release_environments(
+            client_release,
+            scope.project_id,
+            scope.definition_id,
+            min_created_time=scope.min_created_time,
+            max_created_time=scope.max_created_time,
+        )
+    pr_index = async_services.BatchedPullRequestResolver(client_core, scope.project_name)
+
+    deployed: List[ReleaseEnvironment] = []
+    reads: Dict[int, "asyncio.Task[List[Artifact]]"] = {}
+    async for env in environments:
+        if not env.environment_finished_at:
+            continue
+        if environment_filter and not environment_filter(env):
+            continue
+        deployed.append(env)
+        if env.artifacts is None and env.release_id not in reads:
+            reads[env.release_id] = asyncio.create_task(
+                _read_artifacts_async(client_release, scope, env.release_id)
+            )
+
+    await asyncio.gather(*reads.values())
+    units = [
+        (env, artifact)
+        for env in deployed
+        for artifact in (
+            env.artifacts
+            if env.artifacts is not None
+            else reads[env.release_id].result()
+        )
+        if unit_filter is None or unit_filter(env, artifact)
+    ]
+    commit_dates = asyncio.create_task(
+        resolve_commit_dates_async(
+            client_core, scope.project_name, (artifact for _, artifact in units)
+        )
+    )
+    pr_index.resolve(artifact for _, artifact in units)
+
+    async def collect(
+        unit: Tuple[ReleaseEnvironment, Artifact]
+    ) -> Optional[Dict[str, Any]]:
+        payload = await _collect_artifact_async(
+            client_core, pr_index, scope, unit, commit_dates
+        )
+        if on_unit is not None:
+            on_unit(*unit, payload)
+        return payload
+
+    payloads = await asyncio.gather(*(collect(unit) for unit in units))
+    await commit_dates
+    return [(env, artifact, payload) for (env, artifact), payload in zip(units, payloads)]
+
+
+async def run_async(
+    client_core: AzureDevOpsClient,
+    client_release: AzureDevOpsClient,
+    scope: CollectionScope,
+    max_concurrency: int,
+    environment_filter: Optional[EnvironmentFilter] = None,
+) -> List[Dict[str, Any]]:
+    """Asynchronous pipeline entry point with a bounded number of requests."""
+    units = await run_async_units(
+        client_core, client_release, scope, max_concurrency, environment_filter
+    )
+    return [payload for _, _, payload in units if payload]
+
+
+async def run_async_units(
+    client_core: AzureDevOpsClient,
+    client_release: AzureDevOpsClient,
+    scope: CollectionScope,
+    max_concurrency: int,
+    environment_filter: Optional[EnvironmentFilter] = None,
+    unit_filter: Optional[UnitFilter] = None,
+    on_unit: Optional[UnitCallback] = None,
+) -> List[UnitPayload]:
+    """Like :func:`run_async`, returning every unit with its payload, if any.
+
+    ``on_unit`` is called as each unit completes, see
+    :func:`collect_unit_payloads_async`.
+    """
+    from azure_devops.async_client import AsyncAzureDevOpsClient
+
+    return await collect_unit_payloads_async(
+        AsyncAzureDevOpsClient(client_core, max_concurrency),
+        AsyncAzureDevOpsClient(client_release, max_concurrency),
+        scope,
+        environment_filter=environment_filter,
+        unit_filter=unit_filter,
+        on_unit=on_unit,
+    )
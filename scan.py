@@ -0,0 +1,195 @@
+"""Multi-target scans collecting several projects and definitions in one run."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+import config
+from azure_devops.ado_services import get_project_id, get_release_definition_id
+from azure_devops.api_client import AzureDevOpsClient
+from azure_devops.models import ReleaseEnvironment
+from pipeline import CollectionScope, EnvironmentFilter
+from state import IdCache
+
+logger = logging.getLogger(__name__)
+
+TARGET_PLACEHOLDER = "{target}"
+
+
+@dataclass(frozen=True)
+class ScanTarget:
+    """A release definition to collect, optionally limited to one environment."""
+
+    project: str
+    definition: str
+    environment: Optional[str] = None
+
+    @property
+    def slug(self) -> str:
+        """Return a file name friendly identifier of the target."""
+        parts = [self.project, self.definition]
+        if self.environment:
+            parts.append(self.environment)
+        return "__".join(re.sub(r"[^A-Za-z0-9._-]+", "_", part) for part in parts)
+
+    def environment_filter(self) -> Optional[EnvironmentFilter]:
+        """Return the filter keeping only the target environment, if any."""
+        if not self.environment:
+            return None
+        name = self.environment
+
+        def accept(env: ReleaseEnvironment) -> bool:
+            return env.environment_name == name
+
+        return accept
+
+
+def load_targets(path: str) -> List[ScanTarget]:
+    """Read the scan targets listed in the JSON file at ``path``.
+
+    The file holds ``{"targets": [{"project": ..., "definition": ...,
+    "environment": ...}]}``; ``environment`` is optional.
+    """
+    try:
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        targets = [
+            ScanTarget(
+                item["project"], item["definition"], item.get("environment") or None
+            )
+            for item in data["targets"]
+        ]
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValueError(f"Invalid scan targets file {path}: {error!r}") from error
+
+    if not targets:
+        raise ValueError(f"Scan targets file {path} lists no target.")
+    slugs = [target.slug for target in targets]
+    duplicates = sorted({slug for slug in slugs if slugs.count(slug) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate scan targets in {path}: {', '.join(duplicates)}")
+    return targets
+
+
+def partition_path(path: str, target: ScanTarget) -> str:
+    """Return the per-target variant of an output or state file path.
+
+    A ``{target}`` placeholder is replaced by the target slug; otherwise the
+    slug is inserted before the extensions (``out.ndjson.gz`` becomes
+    ``out.<slug>.ndjson.gz``).
+    """
+    if TARGET_PLACEHOLDER in path:
+        return path.replace(TARGET_PLACEHOLDER, target.slug)
+    directory, name = os.path.split(path)
+    stem, dot, extensions = name.partition(".")
+    return os.path.join(directory, f"{stem}.{target.slug}{dot}{extensions}")
+
+
+class ScopeResolver:
+    """Resolve target scopes, looking each project and definition up only once.
+
+    A resolver lives for a run, or across the warm invocations of a function
+    app, since ids never change once created. With an ``id_cache`` the ids
+    resolved by earlier runs are reused too.
+    """
+
+    def __init__(
+        self,
+        client_core: AzureDevOpsClient,
+        client_release: AzureDevOpsClient,
+        id_cache: Optional[IdCache] = None,
+    ) -> None:
+        self.client_core = client_core
+        self.client_release = client_release
+        self.id_cache = id_cache
+        self._ids: Dict[Tuple[Any, ...], Any] = {}
+        self._lookups: Dict[Tuple[Any, ...], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, target: ScanTarget) -> CollectionScope:
+        """Return the collection scope of ``target``."""
+        project_id = self._resolve_id(
+            (self.client_core.base_url, "project", target.project),
+            lambda: get_project_id(self.client_core, target.project),
+        )
+        definition_id = self._resolve_id(
+            (self.client_release.base_url, "definition", project_id, target.definition),
+            lambda: get_release_definition_id(
+                self.client_release, project_id, target.definition
+            ),
+        )
+        return CollectionScope(
+            target.project, project_id, target.definition, definition_id
+        )
+
+    def _resolve_id(self, key: Tuple[Any, ...], resolve: Callable[[], Any]) -> Any:
+        """Return the memoized id of ``key``, resolving it once.
+
+        ``self._lock`` only guards the memos. Concurrent lookups of the same
+        key wait on a lock of their own, while other keys resolve in parallel.
+        """
+        with self._lock:
+            if key in self._ids:
+                return self._ids[key]
+            lookup = self._lookups.setdefault(key, threading.Lock())
+
+        with lookup:
+            with self._lock:
+                if key in self._ids:
+                    return self._ids[key]
+            value = self._cached(key, resolve)
+            with self._lock:
+                self._ids[key] = value
+                del self._lookups[key]
+        return value
+
+    def _cached(self, key: Tuple[Any, ...], resolve: Callable[[], Any]) -> Any:
+        if self.id_cache is None:
+            return resolve()
+        value = self.id_cache.get(*key)
+        if value is None:
+            value = resolve()
+            self.id_cache.set(value, *key)
+        return value
+
+
+TargetRunner = Callable[[ScanTarget, CollectionScope], int]
+
+
+def scan_targets(
+    client_core: AzureDevOpsClient,
+    client_release: AzureDevOpsClient,
+    targets: Sequence[ScanTarget],
+    run_target: TargetRunner,
+    parallel: int = config.SCAN_PARALLEL_TARGETS,
+    resolver: Optional[ScopeResolver] = None,
+) -> List[Tuple[ScanTarget, Optional[int]]]:
+    """Collect every target over the shared clients, ``parallel`` at a time.
+
+    ``run_target`` collects one resolved target and returns its number of
+    records. A failing target is logged and reported with ``None`` without
+    interrupting the others. Passing a ``resolver`` reuses the ids it
+    already resolved.
+    """
+    resolver = resolver or ScopeResolver(client_core, client_release)
+
+    def collect(target: ScanTarget) -> Optional[int]:
+        try:
+            records = run_target(target, resolver.resolve(target))
+        except (requests.RequestException, OSError, RuntimeError, ValueError) as error:
+            logger.error("⚠️ Scan target %s failed: %s", target.slug, error)
+            return None
+        logger.info("Scan target %s: %d records.", target.slug, records)
+        return records
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+        return list(zip(targets, executor.map(collect, targets)))
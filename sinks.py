@@ -0,0 +1,128 @@
+"""Output sinks receiving the enriched lead time payloads."""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import sys
+import threading
+from abc import ABC, abstractmethod
+from typing import IO, Any, Dict, List, Optional
+
+import config
+
+
+class OutputSink(ABC):
+    """Destination of the records produced by a collection run."""
+
+    @abstractmethod
+    def write(self, record: Dict[str, Any]) -> None:
+        """Accept one enriched payload."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Flush pending records and release the underlying resources."""
+
+    def __enter__(self) -> "OutputSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class NdjsonSink(OutputSink):
+    """Write records as compact newline-delimited JSON.
+
+    Serialized lines are buffered and flushed every ``flush_every`` records
+    so that consumers tailing the output see records while the run goes on.
+    """
+
+    def __init__(
+        self,
+        stream: IO[str],
+        flush_every: int = config.OUTPUT_FLUSH_RECORDS,
+        close_stream: bool = False,
+    ) -> None:
+        self.stream = stream
+        self.flush_every = max(1, flush_every)
+        self.close_stream = close_stream
+        self.records_written = 0
+        self._pending: List[str] = []
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._pending.append(
+            json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+        )
+        self.records_written += 1
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered lines to the stream."""
+        if self._pending:
+            self.stream.write("\n".join(self._pending) + "\n")
+            self._pending.clear()
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self.close_stream:
+            self.stream.close()
+
+
+class TeeSink(OutputSink):
+    """Forward every record to several sinks."""
+
+    def __init__(self, *sinks: OutputSink) -> None:
+        self.sinks = sinks
+
+    def write(self, record: Dict[str, Any]) -> None:
+        for sink in self.sinks:
+            sink.write(record)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+class SynchronizedSink(OutputSink):
+    """Serialize the writes of several threads to a shared sink."""
+
+    def __init__(self, sink: OutputSink) -> None:
+        self.sink = sink
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.sink.write(record)
+
+    def close(self) -> None:
+        with self._lock:
+            self.sink.close()
+
+
+def open_output_stream(path: str, compress: bool = False) -> IO[str]:
+    """Open ``path`` (``-`` for stdout) for text output, gzipped if requested."""
+    compress = compress or path.endswith(".gz")
+    if path == "-":
+        if compress:
+            return io.TextIOWrapper(
+                gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb"), encoding="utf-8"
+            )
+        return sys.stdout
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")  # pylint: disable=consider-using-with
+
+
+def open_sink(
+    path: str = "-", compress: bool = False, flush_every: Optional[int] = None
+) -> OutputSink:
+    """Return the default NDJSON sink writing to ``path``."""
+    stream = open_output_stream(path, compress)
+    return NdjsonSink(
+        stream,
+        flush_every=flush_every or config.OUTPUT_FLUSH_RECORDS,
+        close_stream=stream is not sys.stdout,
+    )
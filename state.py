@@ -0,0 +1,279 @@
+"""Persisted local state: incremental watermarks, resolved ids and checkpoints."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import IO, Any, Callable, Dict, Optional, Set, Tuple
+
+import config
+from azure_devops.models import Artifact, ReleaseEnvironment
+from azure_devops.timestamps import parse_timestamp, to_epoch_us
+from sinks import OutputSink
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """Most recent deployment already processed by an incremental run."""
+
+    release_id: int
+    environment_finished_at: str
+
+    def key(self) -> Tuple[int, int]:
+        """Return the ordering key of the watermark."""
+        return to_epoch_us(self.environment_finished_at), self.release_id
+
+
+def load_watermark(path: str) -> Optional[Watermark]:
+    """Read the watermark stored at ``path``, if any."""
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return Watermark(**json.load(handle))
+    except FileNotFoundError:
+        return None
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"Invalid incremental state file {path}: {error}") from error
+
+
+def save_watermark(path: str, watermark: Watermark) -> None:
+    """Atomically write ``watermark`` to ``path``."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump(asdict(watermark), handle)
+    os.replace(temporary, path)
+
+
+class IncrementalState:
+    """Filter environments against a stored watermark and advance it.
+
+    Only environments whose ``(environment_finished_at, release_id)`` is past
+    the stored watermark are accepted. The newest accepted one becomes the
+    next watermark once :meth:`commit` is called at the end of a run.
+    """
+
+    def __init__(
+        self,
+        path: str = config.STATE_PATH,
+        reset: bool = False,
+        lookback_days: int = config.INCREMENTAL_LOOKBACK_DAYS,
+    ) -> None:
+        self.path = path
+        self.lookback_days = lookback_days
+        self.watermark = None if reset else load_watermark(path)
+        self._newest: Optional[Watermark] = None
+
+    def min_created_time(self) -> Optional[str]:
+        """Return the earliest release creation time worth listing."""
+        if self.watermark is None:
+            return None
+        since = parse_timestamp(self.watermark.environment_finished_at)
+        return (since - timedelta(days=self.lookback_days)).isoformat()
+
+    def accept(self, env: ReleaseEnvironment) -> bool:
+        """Return whether ``env`` was deployed after the watermark."""
+        if not env.environment_finished_at:
+            return False
+
+        key = (env.environment_finished_us, env.release_id)
+        if self.watermark is not None and key <= self.watermark.key():
+            return False
+
+        if self._newest is None or key > self._newest.key():
+            self._newest = Watermark(env.release_id, env.environment_finished_at)
+        return True
+
+    def commit(self) -> None:
+        """Persist the newest accepted deployment as the next watermark."""
+        if self._newest is None:
+            logger.info("No new deployment since the last incremental run.")
+            return
+
+        save_watermark(self.path, self._newest)
+        self.watermark = self._newest
+        self._newest = None
+
+
+class IdCache:
+    """Project and release definition ids resolved by earlier runs.
+
+    Ids are stored in a JSON file under keys such as
+    ``<organization URL>|project|<name>`` and are trusted for ``ttl`` seconds,
+    sparing short runs the lookups that precede any real work. The cache is
+    an optimization only: an unreadable file is ignored and a failed save
+    is logged.
+    """
+
+    def __init__(
+        self,
+        path: str = config.ID_CACHE_PATH,
+        ttl: int = config.ID_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, *key: Any) -> Any:
+        """Return the id stored under ``key`` unless missing or expired."""
+        with self._lock:
+            entry = self._entries.get(_id_key(key))
+            if entry is None or self._clock() - entry["resolved_at"] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["id"]
+
+    def set(self, value: Any, *key: Any) -> None:
+        """Store the id ``value`` under ``key``."""
+        with self._lock:
+            self._entries[_id_key(key)] = {"id": value, "resolved_at": self._clock()}
+            self._dirty = True
+
+    def save(self) -> None:
+        """Atomically write the ids resolved since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            now = self._clock()
+            entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if now - entry["resolved_at"] <= self.ttl
+            }
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                temporary = f"{self.path}.tmp"
+                with open(temporary, "w", encoding="utf-8") as handle:
+                    json.dump(entries, handle, sort_keys=True)
+                os.replace(temporary, self.path)
+            except OSError as error:
+                logger.warning("⚠️ Unable to save the id cache %s: %s", self.path, error)
+                return
+            self._dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                entries = json.load(handle)
+            if not isinstance(entries, dict):
+                raise ValueError("expected a JSON object")
+            return {
+                key: entry
+                for key, entry in entries.items()
+                if isinstance(entry, dict) and {"id", "resolved_at"} <= entry.keys()
+            }
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as error:
+            logger.warning("⚠️ Ignoring unreadable id cache %s: %s", self.path, error)
+            return {}
+
+
+Unit = Tuple[int, int, str]
+
+
+class CheckpointJournal:
+    """Units of work completed by a run, with the records they emitted.
+
+    A unit is the ``(release id, environment id, artifact alias)`` of one
+    deployed artifact. Each completed unit is appended to an NDJSON file as
+    ``[release_id, environment_id, alias, record]``, ``record`` being
+    ``null`` when the artifact was skipped. With ``resume`` the journal left
+    by an interrupted run is kept: :meth:`replay` writes its records again
+    and :meth:`pending` rejects its units, so the output holds every record
+    once while only the remaining units are collected. A truncated last line,
+    left by a killed process, is dropped. Otherwise the journal starts empty.
+    """
+
+    def __init__(self, path: str = config.CHECKPOINT_PATH, resume: bool = False) -> None:
+        self.path = path
+        self._done: Set[Unit] = set()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(path):
+            self._handle: IO[str] = open(path, "r+", encoding="utf-8")
+            self._handle.truncate(self._load())
+            self._handle.seek(0, os.SEEK_END)
+            logger.info("Resuming from %d units checkpointed in %s.", len(self._done), path)
+        else:
+            self._handle = open(path, "w", encoding="utf-8")
+
+    @property
+    def completed(self) -> int:
+        """Return the number of units completed, including resumed ones."""
+        return len(self._done)
+
+    def pending(self, env: ReleaseEnvironment, artifact: Artifact) -> bool:
+        """Return whether the unit of ``artifact`` deployed to ``env`` is still to do."""
+        return (env.release_id, env.environment_id, artifact.alias) not in self._done
+
+    def complete(
+        self, env: ReleaseEnvironment, artifact: Artifact, record: Optional[Dict[str, Any]]
+    ) -> None:
+        """Journal the unit and the record it emitted, if any."""
+        unit = (env.release_id, env.environment_id, artifact.alias)
+        self._handle.write(
+            json.dumps([*unit, record], separators=(",", ":"), ensure_ascii=False) + "\n"
+        )
+        # Flushed per unit: a killed process loses at most the unit in progress.
+        self._handle.flush()
+        self._done.add(unit)
+
+    def replay(self, sink: OutputSink) -> int:
+        """Write the records of the resumed units to ``sink`` and return their count."""
+        records = 0
+        with open(self.path, encoding="utf-8") as handle:
+            for line in handle:
+                record = json.loads(line)[3]
+                if record is not None:
+                    sink.write(record)
+                    records += 1
+        return records
+
+    def close(self) -> None:
+        """Close the journal, keeping it for a later resume."""
+        self._handle.close()
+
+    def discard(self) -> None:
+        """Close and delete the journal once its run has finished."""
+        self.close()
+        os.remove(self.path)
+
+    def _load(self) -> int:
+        """Read the completed units and return the size of the valid journal."""
+        valid = 0
+        for line in iter(self._handle.readline, ""):
+            try:
+                if not line.endswith("\n"):
+                    raise ValueError("unterminated line")
+                release_id, environment_id, alias, _ = json.loads(line)
+            except (TypeError, ValueError):
+                logger.warning("⚠️ Dropping the truncated end of checkpoint %s.", self.path)
+                break
+            self._done.add((release_id, environment_id, alias))
+            valid = self._handle.tell()
+        return valid
+
+
+def _id_key(key: Tuple[Any, ...]) -> str:
+    return "|".join(str(part) for part in key)
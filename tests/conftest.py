@@ -9,6 +9,7 @@ import pytest
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 import config
+from azure_devops import ado_services
 from tests.factories import FakeClient
 
 
@@ -18,6 +19,14 @@ def _pat_token(monkeypatch):
     monkeypatch.setattr(config, "PAT_TOKEN", "test-token")
 
 
+@pytest.fixture(autouse=True)
+def _forget_oldest_commits():
+    """Keep the process-wide oldest commit memo from leaking between tests."""
+    ado_services.clear_oldest_commits()
+    yield
+    ado_services.clear_oldest_commits()
+
+
 @pytest.fixture
 def fake_client():
     """Return a factory to build FakeClient instances."""
@@ -12,15 +12,54 @@ class FakeClient:
 
     def __init__(self, responses: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], Any], api_version: str = "7.1") -> None:
         self.api_version = api_version
+        self.base_url = "https://fake.example"
         self._responses = responses
+        self.posted: list[Tuple[str, Any]] = []
+        self.cached: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], Any] | None = None
 
     def get(self, endpoint: str, params: Dict[str, Any] | None = None) -> Any:
         key = (endpoint, tuple(sorted((params or {}).items())))
         result = self._responses.get(key)
         if isinstance(result, Exception):
             raise result
+        if isinstance(result, tuple):
+            return result[0]
         return result
 
+    def post(self, endpoint: str, json: Any, params: Dict[str, Any] | None = None) -> Any:
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        self.posted.append((endpoint, json))
+        result = self._responses.get(key)
+        if isinstance(result, Exception):
+            raise result
+        if callable(result):
+            return result(json)
+        return result
+
+    def get_cached(self, endpoint: str, params: Dict[str, Any] | None = None) -> Any:
+        if self.cached is None:
+            return None
+        return self.cached.get(response_key(endpoint, params or {}))
+
+    def set_cached(self, endpoint: str, params: Dict[str, Any] | None, data: Any) -> None:
+        if self.cached is not None:
+            self.cached[response_key(endpoint, params or {})] = data
+
+    def get_page(self, endpoint: str, params: Dict[str, Any] | None = None) -> Tuple[Any, Any]:
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        result = self._responses.get(key)
+        if isinstance(result, Exception):
+            raise result
+        if isinstance(result, tuple):
+            return result
+        return result, None
+
+    def get_page_items(
+        self, endpoint: str, params: Dict[str, Any] | None = None, key: str = "value"
+    ) -> Tuple[Any, Any]:
+        page, token = self.get_page(endpoint, params)
+        return iter((page or {}).get(key, [])), token
+
 
 def build_release_environment(**overrides: Any) -> ReleaseEnvironment:
     data = {
@@ -69,3 +108,139 @@ def build_pull_request(**overrides: Any) -> PullRequest:
     }
     data.update(overrides)
     return PullRequest(**data)
+
+
+def response_key(endpoint: str, params: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+    return endpoint, tuple(sorted(params.items()))
+
+
+def release_artifact(alias: str, commit_id: str) -> Dict[str, Any]:
+    return {
+        "alias": alias,
+        "definitionReference": {
+            "branch": {"name": "main", "id": "1"},
+            "repository": {"name": "repo", "id": "repo"},
+            "definition": {"name": "def", "id": "3"},
+            "sourceVersion": {"id": commit_id},
+            "version": {"id": "4"},
+            "artifactSourceVersionUrl": {"id": "url"},
+        },
+    }
+
+
+def release_payload(release_id: int, artifacts: list) -> Dict[str, Any]:
+    return {
+        "id": release_id,
+        "name": f"r{release_id}",
+        "status": "active",
+        "createdOn": "2021-01-01T00:00:00Z",
+        "modifiedOn": "2021-01-01T00:30:00Z",
+        "artifacts": artifacts,
+        "environments": [
+            {
+                "id": release_id * 10,
+                "name": "Prod",
+                "status": "succeeded",
+                "deploySteps": [
+                    {
+                        "queuedOn": "2021-01-03T00:00:00Z",
+                        "lastModifiedOn": "2021-01-03T01:00:00Z",
+                    }
+                ],
+                "definitionEnvironmentId": 10,
+            }
+        ],
+    }
+
+
+def release_scenario() -> Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], Any]:
+    """Return the responses of a release definition with four artifacts.
+
+    Artifact ``a`` yields a record, ``nodate`` has no commit date, ``nopr``
+    no pull request and ``nocommits`` a pull request without commits.
+    """
+    pull_requests = [
+        {
+            "pullRequestId": pr_id,
+            "status": "completed",
+            "lastMergeCommit": {"commitId": commit_id},
+            "closedDate": "2021-01-02T00:00:00Z",
+            "creationDate": "2021-01-01T00:00:00Z",
+            "sourceRefName": "feature",
+            "targetRefName": "main",
+            "mergeStatus": "succeeded",
+        }
+        for pr_id, commit_id in ((7, "c1"), (8, "c4"))
+    ]
+    releases = [
+        release_payload(2, [release_artifact("a", "c1"), release_artifact("nodate", "c2")]),
+        release_payload(1, [release_artifact("nopr", "c3"), release_artifact("nocommits", "c4")]),
+        release_payload(3, []),
+    ]
+    responses = {
+        response_key("/_apis/projects", {"api-version": "7.1"}): {
+            "value": [{"name": "proj", "id": "pid"}]
+        },
+        response_key(
+            "/pid/_apis/release/definitions",
+            {"api-version": "7.1", "searchText": "def"},
+        ): {"value": [{"name": "def", "id": 2}]},
+        response_key(
+            "/pid/_apis/release/releases",
+            {
+                "api-version": "7.1",
+                "queryOrder": "descending",
+                "$expand": "environments,artifacts",
+                "definitionId": 2,
+                "$top": 100,
+            },
+        ): {"value": releases},
+        response_key(
+            "/proj/_apis/git/repositories/repo/pullRequests",
+            {
+                "api-version": "7.1-preview.1",
+                "searchCriteria.status": "completed",
+                "searchCriteria.targetRefName": "main",
+                "$top": 100,
+                "$skip": 0,
+            },
+        ): {"value": pull_requests},
+        response_key(
+            "/proj/_apis/git/repositories/repo/pullrequestquery", {"api-version": "7.1"}
+        ): lambda body: {
+            "results": [
+                {
+                    commit_id: [
+                        pr for pr in pull_requests if pr["lastMergeCommit"]["commitId"] == commit_id
+                    ]
+                    for commit_id in body["queries"][0]["items"]
+                }
+            ]
+        },
+    }
+    for release in releases:
+        responses[
+            response_key(f"/proj/_apis/release/releases/{release['id']}", {"api-version": "7.1"})
+        ] = release
+    responses[
+        response_key("/proj/_apis/git/repositories/repo/commitsbatch", {"api-version": "7.1"})
+    ] = lambda body: {
+        "value": [
+            {"commitId": commit_id, "committer": {"date": "2021-01-01T00:00:00Z"}}
+            for commit_id in body["ids"]
+            if commit_id != "c2"
+        ]
+    }
+    responses[
+        response_key(
+            "/proj/_apis/git/repositories/repo/pullRequests/7/commits",
+            {"api-version": "7.1-preview.1", "$top": 100, "$skip": 0},
+        )
+    ] = {"value": [{"commitId": "first", "committer": {"date": "2020-12-31T00:00:00Z"}}]}
+    responses[
+        response_key(
+            "/proj/_apis/git/repositories/repo/pullRequests/8/commits",
+            {"api-version": "7.1-preview.1", "$top": 100, "$skip": 0},
+        )
+    ] = {"value": []}
+    return responses
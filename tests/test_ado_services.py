@@ -5,7 +5,7 @@ import pytest
 import requests
 
 from azure_devops import ado_services
-from tests.factories import build_release_environment
+from tests.factories import build_artifact, build_pull_request, build_release_environment
 
 
 def _key(endpoint: str, params: dict[str, object]) -> tuple[str, tuple[tuple[str, object], ...]]:
@@ -320,26 +320,399 @@ def test_find_pr_by_commit_id_error(fake_client):
         ado_services.find_pr_by_commit_id(client, "proj", "repo", "abc", "main")
 
 
+def _pr_commits_key(skip, top=100):
+    return _key(
+        "/proj/_apis/git/repositories/repo/pullRequests/1/commits",
+        {"api-version": "7.1-preview.1", "$top": top, "$skip": skip},
+    )
+
+
+def _commits(*ids):
+    return {"value": [{"commitId": i, "committer": {"date": f"d-{i}"}} for i in ids]}
+
+
 def test_get_oldest_commit_from_pr(fake_client):
-    endpoint = "/proj/_apis/git/repositories/repo/pullRequests/1/commits"
-    params = {"api-version": "7.1-preview.1"}
+    responses = {_pr_commits_key(0): _commits("c1", "c0")}
+    client = fake_client(responses)
+    commit_id, commit_date = ado_services.get_oldest_commit_from_pr(client, "proj", "repo", "1")
+    assert commit_id == "c0"
+    assert commit_date == "d-c0"
+
+
+def test_get_oldest_commit_from_pr_empty(fake_client):
+    responses = {_pr_commits_key(0): {"value": []}}
+    client = fake_client(responses)
+    assert ado_services.get_oldest_commit_from_pr(client, "proj", "repo", "1") is None
+
+
+def test_get_oldest_commit_from_pr_pages_to_the_tail(fake_client):
     responses = {
-        _key(endpoint, params): {
+        _pr_commits_key(0, top=2): _commits("c4", "c3"),
+        _pr_commits_key(2, top=2): _commits("c2", "c1"),
+        _pr_commits_key(4, top=2): _commits("c0"),
+    }
+    client = fake_client(responses)
+    oldest = ado_services.get_oldest_commit_from_pr(client, "proj", "repo", "1", page_size=2)
+    assert oldest == ("c0", "d-c0")
+
+    client._responses.clear()
+    assert ado_services.get_oldest_commit_from_pr(client, "proj", "repo", 1) == oldest
+
+
+def test_get_oldest_commit_from_pr_ends_on_empty_page(fake_client):
+    responses = {
+        _pr_commits_key(0, top=2): _commits("c1", "c0"),
+        _pr_commits_key(2, top=2): {"value": []},
+    }
+    client = fake_client(responses)
+    oldest = ado_services.get_oldest_commit_from_pr(client, "proj", "repo", "1", page_size=2)
+    assert oldest == ("c0", "d-c0")
+
+
+def test_get_oldest_commit_from_pr_stops_when_skip_is_ignored(fake_client):
+    responses = {
+        _pr_commits_key(0, top=2): _commits("c1", "c0"),
+        _pr_commits_key(2, top=2): _commits("c1", "c0"),
+    }
+    client = fake_client(responses)
+    oldest = ado_services.get_oldest_commit_from_pr(client, "proj", "repo", "1", page_size=2)
+    assert oldest == ("c0", "d-c0")
+
+
+def test_oldest_commit_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(ado_services, "OLDEST_COMMIT_MEMO_SIZE", 2)
+    for pr_id in range(3):
+        ado_services._remember_oldest_commit("repo", pr_id, (f"c{pr_id}", "d"))
+    assert ado_services._remembered_oldest_commit("repo", 0) is None
+    assert ado_services._remembered_oldest_commit("repo", "2") == ("c2", "d")
+
+
+def _pr_page(commit_ids):
+    return {
+        "value": [
+            {
+                "pullRequestId": index,
+                "lastMergeCommit": {"commitId": commit_id},
+                "closedDate": "2021-01-02T00:00:00Z",
+                "creationDate": "2021-01-01T00:00:00Z",
+                "sourceRefName": "feature",
+                "targetRefName": "main",
+                "mergeStatus": "completed",
+            }
+            for index, commit_id in commit_ids
+        ]
+    }
+
+
+def _pr_listing_params(skip):
+    return {
+        "api-version": "7.1-preview.1",
+        "searchCriteria.status": "completed",
+        "searchCriteria.targetRefName": "main",
+        "$top": 2,
+        "$skip": skip,
+    }
+
+
+def test_pull_request_index_pages_and_matches(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/pullRequests"
+    responses = {
+        _key(endpoint, _pr_listing_params(0)): _pr_page([(1, "AAA"), (2, "bbb")]),
+        _key(endpoint, _pr_listing_params(2)): _pr_page([(3, "ccc")]),
+    }
+    client = fake_client(responses)
+    index = ado_services.PullRequestIndex(client, "proj", page_size=2)
+
+    assert index.find("repo", "aaa", "main").id == "1"
+    assert index.find("repo", "CCC", "main").id == "3"
+    assert index.find("repo", "missing", "main") is None
+
+
+def test_pull_request_index_loads_each_pair_once(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/pullRequests"
+    responses = {_key(endpoint, _pr_listing_params(0)): _pr_page([(1, "abc")])}
+    client = fake_client(responses)
+    calls = []
+    original_get = client.get
+
+    def counting_get(endpoint, params=None):
+        calls.append(endpoint)
+        return original_get(endpoint, params)
+
+    client.get = counting_get
+    index = ado_services.PullRequestIndex(client, "proj", page_size=2)
+    index.find("repo", "abc", "main")
+    index.find("repo", "def", "main")
+    assert len(calls) == 1
+
+
+def test_pull_request_index_error(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/pullRequests"
+    responses = {_key(endpoint, _pr_listing_params(0)): requests.RequestException("boom")}
+    client = fake_client(responses)
+    index = ado_services.PullRequestIndex(client, "proj", page_size=2)
+    with pytest.raises(RuntimeError):
+        index.find("repo", "abc", "main")
+
+
+def _release(release_id):
+    return {
+        "id": release_id,
+        "name": f"r{release_id}",
+        "status": "active",
+        "createdOn": "2021-01-01T00:00:00Z",
+        "modifiedOn": "2021-01-01T00:30:00Z",
+        "environments": [
+            {
+                "id": release_id * 10,
+                "name": "Prod",
+                "status": "succeeded",
+                "deploySteps": [
+                    {
+                        "queuedOn": "2021-01-01T00:00:00Z",
+                        "lastModifiedOn": "2021-01-01T01:00:00Z",
+                    }
+                ],
+                "definitionEnvironmentId": 10,
+            }
+        ],
+    }
+
+
+def test_iter_active_release_environments_follows_continuation(fake_client):
+    params = {
+        "api-version": "7.1",
+        "queryOrder": "descending",
+        "$expand": "environments,artifacts",
+        "definitionId": 2,
+        "$top": 100,
+        "minCreatedTime": "2021-01-01T00:00:00Z",
+        "maxCreatedTime": "2021-02-01T00:00:00Z",
+    }
+    responses = {
+        _key("/p/_apis/release/releases", params): ({"value": [_release(2)]}, "tok"),
+        _key("/p/_apis/release/releases", {**params, "continuationToken": "tok"}): {
+            "value": [_release(1), {"id": 0, "status": "abandoned"}]
+        },
+    }
+    client = fake_client(responses)
+    envs = ado_services.iter_active_release_environments(
+        client,
+        "p",
+        2,
+        min_created_time="2021-01-01T00:00:00Z",
+        max_created_time="2021-02-01T00:00:00Z",
+    )
+    assert [env.release_id for env in envs] == [2, 1]
+
+
+def test_malformed_timestamps_skip_the_environment(caplog):
+    broken = _release(2)
+    broken["environments"][0]["deploySteps"][0]["lastModifiedOn"] = "yesterday"
+
+    environments = [
+        *ado_services._extract_release_environments(broken),
+        *ado_services._extract_release_environments(_release(1)),
+    ]
+
+    assert [env.release_id for env in environments] == [1]
+    assert "Invalid timestamp in environment 20 of release 2" in caplog.text
+
+
+def test_iter_active_release_environments_is_lazy(fake_client):
+    client = fake_client({})
+    calls = []
+
+    def get_page_items(endpoint, params=None):
+        calls.append(params.get("continuationToken"))
+        return iter([_release(len(calls))]), "next"
+
+    client.get_page_items = get_page_items
+    envs = ado_services.iter_active_release_environments(client, "p", 2)
+    assert next(envs).release_id == 1
+    assert calls == [None]
+
+
+def test_get_commit_dates_in_chunks(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/commitsbatch"
+    responses = {
+        _key(endpoint, {"api-version": "7.1"}): lambda body: {
             "value": [
-                {"commitId": "c1", "committer": {"date": "2021-01-01"}},
-                {"commitId": "c0", "committer": {"date": "2020-12-31"}},
+                {"commitId": commit_id.upper(), "committer": {"date": f"d-{commit_id}"}}
+                for commit_id in body["ids"]
+                if commit_id != "c"
             ]
         }
     }
     client = fake_client(responses)
-    commit_id, commit_date = ado_services.get_oldest_commit_from_pr(client, "proj", "repo", "1")
-    assert commit_id == "c0"
-    assert commit_date == "2020-12-31"
+    client.cached = {}
+    dates = ado_services.get_commit_dates(
+        client, "proj", "repo", ["A", "b", "a", "c"], chunk_size=2
+    )
+    assert dates == {"a": "d-a", "b": "d-b", "c": None}
+    assert [body for _, body in client.posted] == [
+        {"ids": ["a", "b"], "$top": 2},
+        {"ids": ["c"], "$top": 1},
+    ]
+
+    # Returned commits are cached one by one, missing ones are queried again.
+    assert ado_services.get_commit_dates(client, "proj", "repo", ["a", "c"]) == {
+        "a": "d-a",
+        "c": None,
+    }
+    assert client.posted[-1][1] == {"ids": ["c"], "$top": 1}
 
 
-def test_get_oldest_commit_from_pr_empty(fake_client):
-    endpoint = "/proj/_apis/git/repositories/repo/pullRequests/1/commits"
-    params = {"api-version": "7.1-preview.1"}
-    responses = {_key(endpoint, params): {"value": []}}
+def test_get_commit_dates_error(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/commitsbatch"
+    responses = {_key(endpoint, {"api-version": "7.1"}): requests.RequestException("boom")}
     client = fake_client(responses)
-    assert ado_services.get_oldest_commit_from_pr(client, "proj", "repo", "1") is None
+    with pytest.raises(RuntimeError):
+        ado_services.get_commit_dates(client, "proj", "repo", ["a"])
+
+
+def test_iter_active_release_environments_attaches_expanded_artifacts(fake_client):
+    params = {
+        "api-version": "7.1",
+        "queryOrder": "descending",
+        "$expand": "environments,artifacts",
+        "definitionId": 2,
+        "$top": 100,
+    }
+    artifact = {
+        "alias": "a",
+        "definitionReference": {
+            "branch": {"name": "main", "id": "1"},
+            "repository": {"name": "repo", "id": "2"},
+            "definition": {"name": "def", "id": "3"},
+            "sourceVersion": {"id": "c1"},
+            "version": {"id": "4"},
+            "artifactSourceVersionUrl": {"id": "url"},
+        },
+    }
+    responses = {
+        _key("/p/_apis/release/releases", params): {
+            "value": [
+                {**_release(2), "artifacts": [artifact]},
+                {**_release(1), "artifacts": [{"alias": "broken"}]},
+            ]
+        }
+    }
+    client = fake_client(responses)
+    expanded, broken = ado_services.iter_active_release_environments(client, "p", 2)
+    assert [item.commit_id for item in expanded.artifacts] == ["c1"]
+    assert broken.artifacts is None
+
+
+_QUERY_ENDPOINT = "/proj/_apis/git/repositories/repo/pullrequestquery"
+
+
+def _query_response(pull_requests):
+    """Answer lastMergeCommit queries from ``{commit: [(pr_id, target, status)]}``."""
+
+    def answer(body):
+        assert body["queries"][0]["type"] == "lastMergeCommit"
+        return {
+            "results": [
+                {
+                    commit_id.upper(): [
+                        {
+                            "pullRequestId": pr_id,
+                            "status": status,
+                            "targetRefName": target,
+                            "lastMergeCommit": {"commitId": commit_id.upper()},
+                        }
+                        for pr_id, target, status in pull_requests.get(commit_id, [])
+                    ]
+                    for commit_id in [*body["queries"][0]["items"], "unrequested"]
+                }
+            ]
+        }
+
+    return answer
+
+
+def test_get_pull_requests_by_merge_commits_in_chunks(fake_client):
+    responses = {
+        _key(_QUERY_ENDPOINT, {"api-version": "7.1"}): _query_response(
+            {"a": [(1, "main", "completed")], "c": [(2, "main", "abandoned")]}
+        )
+    }
+    client = fake_client(responses)
+    client.cached = {}
+    resolved = ado_services.get_pull_requests_by_merge_commits(
+        client, "proj", "repo", ["A", "b", "a", "c"], chunk_size=2
+    )
+
+    assert {commit: [pr.id for pr in prs] for commit, prs in resolved.items()} == {
+        "a": ["1"],
+        "b": [],
+        "c": [],
+    }
+    assert [body["queries"][0]["items"] for _, body in client.posted] == [["a", "b"], ["c"]]
+
+    cached = ado_services.get_pull_requests_by_merge_commits(client, "proj", "repo", ["a", "b"])
+    assert {commit: [pr.id for pr in prs] for commit, prs in cached.items()} == {
+        "a": ["1"],
+        "b": [],
+    }
+    assert len(client.posted) == 2
+
+
+def test_get_pull_requests_by_merge_commits_error(fake_client):
+    responses = {_key(_QUERY_ENDPOINT, {"api-version": "7.1"}): requests.RequestException("boom")}
+    with pytest.raises(RuntimeError):
+        ado_services.get_pull_requests_by_merge_commits(fake_client(responses), "proj", "repo", ["a"])
+
+
+def test_batched_resolver_queries_commits_once(fake_client):
+    responses = {
+        _key(_QUERY_ENDPOINT, {"api-version": "7.1"}): _query_response(
+            {"a": [(1, "release", "completed"), (2, "main", "completed")]}
+        ),
+        _key("/proj/_apis/git/repositories/repo/pullRequests", _pr_listing_params(0)): _pr_page(
+            [(3, "zzz")]
+        ),
+    }
+    client = fake_client(responses)
+    resolver = ado_services.BatchedPullRequestResolver(client, "proj")
+    resolver.index.page_size = 2
+
+    resolver.resolve([build_artifact(repository_id="repo", commit_id="A"), build_artifact(repository_id="repo", commit_id="b")])
+    resolver.resolve([build_artifact(repository_id="repo", commit_id="a")])
+
+    assert len(client.posted) == 1
+    assert resolver.find("repo", "A", "main").id == "2"
+    assert resolver.find("repo", "a", "other") is None
+    assert resolver.find("repo", "b", "main") is None
+    # Commits not resolved first are looked up in the listing.
+    assert resolver.find("repo", "zzz", "main").id == "3"
+
+
+def test_select_pull_request_ignores_ref_case():
+    pull_requests = [
+        build_pull_request(id="1", target_ref_name="refs/heads/release"),
+        build_pull_request(id="2", target_ref_name="refs/heads/Main"),
+    ]
+    assert ado_services._select_pull_request(pull_requests, "refs/heads/main").id == "2"
+    assert ado_services._select_pull_request(pull_requests, "refs/heads/dev") is None
+
+
+@pytest.mark.parametrize("query", [True, False])
+def test_batched_resolver_falls_back_to_the_listing(fake_client, caplog, query):
+    responses = {
+        _key(_QUERY_ENDPOINT, {"api-version": "7.1"}): requests.RequestException("404"),
+        _key("/proj/_apis/git/repositories/repo/pullRequests", _pr_listing_params(0)): _pr_page(
+            [(3, "abc")]
+        ),
+    }
+    client = fake_client(responses)
+    resolver = ado_services.BatchedPullRequestResolver(client, "proj", query=query)
+    resolver.index.page_size = 2
+
+    resolver.resolve([build_artifact(repository_id="repo", commit_id="abc")])
+    resolver.resolve([build_artifact(repository_id="repo", commit_id="def")])
+
+    assert len(client.posted) == (1 if query else 0)
+    assert ("Pull request query failed for repository repo" in caplog.text) is query
+    assert resolver.find("repo", "abc", "main").id == "3"
@@ -0,0 +1,78 @@
+"""Tests for the lead time aggregation stage."""
+
+import builtins
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from aggregation import LeadTimeAggregator  # noqa: E402
+
+
+def _record(repository, deployed_at, commit_seconds, pr_seconds=None, definition="def"):
+    metrics = {
+        "lead_time_artifact_commit_to_prod": {"seconds": commit_seconds},
+        "lead_time_pr_last_commit_to_prod": {"seconds": commit_seconds * 2},
+    }
+    if pr_seconds is not None:
+        metrics["lead_time_pr_to_prod"] = {"seconds": pr_seconds}
+    return {
+        "repository": {"name": repository},
+        "release": {"definition": definition, "deployed_at": deployed_at},
+        "metrics": metrics,
+    }
+
+
+def test_summary_groups_and_percentiles():
+    aggregator = LeadTimeAggregator()
+    for seconds in (10, 20, 30, 40):
+        aggregator.write(_record("a", "2021-01-06T10:00:00Z", seconds, pr_seconds=seconds))
+    aggregator.write(_record("b", "2021-01-11T00:00:00Z", 100, definition="other"))
+    aggregator.close()
+
+    summary = aggregator.summarize()
+    assert summary["records"] == 5
+    commit_a = summary["by_repository"]["a"]["lead_time_artifact_commit_to_prod"]
+    assert commit_a == {"count": 4, "mean": 25.0, "p50": 25.0, "p90": 37.0, "p99": 39.7}
+    assert summary["by_repository"]["b"]["lead_time_artifact_commit_to_prod"]["p99"] == 100.0
+    assert "lead_time_pr_to_prod" not in summary["by_repository"]["b"]
+    assert summary["overall"]["lead_time_pr_to_prod"]["count"] == 4
+    assert summary["overall"]["lead_time_pr_last_commit_to_prod"]["mean"] == 80.0
+    assert sorted(summary["by_definition"]) == ["def", "other"]
+    assert sorted(summary["by_week"]) == ["2021-01-04", "2021-01-11"]
+
+
+def test_summary_without_records():
+    summary = LeadTimeAggregator().summarize()
+    assert summary["records"] == 0
+    assert summary["overall"] == {}
+    assert summary["by_repository"] == {}
+
+
+def test_requires_numpy(monkeypatch):
+    real_import = builtins.__import__
+
+    def fake_import(name, *args, **kwargs):
+        if name == "numpy":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", fake_import)
+    with pytest.raises(RuntimeError):
+        LeadTimeAggregator()
+
+
+def test_percentiles_match_numpy():
+    import numpy as np
+
+    values = [float(value) for value in np.random.default_rng(1).integers(0, 10_000, 1_001)]
+    aggregator = LeadTimeAggregator()
+    for index, seconds in enumerate(values):
+        aggregator.write(_record(f"r{index % 3}", "2021-01-06T00:00:00Z", seconds))
+
+    summary = aggregator.summarize()
+    for repository in ("r0", "r1", "r2"):
+        subset = values[int(repository[1]) :: 3]
+        stats = summary["by_repository"][repository]["lead_time_artifact_commit_to_prod"]
+        for percentile in (50, 90, 99):
+            assert stats[f"p{percentile}"] == round(float(np.percentile(subset, percentile)), 2)
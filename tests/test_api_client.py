@@ -1,10 +1,14 @@
 """Tests for AzureDevOpsClient."""
 
 import base64
+from types import SimpleNamespace
+
 import requests
 import pytest
 
-from azure_devops.api_client import AzureDevOpsClient
+from azure_devops.api_client import AzureDevOpsClient, _retry_count
+from azure_devops.metrics import RequestMetrics
+from azure_http import AdaptiveThrottler
 import config
 
 
@@ -38,3 +42,113 @@ def test_get_network_error(monkeypatch):
     monkeypatch.setattr(client.session, "get", boom)
     with pytest.raises(RuntimeError):
         client.get("/test")
+
+
+def test_get_page_returns_continuation_token(monkeypatch, requests_mock):
+    monkeypatch.setattr(config, "PAT_TOKEN", "abc")
+    client = AzureDevOpsClient("http://example.com", "1.0")
+    requests_mock.get(
+        "http://example.com/test",
+        json={"value": []},
+        headers={"x-ms-continuationtoken": "next"},
+    )
+    assert client.get_page("/test") == ({"value": []}, "next")
+
+
+def test_get_page_items_streams_values(monkeypatch, requests_mock):
+    monkeypatch.setattr(config, "PAT_TOKEN", "abc")
+    client = AzureDevOpsClient("http://example.com", "1.0")
+    requests_mock.get(
+        "http://example.com/test",
+        json={"count": 2, "value": [{"id": 1}, {"id": "é"}]},
+        headers={"x-ms-continuationtoken": "next"},
+    )
+    items, token = client.get_page_items("/test")
+    assert (list(items), token) == ([{"id": 1}, {"id": "é"}], "next")
+
+
+def test_post_sends_json_body(monkeypatch, requests_mock):
+    monkeypatch.setattr(config, "PAT_TOKEN", "abc")
+    client = AzureDevOpsClient("http://example.com", "1.0")
+    matcher = requests_mock.post("http://example.com/batch", json={"value": []})
+    assert client.post(
+        "/batch", json={"ids": ["a"]}, params={"api-version": "1.0"}
+    ) == {"value": []}
+    assert matcher.last_request.json() == {"ids": ["a"]}
+    assert matcher.last_request.qs == {"api-version": ["1.0"]}
+
+
+def test_client_feeds_response_headers_to_throttler(monkeypatch, requests_mock):
+    monkeypatch.setattr(config, "PAT_TOKEN", "abc")
+    throttler = AdaptiveThrottler(rate=10.0, burst=10, sleep=lambda _: None)
+    client = AzureDevOpsClient("http://example.com", "1.0", throttler=throttler)
+    requests_mock.get("http://example.com/test", json={}, headers={"Retry-After": "1"})
+    client.get("/test")
+    assert throttler.stats().retry_after_responses == 1
+
+
+def test_client_retries_throttled_requests_after_the_pause(monkeypatch, requests_mock):
+    monkeypatch.setattr(config, "PAT_TOKEN", "abc")
+    monkeypatch.setattr(config, "RETRY_TOTAL", 2)
+    sleeps = []
+    throttler = AdaptiveThrottler(rate=10.0, burst=10, sleep=sleeps.append)
+    metrics = RequestMetrics()
+    client = AzureDevOpsClient(
+        "http://example.com", "1.0", throttler=throttler, metrics=metrics
+    )
+    matcher = requests_mock.get(
+        "http://example.com/test",
+        [
+            {"status_code": 429, "headers": {"Retry-After": "2"}},
+            {"json": {"ok": True}},
+        ],
+    )
+
+    assert client.get("/test") == {"ok": True}
+    assert matcher.call_count == 2
+    assert sleeps and sleeps[0] == pytest.approx(2, abs=0.1)
+    test = metrics.snapshot()["GET /test"]
+    assert (test.requests, test.retries) == (2, 1)
+
+    requests_mock.get(
+        "http://example.com/busy", status_code=503, headers={"Retry-After": "0.01"}
+    )
+    with pytest.raises(requests.HTTPError):
+        client.get("/busy")
+    assert throttler.stats().retry_after_responses == 4
+
+
+def test_client_records_request_metrics(monkeypatch, requests_mock):
+    monkeypatch.setattr(config, "PAT_TOKEN", "abc")
+    metrics = RequestMetrics()
+    client = AzureDevOpsClient("http://example.com", "1.0", metrics=metrics)
+    requests_mock.get(
+        "http://example.com/proj/_apis/release/releases/1", text='{"id": 1}'
+    )
+    requests_mock.get(
+        "http://example.com/proj/_apis/release/releases/2", status_code=404
+    )
+    client.get("/proj/_apis/release/releases/1")
+    with pytest.raises(requests.HTTPError):
+        client.get("/proj/_apis/release/releases/2")
+
+    def boom(*_, **__):
+        raise requests.RequestException("boom")
+
+    monkeypatch.setattr(client.session, "get", boom)
+    with pytest.raises(RuntimeError):
+        client.get("/proj/_apis/release/releases/3")
+
+    release = metrics.snapshot()["GET /{project}/_apis/release/releases/{releaseId}"]
+    assert release.requests == 3
+    assert release.errors == 2
+    assert release.bytes_received == 9
+    assert release.status_codes == {"200": 1, "404": 1, "error": 1}
+
+
+def test_retry_count_reads_urllib3_history():
+    response = requests.Response()
+    response.raw = SimpleNamespace(retries=SimpleNamespace(history=("a", "b")))
+    assert _retry_count(response) == 2
+    response.raw = SimpleNamespace()
+    assert _retry_count(response) == 0
@@ -0,0 +1,306 @@
+"""Tests for the asyncio Azure DevOps service helpers."""
+
+import asyncio
+
+import pytest
+import requests
+
+from azure_devops import async_services
+from azure_devops.async_client import AsyncAzureDevOpsClient
+from tests.factories import build_artifact
+
+
+def _key(endpoint, params):
+    return endpoint, tuple(sorted(params.items()))
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_get_project_id_not_found(fake_client):
+    responses = {_key("/_apis/projects", {"api-version": "7.1"}): {"value": []}}
+    client = AsyncAzureDevOpsClient(fake_client(responses), 2)
+    with pytest.raises(ValueError):
+        _run(async_services.get_project_id(client, "Missing"))
+
+
+def test_get_release_definition_id_not_found(fake_client):
+    params = {"api-version": "7.1", "searchText": "def"}
+    responses = {_key("/proj/_apis/release/definitions", params): {"value": []}}
+    client = AsyncAzureDevOpsClient(fake_client(responses), 2)
+    with pytest.raises(ValueError):
+        _run(async_services.get_release_definition_id(client, "proj", "def"))
+
+
+def test_iter_active_release_environments_follows_continuation(fake_client):
+    params = {
+        "api-version": "7.1",
+        "queryOrder": "descending",
+        "$expand": "environments,artifacts",
+        "definitionId": 2,
+        "$top": 100,
+        "minCreatedTime": "2021-01-01T00:00:00Z",
+        "maxCreatedTime": "2021-02-01T00:00:00Z",
+    }
+    release = {
+        "id": 1,
+        "status": "active",
+        "environments": [
+            {
+                "id": 11,
+                "status": "succeeded",
+                "deploySteps": [
+                    {
+                        "queuedOn": "2021-01-01T00:00:00Z",
+                        "lastModifiedOn": "2021-01-01T01:00:00Z",
+                    }
+                ],
+            }
+        ],
+    }
+    responses = {
+        _key("/p/_apis/release/releases", params): ({"value": [release]}, "tok"),
+        _key("/p/_apis/release/releases", {**params, "continuationToken": "tok"}): {
+            "value": [release]
+        },
+    }
+    client = AsyncAzureDevOpsClient(fake_client(responses), 2)
+
+    async def collect():
+        return [
+            env.environment_id
+            async for env in async_services.iter_active_release_environments(
+                client,
+                "p",
+                2,
+                min_created_time="2021-01-01T00:00:00Z",
+                max_created_time="2021-02-01T00:00:00Z",
+            )
+        ]
+
+    assert _run(collect()) == [11, 11]
+
+
+def test_pull_request_index_pages_and_shares_loading(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/pullRequests"
+
+    def params(skip):
+        return {
+            "api-version": "7.1-preview.1",
+            "searchCriteria.status": "completed",
+            "searchCriteria.targetRefName": "main",
+            "$top": 1,
+            "$skip": skip,
+        }
+
+    responses = {
+        _key(endpoint, params(0)): {
+            "value": [{"pullRequestId": 1, "lastMergeCommit": {"commitId": "A"}}]
+        },
+        _key(endpoint, params(1)): {"value": []},
+    }
+    sync_client = fake_client(responses)
+    calls = []
+    original_get = sync_client.get
+
+    def counting_get(endpoint, params=None):
+        calls.append(params["$skip"])
+        return original_get(endpoint, params)
+
+    sync_client.get = counting_get
+    index = async_services.PullRequestIndex(
+        AsyncAzureDevOpsClient(sync_client, 2), "proj", page_size=1
+    )
+
+    async def lookups():
+        return await asyncio.gather(
+            index.find("repo", "a", "main"), index.find("repo", "b", "main")
+        )
+
+    found, missing = _run(lookups())
+    assert found.id == "1"
+    assert missing is None
+    assert calls == [0, 1]
+
+
+def test_get_oldest_commit_from_pr_pages_and_memoizes(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/pullRequests/1/commits"
+
+    def page(skip, ids):
+        params = {"api-version": "7.1-preview.1", "$top": 2, "$skip": skip}
+        commits = [{"commitId": i, "committer": {"date": f"d-{i}"}} for i in ids]
+        return _key(endpoint, params), {"value": commits}
+
+    responses = dict([page(0, ["c2", "c1"]), page(2, ["c0"])])
+    client = AsyncAzureDevOpsClient(fake_client(responses), 2)
+    oldest = _run(async_services.get_oldest_commit_from_pr(client, "proj", "repo", "1", 2))
+    assert oldest == ("c0", "d-c0")
+
+    responses.clear()
+    assert _run(async_services.get_oldest_commit_from_pr(client, "proj", "repo", "1")) == oldest
+
+
+def test_get_oldest_commit_from_pr_shares_concurrent_lookups(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/pullRequests/1/commits"
+    params = {"api-version": "7.1-preview.1", "$top": 2, "$skip": 0}
+    commits = [{"commitId": "c1", "committer": {"date": "d-c1"}}]
+    wrapped = fake_client({_key(endpoint, params): {"value": commits}})
+    calls = []
+    get = wrapped.get
+    wrapped.get = lambda *args, **kwargs: calls.append(args) or get(*args, **kwargs)
+    client = AsyncAzureDevOpsClient(wrapped, 2)
+
+    async def lookups():
+        return await asyncio.gather(
+            *(
+                async_services.get_oldest_commit_from_pr(client, "proj", "repo", "1", 2)
+                for _ in range(3)
+            )
+        )
+
+    assert _run(lookups()) == [("c1", "d-c1")] * 3
+    assert len(calls) == 1
+    assert not async_services._OLDEST_COMMIT_TASKS
+
+
+def test_pull_request_index_error(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/pullRequests"
+    params = {
+        "api-version": "7.1-preview.1",
+        "searchCriteria.status": "completed",
+        "searchCriteria.targetRefName": "main",
+        "$top": 100,
+        "$skip": 0,
+    }
+    responses = {_key(endpoint, params): requests.RequestException("boom")}
+    client = AsyncAzureDevOpsClient(fake_client(responses), 2)
+    index = async_services.PullRequestIndex(client, "proj")
+    with pytest.raises(RuntimeError):
+        _run(index.find("repo", "abc", "main"))
+
+
+def test_get_project_and_definition_ids(fake_client):
+    responses = {
+        _key("/_apis/projects", {"api-version": "7.1"}): {
+            "value": [{"name": "proj", "id": "pid"}]
+        },
+        _key("/pid/_apis/release/definitions", {"api-version": "7.1", "searchText": "def"}): {
+            "value": [{"name": "def", "id": 2}]
+        },
+    }
+    client = AsyncAzureDevOpsClient(fake_client(responses), 2)
+    assert _run(async_services.get_project_id(client, "proj")) == "pid"
+    assert _run(async_services.get_release_definition_id(client, "pid", "def")) == 2
+
+
+def test_get_commit_dates_in_chunks(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/commitsbatch"
+    responses = {
+        _key(endpoint, {"api-version": "7.1"}): lambda body: {
+            "value": [
+                {"commitId": commit_id, "committer": {"date": f"d-{commit_id}"}}
+                for commit_id in body["ids"]
+            ]
+        }
+    }
+    sync_client = fake_client(responses)
+    sync_client.cached = {}
+    client = AsyncAzureDevOpsClient(sync_client, 2)
+    dates = _run(
+        async_services.get_commit_dates(client, "proj", "repo", ["a", "B", "c"], chunk_size=2)
+    )
+    assert dates == {"a": "d-a", "b": "d-b", "c": "d-c"}
+    assert len(sync_client.posted) == 2
+
+    assert _run(async_services.get_commit_dates(client, "proj", "repo", ["c"])) == {"c": "d-c"}
+    assert len(sync_client.posted) == 2
+
+
+def test_get_commit_dates_error(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/commitsbatch"
+    responses = {_key(endpoint, {"api-version": "7.1"}): requests.RequestException("boom")}
+    client = AsyncAzureDevOpsClient(fake_client(responses), 2)
+    with pytest.raises(RuntimeError):
+        _run(async_services.get_commit_dates(client, "proj", "repo", ["a"]))
+
+
+def test_batched_resolver_queries_and_falls_back(fake_client, caplog):
+    query = "/proj/_apis/git/repositories/{}/pullrequestquery"
+    listing = "/proj/_apis/git/repositories/broken/pullRequests"
+    responses = {
+        _key(query.format("repo"), {"api-version": "7.1"}): lambda body: {
+            "results": [
+                {
+                    "A": [
+                        {"pullRequestId": 1, "status": "abandoned", "targetRefName": "main"},
+                        {"pullRequestId": 2, "targetRefName": "main"},
+                    ],
+                    "B": [],
+                }
+            ]
+        },
+        _key(query.format("broken"), {"api-version": "7.1"}): requests.RequestException("404"),
+        _key(
+            listing,
+            {
+                "api-version": "7.1-preview.1",
+                "searchCriteria.status": "completed",
+                "searchCriteria.targetRefName": "main",
+                "$top": 100,
+                "$skip": 0,
+            },
+        ): {"value": [{"pullRequestId": 3, "lastMergeCommit": {"commitId": "c"}}]},
+    }
+    sync_client = fake_client(responses)
+    resolver = async_services.BatchedPullRequestResolver(
+        AsyncAzureDevOpsClient(sync_client, 2), "proj", chunk_size=1
+    )
+
+    async def lookups():
+        resolver.resolve(
+            [
+                build_artifact(repository_id="repo", commit_id="a"),
+                build_artifact(repository_id="repo", commit_id="b"),
+                build_artifact(repository_id="broken", commit_id="c"),
+            ]
+        )
+        return await asyncio.gather(
+            resolver.find("repo", "a", "main"),
+            resolver.find("repo", "b", "main"),
+            resolver.find("broken", "c", "main"),
+        )
+
+    found, missing, listed = _run(lookups())
+    assert found.id == "2"
+    assert missing is None
+    assert listed.id == "3"
+    assert [body["queries"][0]["items"] for _, body in sync_client.posted].count(["a"]) == 1
+    assert "Pull request query failed for repository broken" in caplog.text
+
+
+def test_batched_resolver_without_query_lists(fake_client):
+    endpoint = "/proj/_apis/git/repositories/repo/pullRequests"
+    params = {
+        "api-version": "7.1-preview.1",
+        "searchCriteria.status": "completed",
+        "searchCriteria.targetRefName": "main",
+        "$top": 100,
+        "$skip": 0,
+    }
+    responses = {
+        _key(endpoint, params): {
+            "value": [{"pullRequestId": 1, "lastMergeCommit": {"commitId": "a"}}]
+        }
+    }
+    sync_client = fake_client(responses)
+    resolver = async_services.BatchedPullRequestResolver(
+        AsyncAzureDevOpsClient(sync_client, 2), "proj", query=False
+    )
+
+    async def lookup():
+        resolver.resolve([build_artifact(repository_id="repo", commit_id="a")])
+        return await resolver.find("repo", "a", "main")
+
+    assert _run(lookup()).id == "1"
+    assert sync_client.posted == []
@@ -1,9 +1,16 @@
 """Tests for azure_http helper functions."""
 
+import logging
+import socket
+
+import pytest
 import requests
 
+import azure_http
 import config
-from azure_http import get_retry_session
+from azure_http import (AdaptiveThrottler, PooledHTTPAdapter, get_retry_session,
+                        get_shared_session, get_shared_throttler,
+                        keepalive_socket_options, pool_exhaustion_stats)
 
 
 def test_get_retry_session_applies_configuration(monkeypatch):
@@ -23,4 +30,142 @@ def test_get_retry_session_applies_configuration(monkeypatch):
     assert retries.total == 3
     assert retries.backoff_factor == 1
     assert 500 in retries.status_forcelist
-    assert "GET" in retries.allowed_methods
\ No newline at end of file
+    assert "GET" in retries.allowed_methods
+    assert not retries.respect_retry_after_header
+
+
+def test_retry_session_pools_keepalive_connections():
+    session = get_retry_session(pool_connections=3, pool_maxsize=5, pool_block=True)
+
+    adapter = session.get_adapter("https://")
+    assert isinstance(adapter, PooledHTTPAdapter)
+    pool = adapter.poolmanager.connection_from_url("https://dev.azure.com/org")
+    assert pool.pool.maxsize == 5
+    assert pool.block is True
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in pool.conn_kw["socket_options"]
+    assert adapter.poolmanager.pools._maxsize == 3
+
+
+def test_retry_session_without_keepalive_keeps_default_socket_options():
+    session = get_retry_session(keepalive=False)
+
+    pool = session.get_adapter("http://").poolmanager.connection_from_url("http://host")
+    assert "socket_options" not in pool.conn_kw
+
+
+def test_keepalive_socket_options_use_idle_time():
+    options = keepalive_socket_options(idle=40)
+
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 40) in options
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10) in options
+
+
+def test_shared_session_is_reused_per_host(monkeypatch):
+    monkeypatch.setattr(azure_http, "_SHARED_SESSIONS", {})
+    monkeypatch.setattr(config, "HTTP_POOL_MAXSIZE_PER_HOST", {"vsrm.dev.azure.com": 4})
+
+    core = get_shared_session("https://dev.azure.com/org")
+    release = get_shared_session("https://vsrm.dev.azure.com/org")
+
+    assert get_shared_session("https://DEV.azure.com/other") is core
+    assert release is not core
+    pool = release.get_adapter("https://").poolmanager.connection_from_url(
+        "https://vsrm.dev.azure.com/org"
+    )
+    assert pool.pool.maxsize == 4
+
+
+def test_forked_processes_forget_shared_sessions(monkeypatch):
+    monkeypatch.setattr(azure_http, "_SHARED_SESSIONS", {})
+    parent = get_shared_session("https://dev.azure.com/org")
+
+    azure_http._forget_shared_sessions()
+
+    assert get_shared_session("https://dev.azure.com/org") is not parent
+
+
+@pytest.mark.parametrize("scheme", ["http", "https"])
+def test_exhausted_pool_is_logged_once(monkeypatch, caplog, scheme):
+    monkeypatch.setattr(azure_http, "_POOL_EXHAUSTIONS", azure_http.Counter())
+    session = get_retry_session(pool_maxsize=1, keepalive=False)
+    pool = session.get_adapter(f"{scheme}://").poolmanager.connection_from_url(
+        f"{scheme}://busy.example"
+    )
+
+    with caplog.at_level(logging.WARNING, logger="azure_http"):
+        connections = [pool._get_conn() for _ in range(3)]
+
+    assert pool_exhaustion_stats() == {"busy.example": 2}
+    assert [record.getMessage() for record in caplog.records] == [
+        "⚠️ Connection pool for busy.example exhausted (1 connections): requests "
+        "open extra connections that will be discarded. Raise HTTP_POOL_MAXSIZE to avoid it."
+    ]
+    for connection in connections:
+        connection.close()
+
+
+def test_host_sizes_are_parsed():
+    assert config._host_sizes(" dev.azure.com=16, VSRM.dev.azure.com=8,") == {
+        "dev.azure.com": 16,
+        "vsrm.dev.azure.com": 8,
+    }
+
+class FakeClock:
+    """Manual clock recording the sleeps requested by the throttler."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _throttler(clock, rate=2.0, burst=2):
+    return AdaptiveThrottler(rate=rate, burst=burst, min_rate=0.5, clock=clock, sleep=clock.sleep)
+
+
+def test_throttler_paces_beyond_burst():
+    clock = FakeClock()
+    throttler = _throttler(clock)
+    for _ in range(4):
+        throttler.acquire()
+
+    assert clock.sleeps == [0.5, 0.5]
+    stats = throttler.stats()
+    assert stats.throttled_requests == 2
+    assert stats.throttled_seconds == 1.0
+
+
+def test_throttler_honours_retry_after():
+    clock = FakeClock()
+    throttler = _throttler(clock)
+    throttler.observe({"Retry-After": "3"})
+    throttler.acquire()
+
+    assert clock.sleeps == [3.0]
+    assert throttler.rate == 1.0
+    assert throttler.stats().retry_after_responses == 1
+
+
+def test_throttler_slows_down_and_recovers():
+    clock = FakeClock()
+    throttler = _throttler(clock, rate=4.0)
+    throttler.observe({"X-RateLimit-Delay": "0.5"})
+    assert throttler.rate == 2.0
+    throttler.observe({"X-RateLimit-Remaining": "10", "X-RateLimit-Limit": "200"})
+    assert throttler.rate == 1.0
+    throttler.observe({"X-RateLimit-Remaining": "150", "X-RateLimit-Limit": "200"})
+    assert throttler.rate == 1.0
+    throttler.observe({"Retry-After": "soon"})
+    assert throttler.rate == pytest.approx(1.4)
+    assert throttler.stats().slowdowns == 2
+
+
+def test_shared_throttler_is_reused():
+    assert get_shared_throttler() is get_shared_throttler()
@@ -0,0 +1,268 @@
+import multiprocessing
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import backfill
+import config
+from azure_devops.api_client import AzureDevOpsClient
+from azure_devops.cache import ResponseCache
+from azure_http import AdaptiveThrottler
+from backfill import (TimeWindow, parse_backfill_args, parse_datetime, run_backfill,
+                      split_windows)
+from benchmarks.fake_server import (DEFINITION_NAME, PROJECT_NAME, DatasetSpec,
+                                    FakeAzureDevOpsServer, SyntheticDataset)
+from pipeline import iter_payloads, resolve_scope
+from sinks import NdjsonSink
+from tests.factories import build_release_environment
+
+UTC = timezone.utc
+
+
+class _ListSink(NdjsonSink):
+    def __init__(self):
+        super().__init__(None)
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+
+def test_split_windows_newest_first():
+    windows = split_windows(
+        datetime(2024, 1, 1, tzinfo=UTC), datetime(2024, 1, 31, tzinfo=UTC), 14
+    )
+
+    assert [(w.start.day, w.end.day) for w in windows] == [(17, 31), (3, 17), (1, 3)]
+
+
+@pytest.mark.parametrize(
+    "since, until, days",
+    [
+        (datetime(2024, 1, 2, tzinfo=UTC), datetime(2024, 1, 1, tzinfo=UTC), 14),
+        (datetime(2024, 1, 1, tzinfo=UTC), datetime(2024, 1, 2, tzinfo=UTC), 0),
+    ],
+)
+def test_split_windows_rejects_empty_ranges(since, until, days):
+    with pytest.raises(ValueError):
+        split_windows(since, until, days)
+
+
+def test_window_contains_is_half_open():
+    window = TimeWindow(datetime(2024, 1, 1, tzinfo=UTC), datetime(2024, 1, 2, tzinfo=UTC))
+
+    assert window.contains(build_release_environment(release_created_on="2024-01-01T00:00:00Z"))
+    assert not window.contains(
+        build_release_environment(release_created_on="2024-01-02T00:00:00Z")
+    )
+    assert window.label == "2024-01-01T00:00:00+00:00/2024-01-02T00:00:00+00:00"
+
+
+def test_parse_datetime_defaults_to_utc():
+    assert parse_datetime("2024-01-01") == datetime(2024, 1, 1, tzinfo=UTC)
+    assert parse_datetime("2024-01-01T02:00:00Z") == datetime(2024, 1, 1, 2, tzinfo=UTC)
+
+
+def test_parse_backfill_args():
+    args = parse_backfill_args(
+        ["--since", "2023-01-01", "--until", "2025-01-01", "--workers", "8", "--window-days", "7"]
+    )
+
+    assert args.since == datetime(2023, 1, 1, tzinfo=UTC)
+    assert args.until == datetime(2025, 1, 1, tzinfo=UTC)
+    assert (args.workers, args.window_days) == (8, 7)
+    assert args.output == "-"
+    assert parse_backfill_args(["--since", "2023-01-01"]).until.tzinfo is not None
+
+
+@pytest.mark.parametrize(
+    "extra_args", [["--incremental"], ["--targets", "t.json"], ["--replay", "c.gz"], ["--async"]]
+)
+def test_parse_backfill_args_rejects_single_pass_options(extra_args):
+    with pytest.raises(SystemExit):
+        parse_backfill_args(["--since", "2023-01-01", *extra_args])
+
+
+def test_prepare_cache_clears_the_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    url = "https://fake.example/_apis/release/releases/1"
+    cache = ResponseCache(path)
+    cache.set(url, None, {"id": 1})
+    cache.close()
+
+    args = parse_backfill_args(
+        ["--since", "2023-01-01", "--cache", "--clear-cache", "--cache-path", path]
+    )
+    assert backfill.prepare_cache(args) == path
+    cache = ResponseCache(path)
+    assert cache.get(url) is None
+    cache.close()
+
+    args = parse_backfill_args(["--since", "2023-01-01", "--no-cache", "--cache-path", path])
+    assert backfill.prepare_cache(args) is None
+
+
+@pytest.fixture(name="server")
+def _server(monkeypatch):
+    spec = DatasetSpec(releases=50, artifacts_per_release=1, repositories=2, prs_per_repository=5)
+    with FakeAzureDevOpsServer(SyntheticDataset(spec)) as server:
+        monkeypatch.setattr(config, "AZURE_ORG_URL", server.url)
+        monkeypatch.setattr(config, "AZURE_RELEASE_URL", server.url)
+        monkeypatch.setattr(config, "THROTTLE_RATE", 1000.0)
+        monkeypatch.setattr(config, "THROTTLE_BURST", 1000)
+        yield server
+
+
+def _scope(server):
+    client = AzureDevOpsClient(
+        server.url, "7.1", throttler=AdaptiveThrottler(rate=1000, burst=1000)
+    )
+    return client, resolve_scope(client, client, PROJECT_NAME, DEFINITION_NAME)
+
+
+def _windows():
+    # Release j is created j hours after 2024-01-01, so window bounds hit releases.
+    return split_windows(
+        datetime(2024, 1, 1, tzinfo=UTC), datetime(2024, 1, 3, 1, tzinfo=UTC), 1
+    )
+
+
+def test_run_backfill_matches_a_sequential_run(server):
+    client, scope = _scope(server)
+    sequential = [
+        payload["release"]["id"]
+        for payload in iter_payloads(
+            client,
+            client,
+            replace(scope, max_created_time="2024-01-03T01:00:00+00:00"),
+        )
+    ]
+    sink = _ListSink()
+
+    results = run_backfill(
+        scope, _windows(), sink, workers=3, executor_factory=ThreadPoolExecutor
+    )
+
+    assert [records for _, records in results] == [24, 24, 0]
+    assert [record["release"]["id"] for record in sink.records] == sequential
+    assert sequential == list(range(48, 0, -1))
+
+
+@pytest.mark.parametrize(
+    "error", [RuntimeError("boom"), sqlite3.OperationalError("database is locked")]
+)
+def test_run_backfill_reports_failed_windows(server, monkeypatch, caplog, error):
+    _, scope = _scope(server)
+    collect_window = backfill.collect_window
+
+    def failing(job):
+        if job.index == 1:
+            raise error
+        return collect_window(job)
+
+    monkeypatch.setattr(backfill, "collect_window", failing)
+    sink = _ListSink()
+
+    results = run_backfill(
+        scope, _windows(), sink, workers=2, executor_factory=ThreadPoolExecutor
+    )
+
+    assert [records for _, records in results] == [24, None, 0]
+    assert [record["release"]["id"] for record in sink.records] == list(range(48, 24, -1))
+    assert "Backfill window 2024-01-01T01:00:00+00:00" in caplog.text
+
+
+def test_run_backfill_resumes_failed_windows(server, monkeypatch, tmp_path):
+    _, scope = _scope(server)
+    checkpoint = str(tmp_path / "checkpoint.ndjson")
+    collect_window = backfill.collect_window
+
+    def failing(job):
+        if job.index == 1:
+            raise RuntimeError("boom")
+        return collect_window(job)
+
+    monkeypatch.setattr(backfill, "collect_window", failing)
+    run_backfill(
+        scope,
+        _windows(),
+        _ListSink(),
+        workers=2,
+        executor_factory=ThreadPoolExecutor,
+        checkpoint_path=checkpoint,
+    )
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "checkpoint.20240101T000000-20240101T010000.ndjson",
+        "checkpoint.20240102T010000-20240103T010000.ndjson",
+    ]
+
+    monkeypatch.setattr(backfill, "collect_window", collect_window)
+    server.requests.clear()
+    sink = _ListSink()
+    results = run_backfill(
+        scope,
+        _windows(),
+        sink,
+        workers=2,
+        executor_factory=ThreadPoolExecutor,
+        checkpoint_path=checkpoint,
+        resume=True,
+    )
+
+    assert [records for _, records in results] == [24, 24, 0]
+    assert [record["release"]["id"] for record in sink.records] == list(range(48, 0, -1))
+    # Commit dates are resolved again for the failed window only, per repository.
+    assert server.requests["commitsbatch"] == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_init_worker_shares_the_rate_limit(monkeypatch):
+    monkeypatch.setattr(backfill, "_WORKER_CLIENTS", None)
+    monkeypatch.setattr(config, "THROTTLE_RATE", 20.0)
+    monkeypatch.setattr(config, "THROTTLE_BURST", 20)
+
+    backfill.init_worker(8)
+
+    client_core, client_release = backfill._WORKER_CLIENTS
+    assert client_core.throttler is client_release.throttler
+    assert client_core.throttler.base_rate == 2.5
+    assert client_core.cache is None
+
+
+def test_init_worker_opens_the_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(backfill, "_WORKER_CLIENTS", None)
+
+    backfill.init_worker(1, str(tmp_path / "cache.sqlite"))
+
+    client_core, _ = backfill._WORKER_CLIENTS
+    assert client_core.cache is not None
+    client_core.cache.close()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_run_backfill_in_worker_processes(server):
+    _, scope = _scope(server)
+    sink = _ListSink()
+
+    def executor_factory(**kwargs):
+        return ProcessPoolExecutor(mp_context=multiprocessing.get_context("fork"), **kwargs)
+
+    results = run_backfill(scope, _windows(), sink, workers=2, executor_factory=executor_factory)
+
+    assert sum(records for _, records in results) == 48
+    assert len({record["release"]["id"] for record in sink.records}) == 48
+    assert server.requests["releases"] >= 3
+
+
+def test_windows_cover_the_range_without_gaps():
+    since = datetime(2023, 1, 1, tzinfo=UTC)
+    until = since + timedelta(days=730, hours=5)
+    windows = split_windows(since, until, 14)
+
+    assert windows[0].end == until and windows[-1].start == since
+    assert all(a.start == b.end for a, b in zip(windows, windows[1:]))
@@ -0,0 +1,159 @@
+"""Tests for the SQLite response cache."""
+
+import pytest
+
+from azure_devops import ado_services
+from azure_devops import cache as cache_module
+from azure_devops.api_client import AzureDevOpsClient
+from azure_devops.cache import ResponseCache, cache_key, classify_endpoint
+
+COMMIT_URL = "https://dev.azure.com/org/proj/_apis/git/repositories/r/commits/abc"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    response_cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    yield response_cache
+    response_cache.close()
+
+
+def test_classify_endpoint():
+    assert classify_endpoint(COMMIT_URL) == "commit"
+    assert (
+        classify_endpoint("https://x/p/_apis/git/repositories/r/pullRequests/1/commits")
+        == "pull_request_commits"
+    )
+    assert (
+        classify_endpoint("https://x/p/_apis/git/repositories/r/pullrequestquery/abc")
+        == "pull_request_query"
+    )
+    assert classify_endpoint("https://x/p/_apis/release/releases/12") == "release"
+    assert classify_endpoint("https://x/p/_apis/release/releases") is None
+    assert classify_endpoint("https://x/p/_apis/git/repositories/r/pullRequests") is None
+
+
+def test_cache_key_normalizes_host_and_param_order():
+    assert cache_key("HTTPS://Dev.Azure.com/a", {"b": 1, "a": 2}) == cache_key(
+        "https://dev.azure.com/a", {"a": 2, "b": 1}
+    )
+    assert cache_key(COMMIT_URL, {"a": 1}) != cache_key(COMMIT_URL, {"a": 2})
+
+
+def test_round_trip_and_counters(cache):
+    assert cache.get(COMMIT_URL, {"api-version": "7.1"}) is None
+    cache.set(COMMIT_URL, {"api-version": "7.1"}, {"committer": {"date": "d"}})
+    assert cache.get(COMMIT_URL, {"api-version": "7.1"}) == {"committer": {"date": "d"}}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_uncacheable_endpoints_are_ignored(cache):
+    url = "https://x/p/_apis/release/releases"
+    cache.set(url, None, {"value": []})
+    assert cache.get(url) is None
+
+
+def test_expired_entries_are_dropped(cache, monkeypatch):
+    cache.set(COMMIT_URL, None, {"ok": True})
+    now = cache_module.time.time()
+    monkeypatch.setattr(
+        cache_module.time, "time", lambda: now + cache.ttls["commit"] + 1
+    )
+    assert cache.get(COMMIT_URL) is None
+    assert cache.get(COMMIT_URL) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(cache_module.time, "time", lambda: float(next(clock)))
+    response_cache = ResponseCache(str(tmp_path / "c.sqlite"), max_bytes=30)
+    urls = [f"{COMMIT_URL}{index}" for index in range(3)]
+
+    response_cache.set(urls[0], None, {"v": "0123456"})
+    response_cache.set(urls[1], None, {"v": "0123456"})
+    response_cache.get(urls[0])
+    response_cache.set(urls[2], None, {"v": "0123456"})
+
+    assert response_cache.get(urls[0]) == {"v": "0123456"}
+    assert response_cache.get(urls[1]) is None
+    assert response_cache.get(urls[2]) == {"v": "0123456"}
+    response_cache.close()
+
+
+def test_total_size_follows_writes(cache):
+    def totals():
+        (total,) = cache._connection.execute("SELECT size FROM totals").fetchone()
+        (actual,) = cache._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return total, actual
+
+    cache.set(COMMIT_URL, None, {"v": "0123456"})
+    cache.set(COMMIT_URL, None, {"v": "0"})
+    cache.set(f"{COMMIT_URL}2", None, {"v": "01"})
+    assert totals() == (19, 19)
+    cache.clear()
+    assert totals() == (0, 0)
+
+
+def test_hits_write_their_read_time_later(tmp_path, monkeypatch):
+    now = cache_module.time.time()
+    monkeypatch.setattr(cache_module.time, "time", lambda: now)
+    path = str(tmp_path / "c.sqlite")
+    response_cache = ResponseCache(path)
+    response_cache.set(COMMIT_URL, None, {"ok": True})
+
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 1)
+    changes = response_cache._connection.total_changes
+    assert response_cache.get(COMMIT_URL) == {"ok": True}
+    assert response_cache._connection.total_changes == changes
+    response_cache.close()
+
+    reopened = ResponseCache(path)
+    (accessed_at,) = reopened._connection.execute(
+        "SELECT accessed_at FROM responses"
+    ).fetchone()
+    assert accessed_at == now + 1
+    reopened.close()
+
+
+def test_clear(cache):
+    cache.set(COMMIT_URL, None, {"ok": True})
+    cache.clear()
+    assert cache.get(COMMIT_URL) is None
+
+
+def test_cache_is_shared_between_connections(cache):
+    (mode,) = cache._connection.execute("PRAGMA journal_mode").fetchone()
+    assert mode == "wal"
+
+    other = ResponseCache(cache.path)
+    try:
+        other.set(COMMIT_URL, None, {"ok": True})
+        assert cache.get(COMMIT_URL) == {"ok": True}
+    finally:
+        other.close()
+
+
+def test_client_serves_cached_responses(cache, requests_mock):
+    client = AzureDevOpsClient("https://dev.azure.com/org", "7.1", cache=cache)
+    matcher = requests_mock.get(COMMIT_URL, json={"committer": {"date": "d"}})
+    endpoint = "/proj/_apis/git/repositories/r/commits/abc"
+
+    assert client.get(endpoint, {"api-version": "7.1"}) == {"committer": {"date": "d"}}
+    assert client.get(endpoint, {"api-version": "7.1"}) == {"committer": {"date": "d"}}
+    assert matcher.call_count == 1
+
+
+def test_batched_commits_are_cached_per_commit(cache, requests_mock):
+    client = AzureDevOpsClient("https://dev.azure.com/org", "7.1", cache=cache)
+    batch = requests_mock.post(
+        "https://dev.azure.com/org/proj/_apis/git/repositories/r/commitsbatch",
+        json={"value": [{"commitId": "ABC", "committer": {"date": "d"}, "comment": "c"}]},
+    )
+    commit = requests_mock.get(COMMIT_URL, json={})
+
+    for _ in range(2):
+        assert ado_services.get_commit_dates(client, "proj", "r", ["abc"]) == {"abc": "d"}
+    assert ado_services.get_commit_date(client, "proj", "r", "abc") == "d"
+    assert (batch.call_count, commit.call_count) == (1, 0)
+
@@ -0,0 +1,80 @@
+"""Tests for cassette record and replay."""
+
+import gzip
+
+import pytest
+import requests
+
+import config
+from azure_devops.api_client import AzureDevOpsClient
+from azure_devops.cassette import RECORD, REPLAY, Cassette
+from azure_devops.metrics import RequestMetrics
+
+
+def _record(path, requests_mock):
+    requests_mock.get(
+        "http://example.com/releases",
+        [
+            {"json": {"value": [1]}, "headers": {"x-ms-continuationtoken": "t"}},
+            {"json": {"value": [2]}},
+        ],
+    )
+    requests_mock.post("http://example.com/batch", json={"value": ["b"]})
+    requests_mock.get("http://example.com/missing", status_code=404, text="gone")
+
+    with Cassette(str(path), RECORD) as cassette:
+        client = AzureDevOpsClient("http://example.com", "7.1", cassette=cassette)
+        assert client.get_page("/releases", {"$top": 1}) == ({"value": [1]}, "t")
+        assert client.get("/releases", {"$top": 1}) == {"value": [2]}
+        assert client.post("/batch", json={"ids": ["b"]}) == {"value": ["b"]}
+        with pytest.raises(requests.HTTPError):
+            client.get("/missing")
+    return cassette
+
+
+def test_replay_serves_recorded_responses_offline(tmp_path, requests_mock, monkeypatch):
+    path = tmp_path / "run.cassette.gz"
+    recorded = _record(path, requests_mock)
+    network_calls = requests_mock.call_count
+
+    monkeypatch.setattr(config, "PAT_TOKEN", "")
+    cassette = Cassette(str(path), REPLAY)
+    metrics = RequestMetrics()
+    client = AzureDevOpsClient(
+        "http://example.com", "7.1", cassette=cassette, metrics=metrics
+    )
+
+    assert cassette.recorded_at == recorded.recorded_at
+    assert client.get_page("/releases", {"$top": 1}) == ({"value": [1]}, "t")
+    assert client.get("/releases", {"$top": 1}) == {"value": [2]}
+    # Repeated more often than recorded: the last response is served again.
+    assert client.get("/releases", {"$top": 1}) == {"value": [2]}
+    assert client.post("/batch", json={"ids": ["b"]}) == {"value": ["b"]}
+    with pytest.raises(requests.HTTPError):
+        client.get("/missing")
+    with pytest.raises(RuntimeError):
+        client.post("/batch", json={"ids": ["other"]})
+
+    assert requests_mock.call_count == network_calls
+    assert metrics.snapshot()["GET /releases"].requests == 3
+
+
+def test_cassette_rejects_invalid_input(tmp_path):
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "c.gz"), "stream")
+
+    path = tmp_path / "bad.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        handle.write('{"version": 99}\n')
+    with pytest.raises(ValueError):
+        Cassette(str(path), REPLAY)
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "absent.gz"), REPLAY)
+
+
+def test_closed_cassette_refuses_records(tmp_path):
+    cassette = Cassette(str(tmp_path / "nested" / "c.gz"), RECORD)
+    cassette.close()
+    cassette.close()
+    with pytest.raises(RuntimeError):
+        cassette.record("GET", "http://x", None, None, requests.Response())
@@ -0,0 +1,82 @@
+"""Tests for JSON decoding of responses."""
+
+import builtins
+import json
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+import config
+from azure_devops.decoding import decode_json, get_decoder, iter_array_items
+
+_JSON = st.recursive(
+    st.none() | st.booleans() | st.integers() | st.text(),
+    lambda children: st.lists(children, max_size=3)
+    | st.dictionaries(st.text(), children, max_size=3),
+    max_leaves=10,
+)
+
+
+@pytest.fixture
+def without_orjson(monkeypatch):
+    real_import = builtins.__import__
+
+    def fake_import(name, *args, **kwargs):
+        if name == "orjson":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    get_decoder.cache_clear()
+    monkeypatch.setattr(builtins, "__import__", fake_import)
+    yield
+    get_decoder.cache_clear()
+
+
+def test_decoders_agree():
+    body = b'{"count": 1, "value": [{"name": "\\u00e9t\\u00e9", "id": 3}]}'
+    assert get_decoder("orjson")(body) == get_decoder("json")(body) == json.loads(body)
+
+
+def test_auto_backend_falls_back_without_orjson(without_orjson):
+    assert get_decoder("auto") is json.loads
+    with pytest.raises(RuntimeError, match="pip install"):
+        get_decoder("orjson")
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_decoder("simdjson")
+
+
+def test_decode_json_uses_configured_backend(monkeypatch):
+    monkeypatch.setattr(config, "JSON_BACKEND", "json")
+    assert decode_json(b'{"a": [1]}') == {"a": [1]}
+
+
+@given(items=st.lists(_JSON, max_size=5), before=_JSON, after=_JSON)
+def test_iter_array_items_matches_full_parse(items, before, after):
+    text = json.dumps({"count": before, "value": items, "tail": after}, indent=1)
+    assert list(iter_array_items(text)) == items
+
+
+def test_iter_array_items_without_key():
+    assert list(iter_array_items(' { } ')) == []
+    assert list(iter_array_items('{"count": 0, "other": [1]}')) == []
+    assert list(iter_array_items('{"value": []}')) == []
+
+
+def test_iter_array_items_is_lazy():
+    items = iter_array_items('{"value": [{"id": 1}, oops]}')
+    assert next(items) == {"id": 1}
+    with pytest.raises(json.JSONDecodeError):
+        next(items)
+
+
+@pytest.mark.parametrize(
+    "text",
+    ['[1, 2]', '{"value" [1]}', '{1: 2}', '{"value": [1 2]}', '{"a": 1 "value": []}'],
+)
+def test_iter_array_items_rejects_malformed_documents(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_array_items(text))
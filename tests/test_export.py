@@ -0,0 +1,122 @@
+"""Tests for the columnar export sinks."""
+
+import builtins
+import csv
+import gzip
+
+import pytest
+
+import export
+from export import COLUMN_NAMES, CsvSink, flatten_payload, open_export_sink
+
+
+def _payload(release_id=1, merged=True):
+    metrics = {
+        "lead_time_artifact_commit_to_prod": {"seconds": 7200, "minutes": 120.0, "hours": 2.0},
+        "lead_time_pr_last_commit_to_prod": {"seconds": 3600, "minutes": 60.0, "hours": 1.0},
+    }
+    if merged:
+        metrics["lead_time_pr_to_prod"] = {"seconds": 60, "minutes": 1.0, "hours": 0.02}
+    return {
+        "timestamp": "2021-01-03T00:00:00+00:00",
+        "project": {"name": "proj", "id": "pid"},
+        "release": {"id": release_id, "name": "r1", "definition": "def"},
+        "environment": {"id": 11, "name": "Prod"},
+        "repository": {"id": "repo", "name": "repo", "branch_name": "main"},
+        "artifact": {"alias": "a", "commit_id": "c1", "build_id": 4},
+        "pullrequest": {"id": "7", "merged_at": "2021-01-02T00:00:00Z"},
+        "metrics": metrics,
+    }
+
+
+def test_flatten_payload_follows_fixed_schema():
+    row = flatten_payload(_payload(merged=False))
+    assert tuple(row) == COLUMN_NAMES
+    assert row["release_id"] == 1
+    assert row["repository_branch_name"] == "main"
+    assert row["lead_time_artifact_commit_to_prod_hours"] == 2.0
+    assert row["lead_time_pr_to_prod_seconds"] is None
+    assert row["release_status"] is None
+
+
+def test_csv_sink_writes_in_batches(tmp_path):
+    path = tmp_path / "out.csv"
+    sink = open_export_sink(str(path), "csv", batch_size=2)
+    sink.write(_payload(1))
+    assert sink.rows_written == 0
+    sink.write(_payload(2))
+    assert sink.rows_written == 2
+    sink.write(_payload(3))
+    sink.close()
+
+    with open(path, encoding="utf-8", newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["release_id"] for row in rows] == ["1", "2", "3"]
+    assert rows[0]["lead_time_pr_to_prod_minutes"] == "1.0"
+
+
+def test_csv_sink_on_stdout(capsys):
+    with open_export_sink("-", "csv") as sink:
+        sink.write(_payload())
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split(",") == list(COLUMN_NAMES)
+    assert len(lines) == 2
+
+
+def test_csv_sink_gzip(tmp_path):
+    path = tmp_path / "out.csv"
+    with open_export_sink(str(path), "csv", compress=True) as sink:
+        sink.write(_payload())
+
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as handle:
+        assert [row["release_id"] for row in csv.DictReader(handle)] == ["1"]
+
+
+def test_unknown_format_and_parquet_on_stdout():
+    with pytest.raises(ValueError):
+        open_export_sink("out", "xlsx")
+    with pytest.raises(ValueError):
+        open_export_sink("-", "parquet")
+    with pytest.raises(ValueError):
+        open_export_sink("out.parquet", "parquet", compress=True)
+
+
+def test_parquet_sink_requires_pyarrow(monkeypatch, tmp_path):
+    real_import = builtins.__import__
+
+    def fake_import(name, *args, **kwargs):
+        if name.startswith("pyarrow"):
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", fake_import)
+    with pytest.raises(RuntimeError):
+        export.ParquetSink(str(tmp_path / "out.parquet"))
+
+
+def test_parquet_sink_writes_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "out.parquet"
+    with open_export_sink(str(path), "parquet", batch_size=2) as sink:
+        for release_id in range(5):
+            sink.write(_payload(release_id, merged=release_id % 2 == 0))
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column_names == list(COLUMN_NAMES)
+    assert table.column("release_id").to_pylist() == [0, 1, 2, 3, 4]
+    assert table.column("lead_time_pr_to_prod_seconds").to_pylist() == [60, None, 60, None, 60]
+
+
+def test_abstract_batch_hooks():
+    with pytest.raises(TypeError):
+        export._BatchingSink(batch_size=1)
+
+
+def test_csv_sink_keeps_foreign_stream_open(tmp_path):
+    with open(tmp_path / "out.csv", "w", encoding="utf-8") as handle:
+        sink = CsvSink(handle)
+        sink.write(_payload())
+        sink.close()
+        assert not handle.closed
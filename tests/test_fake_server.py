@@ -0,0 +1,26 @@
+"""Smoke test of the pipeline against the benchmark fake server."""
+
+from azure_devops.api_client import AzureDevOpsClient
+from azure_http import AdaptiveThrottler
+from benchmarks.fake_server import (DEFINITION_NAME, PROJECT_NAME, DatasetSpec,
+                                    FakeAzureDevOpsServer, SyntheticDataset)
+from pipeline import iter_payloads, resolve_scope
+
+
+def test_pipeline_against_fake_server():
+    spec = DatasetSpec(releases=7, artifacts_per_release=2, repositories=3, prs_per_repository=5)
+    with FakeAzureDevOpsServer(SyntheticDataset(spec)) as server:
+        client = AzureDevOpsClient(
+            server.url, "7.1", throttler=AdaptiveThrottler(rate=1000, burst=1000)
+        )
+        scope = resolve_scope(client, client, PROJECT_NAME, DEFINITION_NAME)
+        payloads = list(iter_payloads(client, client, scope))
+
+    assert len(payloads) == 14
+    assert [payload["release"]["id"] for payload in payloads[::2]] == list(range(7, 0, -1))
+    assert all(
+        payload["metrics"]["lead_time_pr_to_prod"]["seconds"] > 0 for payload in payloads
+    )
+    assert server.requests["releases"] == 1
+    assert server.requests["pull_request_query"] == 3
+    assert server.requests["pull_requests"] == 0
@@ -0,0 +1,132 @@
+"""Tests for the Azure Functions entry points."""
+
+import json
+import logging
+
+import pytest
+
+import config
+import function_handler
+from azure_devops.cache import ResponseCache
+from scan import ScopeResolver
+from state import IdCache
+from tests.factories import release_scenario, response_key
+
+
+@pytest.fixture(autouse=True)
+def _cold_instance():
+    function_handler.reset_warm_state()
+    yield
+    function_handler.reset_warm_state()
+
+
+@pytest.fixture
+def warm_client(fake_client, monkeypatch):
+    """Install a warm state over a fake client counting project lookups."""
+    responses = release_scenario()
+    responses[
+        response_key(
+            "/pid/_apis/release/definitions",
+            {"api-version": "7.1", "searchText": "other"},
+        )
+    ] = {"value": []}
+    client = fake_client(responses)
+    client.lookups = []
+    original_get = client.get
+
+    def counting_get(endpoint, params=None):
+        if "/_apis/projects" in endpoint or "/definitions" in endpoint:
+            client.lookups.append(endpoint)
+        return original_get(endpoint, params)
+
+    client.get = counting_get
+    monkeypatch.setattr(config, "PROJECT_NAME", "proj")
+    monkeypatch.setattr(config, "STAGE_NAME", "def")
+    monkeypatch.setattr(config, "FUNCTION_ARGS", "")
+    monkeypatch.setattr(
+        function_handler,
+        "_WARM_STATE",
+        function_handler.WarmState(client, client, ScopeResolver(client, client)),
+    )
+    return client
+
+
+def test_warm_state_is_created_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(config, "ID_CACHE_ENABLED", True)
+
+    state = function_handler.get_warm_state()
+
+    assert function_handler.get_warm_state() is state
+    assert state.client_core.base_url == config.AZURE_ORG_URL
+    assert state.client_release.base_url == config.AZURE_RELEASE_URL
+    assert isinstance(state.cache, ResponseCache)
+    assert state.client_core.cache is state.cache
+
+    function_handler.reset_warm_state()
+    assert function_handler.get_warm_state() is not state
+
+
+def test_run_collection_reuses_warm_state(warm_client, tmp_path):
+    output = tmp_path / "records.ndjson"
+    function_handler.get_warm_state().resolver.id_cache = IdCache(str(tmp_path / "ids.json"))
+
+    first = function_handler.run_collection(["--output", str(output)])
+    second = function_handler.run_collection(["--output", str(output)])
+
+    records = output.read_text(encoding="utf-8").splitlines()
+    assert first["records"] == second["records"] == len(records) > 0
+    assert (first["invocation"], first["warm"]) == (1, False)
+    assert (second["invocation"], second["warm"]) == (2, True)
+    assert second["targets"] == {"proj__def": len(records)}
+    assert second["failed"] == []
+    assert warm_client.lookups == ["/_apis/projects", "/pid/_apis/release/definitions"]
+    assert (tmp_path / "ids.json").exists()
+
+
+def test_run_collection_targets(warm_client, tmp_path):
+    targets = tmp_path / "targets.json"
+    targets.write_text(
+        json.dumps({"targets": [{"project": "proj", "definition": "def", "environment": "Prod"}]}),
+        encoding="utf-8",
+    )
+    output = str(tmp_path / "{target}.ndjson")
+
+    report = function_handler.run_collection(["--targets", str(targets), "--output", output])
+    assert report["targets"] == {"proj__def__Prod": 1}
+    assert (tmp_path / "proj__def__Prod.ndjson").exists()
+
+    report = function_handler.run_collection(
+        ["--output", str(tmp_path / "other.ndjson")], target=("proj", "other", None)
+    )
+    assert report["failed"] == ["proj__other"]
+
+
+def test_handle_timer(warm_client, monkeypatch, caplog):
+    with caplog.at_level(logging.INFO, logger="function_handler"):
+        assert function_handler.handle_timer()["records"] > 0
+    assert "Collected" in caplog.text
+
+    monkeypatch.setattr(config, "STAGE_NAME", "other")
+    with pytest.raises(RuntimeError, match="proj__other"):
+        function_handler.handle_timer()
+
+
+def test_handle_http(warm_client, monkeypatch):
+    status, body = function_handler.handle_http({"project": "proj"})
+    assert status == 400 and "definition" in body["error"]
+
+    status, body = function_handler.handle_http(
+        {"project": "proj", "definition": "def", "environment": "QA"}
+    )
+    assert (status, body["targets"]) == (200, {"proj__def__QA": 0})
+
+    status, body = function_handler.handle_http({"project": "proj", "definition": "other"})
+    assert (status, body["failed"]) == (500, ["proj__other"])
+
+    def broken(**_):
+        raise ValueError("Invalid scan targets file")
+
+    monkeypatch.setattr(function_handler, "run_collection", broken)
+    assert function_handler.handle_http({}) == (500, {"error": "Invalid scan targets file"})
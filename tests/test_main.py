@@ -1,12 +1,37 @@
+import json
+import logging
 from datetime import timezone
 from pathlib import Path
 import sys
 
 import hypothesis.strategies as st
+import pytest
 from hypothesis import HealthCheck, assume, given, settings
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
-from main import calculate_duration
+import azure_http
+import main
+from azure_devops.metrics import RequestMetrics
+from main import (
+    calculate_duration,
+    collect_target,
+    open_cache,
+    open_cassette,
+    open_checkpoint,
+    open_id_cache,
+    open_output,
+    parse_args,
+    report_metrics,
+    report_run,
+    report_startup,
+    run_scan,
+    write_summary,
+)
+from state import CheckpointJournal, IdCache
+from pipeline import CollectionScope
+from scan import ScanTarget
+from sinks import NdjsonSink
+from tests.factories import release_scenario, response_key
 
 
 @settings(suppress_health_check=[HealthCheck.too_slow], deadline=None)
@@ -24,3 +49,280 @@ def test_calculate_duration_property(start, end):
     assert result["seconds"] == int(delta)
     assert result["minutes"] == round(delta / 60, 2)
     assert result["hours"] == round(delta / 3600, 2)
+
+
+def test_parse_args_defaults():
+    args = parse_args([])
+    assert args.use_async is False
+    assert args.concurrency >= 1
+
+
+def test_parse_args_async():
+    args = parse_args(["--async", "--concurrency", "3"])
+    assert args.use_async is True
+    assert args.concurrency == 3
+
+
+def test_open_cache_disabled():
+    assert open_cache(parse_args(["--no-cache"])) is None
+
+
+def test_open_cache_enabled_and_cleared(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = open_cache(parse_args(["--cache", "--cache-path", path]))
+    cache.set("https://x/p/_apis/release/releases/1", None, {"id": 1})
+    cache.close()
+
+    assert (
+        open_cache(parse_args(["--no-cache", "--clear-cache", "--cache-path", path]))
+        is None
+    )
+    cache = open_cache(parse_args(["--cache", "--cache-path", path]))
+    assert cache.get("https://x/p/_apis/release/releases/1") is None
+    cache.close()
+
+
+def test_parse_args_incremental():
+    args = parse_args(["--incremental", "--reset-state", "--state-file", "s.json"])
+    assert args.incremental and args.reset_state
+    assert args.state_file == "s.json"
+
+
+def test_parse_args_output():
+    args = parse_args(["--output", "out.ndjson.gz", "--gzip"])
+    assert args.output == "out.ndjson.gz"
+    assert args.gzip is True
+    assert parse_args([]).output == "-"
+
+
+def test_open_output_formats(tmp_path, capsys):
+    sink = open_output(parse_args([]))
+    assert isinstance(sink, NdjsonSink)
+    sink.close()
+
+    path = str(tmp_path / "out.csv")
+    with open_output(
+        parse_args(["--format", "csv", "--output", path, "--batch-size", "5"])
+    ) as sink:
+        assert sink.batch_size == 5
+
+
+def test_write_summary(tmp_path, caplog):
+    pytest.importorskip("numpy")
+    from aggregation import LeadTimeAggregator
+
+    aggregator = LeadTimeAggregator()
+    path = tmp_path / "summary.json"
+    write_summary(aggregator, str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["records"] == 0
+
+    with caplog.at_level(logging.INFO):
+        write_summary(aggregator, None)
+    assert "Lead time summary" in caplog.text
+
+
+def test_parse_args_targets():
+    args = parse_args(["--targets", "targets.json", "--parallel-targets", "2"])
+    assert args.targets == "targets.json"
+    assert args.parallel_targets == 2
+
+
+class _ListSink(NdjsonSink):
+    def __init__(self):
+        super().__init__(None)
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+
+@pytest.mark.parametrize("extra_args", [[], ["--async"]])
+def test_collect_target_filters_environment(fake_client, extra_args):
+    client = fake_client(release_scenario())
+    scope = CollectionScope("proj", "pid", "def", 2)
+    args = parse_args(extra_args)
+
+    sink = _ListSink()
+    target = ScanTarget("proj", "def", "Prod")
+    assert collect_target(args, client, client, target, scope, sink) == 1
+    assert sink.records[0]["artifact"]["alias"] == "a"
+
+    target = ScanTarget("proj", "def", "QA")
+    assert collect_target(args, client, client, target, scope, _ListSink()) == 0
+
+
+def test_collect_target_incremental_state(fake_client, tmp_path):
+    responses = release_scenario()
+    listing = response_key(
+        "/pid/_apis/release/releases",
+        {
+            "api-version": "7.1",
+            "queryOrder": "descending",
+            "$expand": "environments,artifacts",
+            "definitionId": 2,
+            "$top": 100,
+        },
+    )
+    since = listing[1] + (("minCreatedTime", "2020-12-04T01:00:00+00:00"),)
+    responses[(listing[0], tuple(sorted(since)))] = responses[listing]
+    client = fake_client(responses)
+    scope = CollectionScope("proj", "pid", "def", 2)
+    state_path = tmp_path / "watermark.json"
+    args = parse_args(["--incremental"])
+    target = ScanTarget("proj", "def", "Prod")
+
+    records = collect_target(
+        args, client, client, target, scope, _ListSink(), str(state_path)
+    )
+    assert records == 1
+    assert json.loads(state_path.read_text(encoding="utf-8"))["release_id"] == 3
+    assert (
+        collect_target(
+            args, client, client, target, scope, _ListSink(), str(state_path)
+        )
+        == 0
+    )
+
+
+@pytest.mark.parametrize("extra_args", [[], ["--async"]])
+def test_collect_target_resumes_from_checkpoint(fake_client, tmp_path, extra_args):
+    responses = release_scenario()
+    pr_commits = response_key(
+        "/proj/_apis/git/repositories/repo/pullRequests/8/commits",
+        {"api-version": "7.1-preview.1", "$top": 100, "$skip": 0},
+    )
+    answer, responses[pr_commits] = responses[pr_commits], RuntimeError("evicted")
+    client = fake_client(responses)
+    scope = CollectionScope("proj", "pid", "def", 2)
+    checkpoint = tmp_path / "checkpoint.ndjson"
+    target = ScanTarget("proj", "def")
+    args = parse_args(
+        ["--checkpoint", "--checkpoint-file", str(checkpoint), *extra_args]
+    )
+
+    with pytest.raises(RuntimeError):
+        collect_target(args, client, client, target, scope, _ListSink())
+    # Units complete before the failure are journaled as they finish.
+    assert len(checkpoint.read_text(encoding="utf-8").splitlines()) == 3
+
+    responses[pr_commits] = answer
+    client.posted.clear()
+    sink = _ListSink()
+    args = parse_args(["--resume", "--checkpoint-file", str(checkpoint), *extra_args])
+    assert collect_target(args, client, client, target, scope, sink) == 1
+
+    assert [record["artifact"]["alias"] for record in sink.records] == ["a"]
+    if not extra_args:
+        assert [
+            body["ids"]
+            for endpoint, body in client.posted
+            if endpoint.endswith("/commitsbatch")
+        ] == [["c4"]]
+    assert not checkpoint.exists()
+
+
+def test_open_checkpoint(tmp_path):
+    path = str(tmp_path / "checkpoint.ndjson")
+    assert open_checkpoint(parse_args([])) is None
+    assert open_checkpoint(parse_args(["--resume", "--replay", "c.gz"])) is None
+
+    journal = open_checkpoint(parse_args(["--resume", "--checkpoint-file", path]))
+    assert isinstance(journal, CheckpointJournal)
+    journal.discard()
+
+
+def test_report_metrics(tmp_path, caplog):
+    metrics = RequestMetrics()
+    with caplog.at_level(logging.INFO):
+        report_metrics(metrics, str(tmp_path / "empty.prom"))
+    assert not (tmp_path / "empty.prom").exists()
+
+    metrics.record("GET", "/_apis/projects", 0.01, 200, 10)
+    args = parse_args(["--metrics-file", str(tmp_path / "leadtime.prom")])
+    with caplog.at_level(logging.INFO):
+        report_metrics(metrics, args.metrics_file)
+    assert "GET /_apis/projects" in caplog.text
+    assert "leadtime_azure_devops_requests_total" in (
+        tmp_path / "leadtime.prom"
+    ).read_text(encoding="utf-8")
+
+
+def test_open_cassette(tmp_path):
+    assert open_cassette(parse_args([])) is None
+
+    path = str(tmp_path / "run.cassette.gz")
+    recording = open_cassette(parse_args(["--record", path]))
+    assert not recording.replaying
+    recording.close()
+    replaying = open_cassette(parse_args(["--replay", path]))
+    assert replaying.replaying
+    assert replaying.recorded_at == recording.recorded_at
+
+    with pytest.raises(SystemExit):
+        parse_args(["--record", path, "--replay", path])
+
+
+def test_configure_logging(monkeypatch):
+    calls = []
+    monkeypatch.setattr(logging, "basicConfig", lambda **kwargs: calls.append(kwargs))
+    monkeypatch.setattr(main, "LOG_LEVEL", "debug")
+    main.configure_logging()
+    assert calls == [{"level": logging.DEBUG}]
+
+
+def test_run_scan_partitions_targets_to_stdout(fake_client, tmp_path, capsys, caplog):
+    client = fake_client(release_scenario())
+    recording = open_cassette(
+        parse_args(["--record", str(tmp_path / "run.cassette.gz")])
+    )
+    recording.close()
+    targets = tmp_path / "targets.json"
+    args = parse_args(
+        [
+            "--targets",
+            str(targets),
+            "--summary",
+            "--state-file",
+            str(tmp_path / "s.json"),
+        ]
+    )
+    scan_targets = [ScanTarget("proj", "def", "Prod"), ScanTarget("proj", "def", "QA")]
+
+    with caplog.at_level(logging.INFO):
+        results = run_scan(args, client, client, scan_targets, cassette=recording)
+
+    assert results == [(scan_targets[0], 1), (scan_targets[1], 0)]
+    record = json.loads(capsys.readouterr().out)
+    assert record["timestamp"] == recording.recorded_at
+    assert "Lead time summary" in caplog.text
+
+
+def test_report_run_logs_pool_exhaustion(monkeypatch, caplog):
+    monkeypatch.setattr(azure_http, "_POOL_EXHAUSTIONS", azure_http.Counter({"h": 3}))
+    with caplog.at_level(logging.INFO):
+        report_run(None)
+    assert "Throttling" in caplog.text
+    assert "Connection pool of h exhausted by 3 requests." in caplog.text
+
+
+def test_open_id_cache(tmp_path):
+    assert isinstance(open_id_cache(parse_args([])), IdCache)
+    assert open_id_cache(parse_args(["--no-id-cache"])) is None
+    assert open_id_cache(parse_args(["--record", str(tmp_path / "c.gz")])) is None
+
+
+def test_report_startup(caplog):
+    metrics = RequestMetrics()
+    with caplog.at_level(logging.INFO):
+        report_startup(0.0, metrics)
+    assert "Startup" not in caplog.text
+
+    metrics.record("GET", "/_apis/projects", 0.01, 200)
+    metrics.first_response_at = 0.25
+    cache = IdCache("unused.json")
+    cache.hits = 2
+    with caplog.at_level(logging.INFO):
+        report_startup(0.0, metrics, cache)
+    assert (
+        "Startup: first response 250 ms after start, 2 ids from cache." in caplog.text
+    )
@@ -0,0 +1,92 @@
+"""Tests for the request metrics registry."""
+
+import pytest
+
+from azure_devops.metrics import (LATENCY_BUCKETS, RequestMetrics, endpoint_template,
+                                  get_shared_metrics)
+
+
+@pytest.mark.parametrize(
+    "endpoint, template",
+    [
+        ("/_apis/projects", "/_apis/projects"),
+        ("/pid/_apis/release/releases", "/{project}/_apis/release/releases"),
+        ("/p/_apis/release/releases/12", "/{project}/_apis/release/releases/{releaseId}"),
+        (
+            "/p/_apis/git/repositories/r/pullRequests/7/commits",
+            "/{project}/_apis/git/repositories/{repositoryId}/pullRequests/{pullRequestId}/commits",
+        ),
+        (
+            "/p/_apis/git/repositories/r/commits/abc?x=1",
+            "/{project}/_apis/git/repositories/{repositoryId}/commits/{commitId}",
+        ),
+        ("/health", "/health"),
+    ],
+)
+def test_endpoint_template(endpoint, template):
+    assert endpoint_template(endpoint) == template
+
+
+def _metrics():
+    metrics = RequestMetrics()
+    metrics.record("GET", "/p/_apis/release/releases/1", 0.02, 200, 100)
+    metrics.record("GET", "/q/_apis/release/releases/2", 0.3, 200, 50, retries=2)
+    metrics.record("GET", "/p/_apis/release/releases/3", 20.0, 503)
+    metrics.record("POST", "/p/_apis/git/repositories/r/commitsbatch", 0.07)
+    return metrics
+
+
+def test_record_groups_by_template():
+    snapshot = _metrics().snapshot()
+    release = snapshot["GET /{project}/_apis/release/releases/{releaseId}"]
+    assert release.requests == 3
+    assert release.errors == 1
+    assert release.retries == 2
+    assert release.bytes_received == 150
+    assert release.status_codes == {"200": 2, "503": 1}
+    assert release.latency_buckets == [1, 0, 0, 1, 0, 0, 0, 0]
+    assert release.latency_max == 20.0
+
+    batch = snapshot["POST /{project}/_apis/git/repositories/{repositoryId}/commitsbatch"]
+    assert batch.status_codes == {"error": 1}
+    assert batch.errors == 1
+
+
+def test_snapshot_is_a_copy_and_reset_clears():
+    metrics = _metrics()
+    snapshot = metrics.snapshot()
+    next(iter(snapshot.values())).requests = 99
+    assert 99 not in [item.requests for item in metrics.snapshot().values()]
+    assert metrics.first_response_at is not None
+    metrics.reset()
+    assert metrics.snapshot() == {}
+    assert metrics.first_response_at is None
+
+
+def test_summary_lists_slowest_endpoints_first():
+    lines = _metrics().summary().splitlines()
+    assert lines[0].startswith("endpoint")
+    assert lines[1].startswith("GET /{project}/_apis/release/releases/{releaseId}")
+    assert "200:2,503:1" in lines[1]
+
+
+def test_prometheus_textfile(tmp_path):
+    metrics = _metrics()
+    path = tmp_path / "textfile" / "leadtime.prom"
+    metrics.write_prometheus(str(path))
+    text = path.read_text(encoding="utf-8")
+
+    labels = 'method="GET",endpoint="/{project}/_apis/release/releases/{releaseId}"'
+    assert f'leadtime_azure_devops_requests_total{{{labels},status="503"}} 1' in text
+    assert f"leadtime_azure_devops_retries_total{{{labels}}} 2" in text
+    assert f"leadtime_azure_devops_response_bytes_total{{{labels}}} 150" in text
+    histogram = "leadtime_azure_devops_request_duration_seconds"
+    assert f'{histogram}_bucket{{{labels},le="{LATENCY_BUCKETS[0]}"}} 1' in text
+    assert f'{histogram}_bucket{{{labels},le="1.0"}} 2' in text
+    assert f'{histogram}_bucket{{{labels},le="+Inf"}} 3' in text
+    assert f"{histogram}_count{{{labels}}} 3" in text
+    assert "# TYPE leadtime_azure_devops_request_duration_seconds histogram" in text
+
+
+def test_shared_metrics_is_a_singleton():
+    assert get_shared_metrics() is get_shared_metrics()
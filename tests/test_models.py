@@ -0,0 +1,41 @@
+"""Tests for the Azure DevOps data models."""
+
+import dataclasses
+
+import pytest
+
+from tests.factories import build_artifact, build_pull_request, build_release_environment
+
+
+def test_models_are_slotted_and_frozen():
+    for model, name in (
+        (build_release_environment(), "release_status"),
+        (build_artifact(), "commit_id"),
+        (build_pull_request(), "status"),
+    ):
+        assert not hasattr(model, "__dict__")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            setattr(model, name, "changed")
+
+
+def test_models_are_hashable():
+    env = build_release_environment(artifacts=(build_artifact(),))
+    assert len({env, build_release_environment(artifacts=(build_artifact(),))}) == 1
+    assert len({build_pull_request(), build_pull_request(id="2")}) == 2
+
+
+def test_low_cardinality_strings_are_interned():
+    first = build_artifact(repository_name="".join(["re", "po"]))
+    second = build_artifact(repository_name="".join(["rep", "o"]))
+    assert first.repository_name is second.repository_name
+
+    first_pr = build_pull_request(target_ref_name="".join(["refs/heads/", "main"]))
+    second_pr = build_pull_request(target_ref_name="".join(["refs/", "heads/main"]))
+    assert first_pr.target_ref_name is second_pr.target_ref_name
+
+
+def test_replace_recomputes_parsed_timestamps():
+    env = dataclasses.replace(
+        build_release_environment(), environment_finished_at="2021-01-01T02:00:00Z"
+    )
+    assert env.environment_finished_us - env.release_created_us == 7200 * 1_000_000
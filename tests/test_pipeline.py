@@ -0,0 +1,215 @@
+"""Tests for the collection pipeline."""
+
+import asyncio
+import logging
+
+import pytest
+
+import pipeline
+from azure_devops.async_client import AsyncAzureDevOpsClient
+from tests.factories import (build_artifact, build_pull_request,
+                             build_release_environment, release_scenario)
+
+SCOPE = pipeline.CollectionScope("proj", "pid", "def", 2)
+
+
+def _without_timestamp(payloads):
+    return [{k: v for k, v in payload.items() if k != "timestamp"} for payload in payloads]
+
+
+def test_resolve_scope(fake_client):
+    client = fake_client(release_scenario())
+    assert pipeline.resolve_scope(client, client, "proj", "def") == pipeline.CollectionScope(
+        "proj", "pid", "def", 2
+    )
+
+
+def test_iter_payloads(fake_client, caplog):
+    client = fake_client(release_scenario())
+    with caplog.at_level(logging.WARNING):
+        payloads = list(pipeline.iter_payloads(client, client, SCOPE))
+
+    assert len(payloads) == 1
+    payload = payloads[0]
+    assert payload["release"]["id"] == 2
+    assert payload["artifact"]["alias"] == "a"
+    assert payload["pullrequest"]["last_merge_commit_id"] == "first"
+    assert payload["metrics"]["lead_time_artifact_commit_to_prod"]["hours"] == 49.0
+    assert payload["metrics"]["lead_time_pr_to_prod"]["hours"] == 25.0
+    assert payload["metrics"]["lead_time_pr_last_commit_to_prod"]["hours"] == 73.0
+    assert "Commit date not found" in caplog.text
+    assert "No commit found for pull request 8" in caplog.text
+    assert "Unable to read release artifacts" in caplog.text
+
+
+def test_iter_payloads_skips_unfinished_environment(fake_client):
+    client = fake_client({})
+    env = build_release_environment(environment_finished_at=None)
+    assert list(pipeline.iter_payloads(client, client, SCOPE, [env])) == []
+
+
+def test_build_enriched_payload_without_merge_date():
+    payload = pipeline.build_enriched_payload(
+        SCOPE,
+        build_release_environment(),
+        build_artifact(),
+        "2021-01-01T00:00:00Z",
+        build_pull_request(merged_at=None),
+        ("c0", "2021-01-01T00:00:00Z"),
+    )
+    assert "lead_time_pr_to_prod" not in payload["metrics"]
+    assert payload["project"] == {"name": "proj", "id": "pid"}
+
+
+def test_build_enriched_payload_uses_fixed_collection_time():
+    scope = pipeline.CollectionScope("proj", "pid", "def", 2, collected_at="2024-05-01")
+    payload = pipeline.build_enriched_payload(
+        scope,
+        build_release_environment(),
+        build_artifact(),
+        "2021-01-01T00:00:00Z",
+        build_pull_request(),
+        ("c0", "2021-01-01T00:00:00Z"),
+    )
+    assert payload["timestamp"] == "2024-05-01"
+
+
+def test_async_pipeline_matches_sync(fake_client):
+    client = fake_client(release_scenario())
+    expected = list(pipeline.iter_payloads(client, client, SCOPE))
+
+    payloads = asyncio.run(pipeline.run_async(client, client, SCOPE, 4))
+    assert _without_timestamp(payloads) == _without_timestamp(expected)
+
+
+def test_environment_filter_applies_to_both_paths(fake_client):
+    client = fake_client(release_scenario())
+
+    def only_release_one(env):
+        return env.release_id == 1
+
+    assert list(pipeline.iter_payloads(client, client, SCOPE, environment_filter=only_release_one)) == []
+    payloads = asyncio.run(
+        pipeline.run_async(client, client, SCOPE, 4, environment_filter=only_release_one)
+    )
+    assert payloads == []
+
+
+def test_async_pipeline_skips_unfinished_environment(fake_client):
+    client = AsyncAzureDevOpsClient(fake_client({}), 2)
+
+    async def environments():
+        yield build_release_environment(environment_finished_at=None)
+
+    payloads = asyncio.run(
+        pipeline.collect_payloads_async(client, client, SCOPE, environments())
+    )
+    assert payloads == []
+
+
+def test_async_client_rejects_invalid_concurrency(fake_client):
+    with pytest.raises(ValueError):
+        AsyncAzureDevOpsClient(fake_client({}), 0)
+
+
+def _posted(client, endpoint):
+    return [body for posted, body in client.posted if posted.endswith(endpoint)]
+
+
+def test_commit_dates_and_pull_requests_are_batched_per_repository(fake_client):
+    client = fake_client(release_scenario())
+    list(pipeline.iter_payloads(client, client, SCOPE, batch_size=1))
+    assert [body["ids"] for body in _posted(client, "/commitsbatch")] == [
+        ["c1", "c2"],
+        ["c3", "c4"],
+    ]
+    # Commits without a date are not queried.
+    assert [body["queries"][0]["items"] for body in _posted(client, "/pullrequestquery")] == [
+        ["c1"],
+        ["c3", "c4"],
+    ]
+
+    client = fake_client(release_scenario())
+    list(pipeline.iter_payloads(client, client, SCOPE))
+    assert [body["ids"] for body in _posted(client, "/commitsbatch")] == [["c1", "c2", "c3", "c4"]]
+    assert len(_posted(client, "/pullrequestquery")) == 1
+
+
+def _count_release_fetches(client):
+    fetched = []
+    original_get = client.get
+
+    def counting_get(endpoint, params=None):
+        if "/_apis/release/releases/" in endpoint:
+            fetched.append(endpoint)
+        return original_get(endpoint, params)
+
+    client.get = counting_get
+    return fetched
+
+
+def test_expanded_artifacts_skip_release_fetch(fake_client):
+    client = fake_client(release_scenario())
+    fetched = _count_release_fetches(client)
+    list(pipeline.iter_payloads(client, client, SCOPE))
+    # Only the release whose listing carries no artifact is fetched.
+    assert fetched == ["/proj/_apis/release/releases/3"]
+
+
+def test_release_fetched_once_for_its_environments(fake_client):
+    client = fake_client(release_scenario())
+    fetched = _count_release_fetches(client)
+    environments = [
+        build_release_environment(release_id=2, environment_id=21),
+        build_release_environment(release_id=2, environment_id=22),
+    ]
+    payloads = list(pipeline.iter_payloads(client, client, SCOPE, environments))
+    assert fetched == ["/proj/_apis/release/releases/2"]
+    assert [payload["environment"]["id"] for payload in payloads] == [21, 22]
+
+    client = fake_client(release_scenario())
+    fetched = _count_release_fetches(client)
+
+    async def stream():
+        for env in environments:
+            yield env
+
+    async_client = AsyncAzureDevOpsClient(client, 2)
+    payloads = asyncio.run(
+        pipeline.collect_payloads_async(async_client, async_client, SCOPE, stream())
+    )
+    assert fetched == ["/proj/_apis/release/releases/2"]
+    assert [payload["environment"]["id"] for payload in payloads] == [21, 22]
+
+
+def test_calculate_durations_from_epochs():
+    hour = 3600 * 1_000_000
+    metrics = pipeline.calculate_durations(3 * hour, 0, 2 * hour, hour)
+    assert metrics == {
+        "lead_time_artifact_commit_to_prod": {"seconds": 10800, "minutes": 180.0, "hours": 3.0},
+        "lead_time_pr_to_prod": {"seconds": 3600, "minutes": 60.0, "hours": 1.0},
+        "lead_time_pr_last_commit_to_prod": {"seconds": 7200, "minutes": 120.0, "hours": 2.0},
+    }
+    assert "lead_time_pr_to_prod" not in pipeline.calculate_durations(hour, 0, None, 0)
+
+
+def test_unit_filter_applies_to_both_paths(fake_client):
+    client = fake_client(release_scenario())
+
+    def pending(env, artifact):
+        return artifact.alias != "a"
+
+    units = list(pipeline.iter_unit_payloads(client, client, SCOPE, unit_filter=pending))
+    assert [(env.release_id, artifact.alias, payload) for env, artifact, payload in units] == [
+        (2, "nodate", None),
+        (1, "nopr", None),
+        (1, "nocommits", None),
+    ]
+    assert list(pipeline.iter_payloads(client, client, SCOPE, unit_filter=pending)) == []
+
+    async_units = asyncio.run(pipeline.run_async_units(client, client, SCOPE, 4, unit_filter=pending))
+    assert [(env.release_id, artifact.alias) for env, artifact, _ in async_units] == [
+        (2, "nodate"),
+        (1, "nopr"),
+        (1, "nocommits"),
+    ]
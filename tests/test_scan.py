@@ -0,0 +1,150 @@
+"""Tests for multi-target scans."""
+
+import json
+import logging
+import threading
+
+import pytest
+import requests
+
+import scan
+from pipeline import CollectionScope
+from state import IdCache
+from tests.factories import build_release_environment, release_scenario, response_key
+
+
+def _write_targets(tmp_path, targets):
+    path = tmp_path / "targets.json"
+    path.write_text(json.dumps({"targets": targets}), encoding="utf-8")
+    return str(path)
+
+
+def test_load_targets(tmp_path):
+    path = _write_targets(
+        tmp_path,
+        [
+            {"project": "proj", "definition": "def"},
+            {"project": "proj", "definition": "def", "environment": "Prod"},
+        ],
+    )
+    assert scan.load_targets(path) == [
+        scan.ScanTarget("proj", "def"),
+        scan.ScanTarget("proj", "def", "Prod"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "targets",
+    [
+        [],
+        [{"project": "proj"}],
+        [{"project": "p", "definition": "d"}, {"project": "p", "definition": "d"}],
+    ],
+)
+def test_load_targets_rejects_invalid_files(tmp_path, targets):
+    with pytest.raises(ValueError):
+        scan.load_targets(_write_targets(tmp_path, targets))
+
+
+def test_target_slug_and_partition_path():
+    target = scan.ScanTarget("My Project", "ONE-2205/PRD", "Prod")
+    assert target.slug == "My_Project__ONE-2205_PRD__Prod"
+    assert scan.partition_path("out/leadtime.ndjson.gz", target) == (
+        "out/leadtime.My_Project__ONE-2205_PRD__Prod.ndjson.gz"
+    )
+    assert scan.partition_path("out/{target}/records.csv", target) == (
+        "out/My_Project__ONE-2205_PRD__Prod/records.csv"
+    )
+
+
+def test_target_environment_filter():
+    assert scan.ScanTarget("p", "d").environment_filter() is None
+    accept = scan.ScanTarget("p", "d", "Prod").environment_filter()
+    assert accept(build_release_environment(environment_name="Prod"))
+    assert not accept(build_release_environment(environment_name="QA"))
+
+
+def test_scan_targets_resolves_each_project_once(fake_client, caplog):
+    responses = release_scenario()
+    responses[
+        response_key(
+            "/pid/_apis/release/definitions",
+            {"api-version": "7.1", "searchText": "other"},
+        )
+    ] = {"value": []}
+    client = fake_client(responses)
+    project_lookups = []
+    original_get = client.get
+
+    def counting_get(endpoint, params=None):
+        if endpoint == "/_apis/projects":
+            project_lookups.append(endpoint)
+        return original_get(endpoint, params)
+
+    client.get = counting_get
+    targets = [
+        scan.ScanTarget("proj", "def"),
+        scan.ScanTarget("proj", "other"),
+        scan.ScanTarget("proj", "def", "Prod"),
+    ]
+
+    def run_target(target, scope):
+        assert scope == CollectionScope("proj", "pid", "def", 2)
+        return len(target.slug)
+
+    with caplog.at_level(logging.ERROR):
+        results = scan.scan_targets(client, client, targets, run_target, parallel=2)
+
+    assert results == [(targets[0], 9), (targets[1], None), (targets[2], 15)]
+    assert project_lookups == ["/_apis/projects"]
+    assert "proj__other failed" in caplog.text
+
+
+def test_scope_resolver_reuses_cached_ids(fake_client, tmp_path):
+    client = fake_client(release_scenario())
+    path = str(tmp_path / "ids.json")
+    target = scan.ScanTarget("proj", "def")
+
+    first = scan.ScopeResolver(client, client, IdCache(path))
+    assert first.resolve(target) == CollectionScope("proj", "pid", "def", 2)
+    first.id_cache.save()
+
+    offline = fake_client({})
+    second = scan.ScopeResolver(offline, offline, IdCache(path))
+    assert second.resolve(target) == CollectionScope("proj", "pid", "def", 2)
+    assert second.id_cache.hits == 2
+
+
+def test_scan_targets_reports_http_errors(fake_client, caplog):
+    client = fake_client(release_scenario())
+    targets = [scan.ScanTarget("proj", "def"), scan.ScanTarget("proj", "def", "Prod")]
+
+    def run_target(target, scope):
+        if target.environment:
+            raise requests.HTTPError("404 Client Error")
+        return 1
+
+    results = scan.scan_targets(client, client, targets, run_target, parallel=2)
+
+    assert results == [(targets[0], 1), (targets[1], None)]
+    assert "proj__def__Prod failed: 404 Client Error" in caplog.text
+
+
+def test_scope_resolver_looks_up_projects_concurrently(fake_client, monkeypatch):
+    client = fake_client({})
+    # Both project lookups must be in flight at once to pass the barrier.
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_project_id(_client, project):
+        barrier.wait()
+        return f"id-{project}"
+
+    monkeypatch.setattr(scan, "get_project_id", get_project_id)
+    monkeypatch.setattr(scan, "get_release_definition_id", lambda *_: 2)
+    targets = [scan.ScanTarget("a", "def"), scan.ScanTarget("b", "def")]
+
+    results = scan.scan_targets(
+        client, client, targets, lambda target, scope: scope.project_id, parallel=2
+    )
+
+    assert [records for _, records in results] == ["id-a", "id-b"]
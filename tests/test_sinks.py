@@ -0,0 +1,77 @@
+"""Tests for the output sinks."""
+
+import gzip
+import io
+import json
+import sys
+import threading
+
+from sinks import NdjsonSink, SynchronizedSink, TeeSink, open_sink
+
+
+def test_ndjson_sink_buffers_and_flushes():
+    stream = io.StringIO()
+    sink = NdjsonSink(stream, flush_every=2)
+    sink.write({"a": 1})
+    assert stream.getvalue() == ""
+    sink.write({"b": "é"})
+    assert stream.getvalue() == '{"a":1}\n{"b":"é"}\n'
+    sink.write({"c": [1, 2]})
+    sink.close()
+    assert stream.getvalue().splitlines()[-1] == '{"c":[1,2]}'
+    assert sink.records_written == 3
+    assert not stream.closed
+
+
+def test_open_sink_file(tmp_path):
+    path = tmp_path / "out.ndjson"
+    with open_sink(str(path)) as sink:
+        sink.write({"id": 1})
+        sink.write({"id": 2})
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2]
+
+
+def test_open_sink_gzip_by_extension(tmp_path):
+    path = tmp_path / "out.ndjson.gz"
+    with open_sink(str(path)) as sink:
+        sink.write({"id": 1})
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        assert json.loads(handle.read()) == {"id": 1}
+
+
+def test_open_sink_stdout(capsys):
+    with open_sink("-") as sink:
+        sink.write({"id": 1})
+    assert capsys.readouterr().out == '{"id":1}\n'
+
+
+def test_open_sink_gzipped_stdout(monkeypatch):
+    buffer = io.BytesIO()
+    stdout = io.TextIOWrapper(buffer)
+    monkeypatch.setattr(sys, "stdout", stdout)
+    with open_sink("-", compress=True) as sink:
+        sink.write({"id": 1})
+    assert gzip.decompress(buffer.getvalue()) == b'{"id":1}\n'
+
+
+def test_tee_sink_forwards_records():
+    first, second = io.StringIO(), io.StringIO()
+    with TeeSink(NdjsonSink(first), NdjsonSink(second)) as sink:
+        sink.write({"id": 1})
+    assert first.getvalue() == second.getvalue() == '{"id":1}\n'
+
+
+def test_synchronized_sink_serializes_threads():
+    stream = io.StringIO()
+    sink = SynchronizedSink(NdjsonSink(stream, flush_every=3))
+    threads = [
+        threading.Thread(target=lambda: [sink.write({"id": i}) for i in range(100)])
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.close()
+    assert len(stream.getvalue().splitlines()) == 400
@@ -0,0 +1,203 @@
+"""Tests for the persisted local state."""
+
+import json
+import logging
+
+import pytest
+
+from state import (CheckpointJournal, IdCache, IncrementalState, Watermark,
+                   load_watermark, save_watermark)
+from tests.factories import build_artifact, build_release_environment
+
+
+def test_load_missing_watermark(tmp_path):
+    assert load_watermark(str(tmp_path / "missing.json")) is None
+
+
+def test_save_and_load_watermark(tmp_path):
+    path = str(tmp_path / "nested" / "state.json")
+    save_watermark(path, Watermark(3, "2021-01-01T01:00:00Z"))
+    assert load_watermark(path) == Watermark(3, "2021-01-01T01:00:00Z")
+
+
+def test_load_invalid_watermark(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{not json", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_watermark(str(path))
+
+
+def test_first_run_accepts_everything_and_commits_newest(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = IncrementalState(path)
+    assert state.min_created_time() is None
+
+    older = build_release_environment(release_id=1, environment_finished_at="2021-01-01T01:00:00Z")
+    newer = build_release_environment(release_id=2, environment_finished_at="2021-01-02T01:00:00Z")
+    assert state.accept(newer)
+    assert state.accept(older)
+    assert not state.accept(build_release_environment(environment_finished_at=None))
+    state.commit()
+
+    assert load_watermark(path) == Watermark(2, "2021-01-02T01:00:00Z")
+
+
+def test_next_run_skips_processed_environments(tmp_path):
+    path = str(tmp_path / "state.json")
+    save_watermark(path, Watermark(2, "2021-01-02T01:00:00Z"))
+    state = IncrementalState(path, lookback_days=1)
+
+    assert state.min_created_time() == "2021-01-01T01:00:00+00:00"
+    assert not state.accept(
+        build_release_environment(release_id=2, environment_finished_at="2021-01-02T01:00:00Z")
+    )
+    assert state.accept(
+        build_release_environment(release_id=3, environment_finished_at="2021-01-02T01:00:00Z")
+    )
+
+
+def test_min_created_time_accepts_azure_fractions(tmp_path):
+    path = str(tmp_path / "state.json")
+    save_watermark(path, Watermark(2, "2021-01-02T01:00:00.1234567Z"))
+
+    state = IncrementalState(path, lookback_days=1)
+
+    assert state.min_created_time() == "2021-01-01T01:00:00.123456+00:00"
+
+
+def test_commit_without_new_deployment_keeps_watermark(tmp_path):
+    path = str(tmp_path / "state.json")
+    save_watermark(path, Watermark(2, "2021-01-02T01:00:00Z"))
+    state = IncrementalState(path)
+    state.commit()
+    assert load_watermark(path) == Watermark(2, "2021-01-02T01:00:00Z")
+
+
+def test_reset_ignores_stored_watermark(tmp_path):
+    path = str(tmp_path / "state.json")
+    save_watermark(path, Watermark(2, "2021-01-02T01:00:00Z"))
+    state = IncrementalState(path, reset=True)
+    assert state.watermark is None
+    assert state.accept(build_release_environment(release_id=1))
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_id_cache_round_trip_and_expiry(tmp_path):
+    path = str(tmp_path / "nested" / "ids.json")
+    clock = _Clock()
+    cache = IdCache(path, ttl=60, clock=clock)
+    assert cache.get("https://org", "project", "proj") is None
+
+    cache.set("pid", "https://org", "project", "proj")
+    cache.set(2, "https://org", "definition", "pid", "def")
+    cache.save()
+
+    clock.now += 30
+    reloaded = IdCache(path, ttl=60, clock=clock)
+    assert reloaded.get("https://org", "project", "proj") == "pid"
+    assert reloaded.get("https://org", "definition", "pid", "def") == 2
+    assert (reloaded.hits, reloaded.misses) == (2, 0)
+
+    clock.now += 31
+    assert reloaded.get("https://org", "project", "proj") is None
+    reloaded.set("pid", "https://other", "project", "proj")
+    reloaded.save()
+    with open(path, encoding="utf-8") as handle:
+        assert list(json.load(handle)) == ["https://other|project|proj"]
+
+
+def test_id_cache_without_changes_is_not_written(tmp_path):
+    path = tmp_path / "ids.json"
+    IdCache(str(path)).save()
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("content", ["{not json", "[1]", '{"k": {"id": 1}}'])
+def test_id_cache_ignores_unreadable_files(tmp_path, caplog, content):
+    path = tmp_path / "ids.json"
+    path.write_text(content, encoding="utf-8")
+    with caplog.at_level(logging.WARNING):
+        cache = IdCache(str(path))
+    assert cache.get("k") is None
+
+
+def test_id_cache_logs_failed_saves(tmp_path, caplog):
+    blocker = tmp_path / "file"
+    blocker.write_text("", encoding="utf-8")
+    cache = IdCache(str(blocker / "ids.json"))
+    cache.set("pid", "k")
+    with caplog.at_level(logging.WARNING):
+        cache.save()
+    assert "Unable to save the id cache" in caplog.text
+
+
+class _Records:
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+
+def test_checkpoint_journal_resumes_completed_units(tmp_path, caplog):
+    path = tmp_path / "nested" / "checkpoint.ndjson"
+    env = build_release_environment(release_id=2, environment_id=5)
+    first, skipped, last = (build_artifact(alias=alias) for alias in ("a", "b", "c"))
+    journal = CheckpointJournal(str(path))
+    journal.complete(env, first, {"id": 1})
+    journal.complete(env, skipped, None)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write('[2,5,"c",{"id"')
+
+    with caplog.at_level(logging.WARNING):
+        resumed = CheckpointJournal(str(path), resume=True)
+    assert "Dropping the truncated end of checkpoint" in caplog.text
+    assert resumed.completed == 2
+    assert not resumed.pending(env, first) and not resumed.pending(env, skipped)
+    assert resumed.pending(env, last)
+    assert resumed.pending(build_release_environment(release_id=3, environment_id=5), first)
+
+    records = _Records()
+    assert resumed.replay(records) == 1
+    assert records.records == [{"id": 1}]
+
+    resumed.complete(env, last, {"id": 3})
+    resumed.close()
+    assert path.read_text(encoding="utf-8").splitlines() == [
+        '[2,5,"a",{"id":1}]',
+        '[2,5,"b",null]',
+        '[2,5,"c",{"id":3}]',
+    ]
+
+
+@pytest.mark.parametrize("content", ['[2,5,"a",null]', "[1]\n", "7\n"])
+def test_checkpoint_journal_drops_invalid_lines(tmp_path, content):
+    path = tmp_path / "checkpoint.ndjson"
+    path.write_text(content, encoding="utf-8")
+    journal = CheckpointJournal(str(path), resume=True)
+    journal.close()
+    assert journal.completed == 0
+    assert path.read_text(encoding="utf-8") == ""
+
+
+def test_checkpoint_journal_starts_over_without_resume(tmp_path):
+    path = tmp_path / "checkpoint.ndjson"
+    path.write_text('[2,5,"a",null]\n', encoding="utf-8")
+    env = build_release_environment(release_id=2, environment_id=5)
+    journal = CheckpointJournal(str(path))
+    assert journal.completed == 0
+    assert journal.pending(env, build_artifact(alias="a"))
+    journal.discard()
+    assert not path.exists()
+
+    resumed = CheckpointJournal(str(path), resume=True)
+    resumed.close()
+    assert resumed.completed == 0
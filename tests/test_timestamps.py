@@ -0,0 +1,50 @@
+"""Tests for ISO-8601 timestamp parsing."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from azure_devops import timestamps
+from azure_devops.timestamps import optional_epoch_us, to_epoch_us
+from tests.factories import build_pull_request, build_release_environment
+
+
+def test_to_epoch_us_handles_azure_formats():
+    expected = int(datetime(2021, 1, 1, tzinfo=timezone.utc).timestamp()) * 1_000_000
+    assert to_epoch_us("2021-01-01T00:00:00Z") == expected
+    assert to_epoch_us("2021-01-01T02:00:00+02:00") == expected
+    assert to_epoch_us("2021-01-01T00:00:00") == expected
+    assert to_epoch_us("2021-01-01T00:00:00.1234567Z") == expected + 123456
+    assert to_epoch_us("2021-01-01T00:00:00.5Z") == expected + 500000
+    assert to_epoch_us("2021-01-01T00:00:00.12+00:00") == expected + 120000
+
+
+def test_short_and_long_fractions_are_normalized():
+    assert timestamps._FRACTION.sub(
+        timestamps._six_digit_fraction, "2021-01-01T00:00:00.5+00:00"
+    ) == "2021-01-01T00:00:00.500000+00:00"
+    assert timestamps._FRACTION.sub(
+        timestamps._six_digit_fraction, "2021-01-01T00:00:00.1234567"
+    ) == "2021-01-01T00:00:00.123456"
+
+
+def test_to_epoch_us_rejects_invalid_timestamp():
+    with pytest.raises(ValueError):
+        to_epoch_us("not a date")
+
+
+def test_optional_epoch_us_passes_empty_values():
+    assert optional_epoch_us(None) is None
+    assert optional_epoch_us("") is None
+
+
+def test_models_parse_timestamps_once():
+    env = build_release_environment(environment_start_at=None)
+    assert env.environment_start_us is None
+    assert env.environment_finished_us - env.release_created_us == 3600 * 1_000_000
+    assert env.release_modified_us == to_epoch_us(env.release_modified_on)
+
+    pr = build_pull_request(merged_at=None)
+    assert pr.merged_us is None
+    assert pr.created_us == to_epoch_us("2020-12-31T23:00:00Z")
+    assert pr == build_pull_request(merged_at=None)